@@ -29,7 +29,7 @@ import time
 import threading
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
-from typing import Optional
+from typing import Optional, Union
 
 
 class AgentClient:
@@ -49,9 +49,10 @@ class AgentClient:
         self._heartbeat_thread: Optional[threading.Thread] = None
         self._heartbeat_stop = threading.Event()
 
-    def _request(self, method: str, path: str, body: Optional[dict] = None, use_agent_key: bool = False) -> dict:
+    def _request(self, method: str, path: str, body: Optional[Union[dict, list]] = None, use_agent_key: bool = False,
+                 timeout: float = 10) -> dict:
         url = f"{self.base_url}/agents{path}"
-        data = json.dumps(body).encode() if body else None
+        data = json.dumps(body).encode() if body is not None else None
         headers = {"Content-Type": "application/json"}
 
         if use_agent_key and self.agent_key:
@@ -61,8 +62,9 @@ class AgentClient:
 
         req = Request(url, data=data, headers=headers, method=method)
         try:
-            with urlopen(req, timeout=10) as resp:
-                return json.loads(resp.read().decode())
+            with urlopen(req, timeout=timeout) as resp:
+                raw = resp.read().decode()
+                return json.loads(raw) if raw else None  # 204 No Content
         except HTTPError as e:
             error_body = e.read().decode() if e.fp else str(e)
             raise RuntimeError(f"API error {e.code}: {error_body}") from e
@@ -111,8 +113,13 @@ class AgentClient:
         detail: Optional[str] = None,
         task_id: Optional[int] = None,
         metadata: Optional[dict] = None,
+        wait: bool = True,
     ) -> dict:
-        """Log an agent action. Returns the created action."""
+        """Log an agent action and return the created action.
+
+        With ``wait=False`` a server that batches its writes only queues the
+        action and returns ``{"ok": True, "queued": True}``.
+        """
         if not self.agent_id:
             raise RuntimeError("No agent_id set. Register first or pass agent_id to constructor.")
         body: dict = {
@@ -125,7 +132,18 @@ class AgentClient:
             body["task_id"] = task_id
         if metadata:
             body["metadata"] = metadata
-        return self._request("POST", f"/{self.agent_id}/actions", body, use_agent_key=True)
+        path = f"/{self.agent_id}/actions" + ("" if wait else "?wait=false")
+        return self._request("POST", path, body, use_agent_key=True)
+
+    def actions(self, batch: list[dict]) -> dict:
+        """Log several actions in one request.
+
+        Each item takes the same fields as :meth:`action`. Returns
+        ``{"stored": n, "results": [...]}`` with one result per item, in order.
+        """
+        if not self.agent_id:
+            raise RuntimeError("No agent_id set. Register first or pass agent_id to constructor.")
+        return self._request("POST", f"/{self.agent_id}/actions:batch", batch, use_agent_key=True)
 
     def start_heartbeat(self, interval: int = 30, status: str = "working") -> None:
         """Start a background thread that sends heartbeats every `interval` seconds."""
@@ -207,8 +225,13 @@ class AgentClient:
         self,
         project_id: Optional[int] = None,
         required_capabilities: Optional[list[str]] = None,
+        wait: float = 0,
     ) -> Optional[dict]:
-        """Claim the highest-priority unassigned task. Returns task or None."""
+        """Claim the highest-priority unassigned task. Returns task or None.
+
+        With ``wait``, the server holds the request for up to that many
+        seconds until a task becomes available instead of returning None.
+        """
         if not self.agent_id:
             raise RuntimeError("No agent_id set. Register first.")
         payload: dict = {}
@@ -217,12 +240,53 @@ class AgentClient:
         if required_capabilities:
             payload["required_capabilities"] = required_capabilities
         try:
-            return self._request("POST", "/queue/claim", payload, use_agent_key=True)
+            path = f"/queue/claim?wait={wait}" if wait else "/queue/claim"
+            return self._request("POST", path, payload, use_agent_key=True, timeout=wait + 10)
         except RuntimeError as e:
             if "204" in str(e):
                 return None
             raise
 
+    def claim_tasks(
+        self,
+        count: int,
+        project_id: Optional[int] = None,
+        required_capabilities: Optional[list[str]] = None,
+        wait: float = 0,
+    ) -> list[dict]:
+        """Claim up to `count` tasks at once, most urgent first. Returns [] if none.
+
+        ``wait`` long-polls as for ``claim_task``.
+        """
+        if not self.agent_id:
+            raise RuntimeError("No agent_id set. Register first.")
+        payload: dict = {}
+        if project_id:
+            payload["project_id"] = project_id
+        if required_capabilities:
+            payload["required_capabilities"] = required_capabilities
+        try:
+            path = f"/queue/claim-many?count={count}" + (f"&wait={wait}" if wait else "")
+            return self._request("POST", path, payload, use_agent_key=True, timeout=wait + 10) or []
+        except RuntimeError as e:
+            if "204" in str(e):
+                return []
+            raise
+
+    def renew_lease(self, task_id: Optional[int] = None, seconds: Optional[float] = None) -> dict:
+        """Extend the lease on a claimed task (default: all claimed tasks).
+
+        Claims expire unless renewed; heartbeats renew them too, so this is
+        only needed for long stretches without heartbeats.
+        """
+        params = []
+        if task_id is not None:
+            params.append(f"task_id={task_id}")
+        if seconds is not None:
+            params.append(f"seconds={seconds}")
+        path = "/queue/renew" + ("?" + "&".join(params) if params else "")
+        return self._request("POST", path, use_agent_key=True)
+
     def release_task(self, task_id: int) -> dict:
         """Release a claimed task back to the queue."""
         return self._request("POST", f"/queue/release?task_id={task_id}", use_agent_key=True)
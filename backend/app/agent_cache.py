@@ -0,0 +1,116 @@
+"""Cache of authenticated agents for X-Agent-Key and hook session lookups.
+
+Agent endpoints authenticate every call by hashing the key and looking
+the agent up; hook events look it up by ``session_id``. ``agent_cache``
+keeps a compact ``AgentCredential`` per key hash and per session id so
+the hot paths (actions, messages, acks, hooks) skip that query.
+
+Entries expire after ``Settings.agent_cache_ttl`` seconds and the least
+recently used ones are evicted past ``max_entries``. Deregistration and
+registration invalidate the affected entries; status changes are written
+through with ``set_status``. Like the view caches this lives in process
+memory, so with several workers a deregistered agent is only forgotten
+by the other workers once the TTL runs out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.config import get_settings
+from app.models import AgentStatus, AgentType
+
+MAX_CACHED_AGENTS = 1024
+
+
+class AgentCredential(NamedTuple):
+    id: int
+    name: str
+    agent_type: AgentType
+    status: AgentStatus
+    session_id: Optional[str] = None
+
+
+class AgentCredentialCache:
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = MAX_CACHED_AGENTS):
+        self.ttl = get_settings().agent_cache_ttl if ttl is None else ttl
+        self.max_entries = max_entries
+        # (kind, value) -> (expires_at, agent id); kind is "key" or "session"
+        self._index: OrderedDict[tuple[str, str], tuple[float, int]] = OrderedDict()
+        self._agents: dict[int, AgentCredential] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind: str, value: str) -> Optional[AgentCredential]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._index.get((kind, value))
+            if entry is not None and entry[0] > now and entry[1] in self._agents:
+                self._index.move_to_end((kind, value))
+                self.hits += 1
+                return self._agents[entry[1]]
+            if entry is not None:
+                del self._index[(kind, value)]
+            self.misses += 1
+            return None
+
+    def get_by_key(self, key_hash: str) -> Optional[AgentCredential]:
+        return self._get("key", key_hash)
+
+    def get_by_session(self, session_id: str) -> Optional[AgentCredential]:
+        return self._get("session", session_id)
+
+    def put(self, agent: AgentCredential, key_hash: Optional[str] = None):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._agents[agent.id] = agent
+            if key_hash is not None:
+                self._index[("key", key_hash)] = (expires_at, agent.id)
+                self._index.move_to_end(("key", key_hash))
+            if agent.session_id is not None:
+                self._index[("session", agent.session_id)] = (expires_at, agent.id)
+                self._index.move_to_end(("session", agent.session_id))
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+            if len(self._agents) > self.max_entries:
+                live = {agent_id for _, agent_id in self._index.values()}
+                self._agents = {i: a for i, a in self._agents.items() if i in live}
+
+    def set_status(self, agent_id: int, status: AgentStatus):
+        """Write a committed status change through to the cached record."""
+        with self._lock:
+            agent = self._agents.get(agent_id)
+            if agent is not None and agent.status != status:
+                self._agents[agent_id] = agent._replace(status=status)
+
+    def invalidate_agent(self, agent_id: int):
+        with self._lock:
+            self._agents.pop(agent_id, None)
+            for k in [k for k, (_, i) in self._index.items() if i == agent_id]:
+                del self._index[k]
+
+    def invalidate_session(self, session_id: str):
+        with self._lock:
+            self._index.pop(("session", session_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._agents.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._index),
+            }
+
+
+agent_cache = AgentCredentialCache()
@@ -1,17 +1,24 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.config import get_settings
-from app.database import get_db
+from app.database import get_session_factory
 from app.models import User
+from app.principal_cache import Principal, principal_cache
 from app.schemas import TokenData
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Stored hashes with a different cost than bcrypt_rounds report needs_update
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
@@ -23,6 +30,26 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# bcrypt releases the GIL, so hashes run in parallel up to the pool size
+# while the event loop and the request threadpool stay free.
+_hash_pool = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers or os.cpu_count() or 1,
+    thread_name_prefix="password-hash",
+)
+
+
+async def _in_hash_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _in_hash_pool(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _in_hash_pool(pwd_context.hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -34,7 +61,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme),
+                     session_factory: Callable[[], Session] = Depends(get_session_factory)) -> Principal:
+    """The token's user as a ``Principal``; cached, so most requests open no
+    session at all. One is opened only to load the user on a cache miss."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,16 +79,33 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    if user is None:
+    expires = payload.get("exp")
+    principal = principal_cache.get(token_data.user_id, expires)
+    if principal is None:
+        with session_factory() as db:
+            user = db.query(User).filter(User.id == token_data.user_id).first()
+            if user is None:
+                raise credentials_exception
+            principal = Principal.from_user(user)
+        principal_cache.put(principal, expires)
+    if not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
+
 
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """The user with ``username`` if ``password`` matches, else None.
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-    user = db.query(User).filter(User.username == username).first()
+    Hashing runs in the password pool. A stored hash that is outdated
+    (another cost or scheme) is replaced with a fresh one and committed.
+    """
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await _in_hash_pool(pwd_context.verify_and_update, password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
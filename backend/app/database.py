@@ -1,15 +1,106 @@
-from sqlalchemy import create_engine
+from typing import Callable, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import get_settings
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.config import Settings, get_settings
+from app.pool_metrics import PoolMetrics, instrumented
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
+# asyncio drivers for the same database URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """``url`` with its driver swapped for the asyncio one (asyncpg, aiosqlite)."""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def _sqlite_in_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def engine_options(url: str, config: Optional[Settings] = None, metrics: Optional[PoolMetrics] = None,
+                   is_async: bool = False) -> dict:
+    """``create_engine`` keyword arguments for ``url`` from the pool settings."""
+    config = config or settings
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite" and _sqlite_in_memory(url):
+        return {}  # one connection per thread; nothing to size
+    options = {
+        "pool_size": config.db_async_pool_size if is_async else config.db_pool_size,
+        "max_overflow": config.db_async_max_overflow if is_async else config.db_max_overflow,
+        "pool_timeout": config.db_pool_timeout,
+        "pool_recycle": config.db_pool_recycle,
+        "pool_pre_ping": config.db_pool_pre_ping,
+    }
+    timeout_ms = config.db_statement_timeout_ms
+    if timeout_ms and backend == "postgresql":
+        options["connect_args"] = (
+            {"server_settings": {"statement_timeout": str(timeout_ms)}} if is_async  # asyncpg
+            else {"options": f"-c statement_timeout={timeout_ms}"}  # psycopg2
+        )
+    elif timeout_ms and backend == "sqlite":
+        options["connect_args"] = {"timeout": timeout_ms / 1000}  # busy timeout
+    # Explicit, since aiosqlite would otherwise get a NullPool
+    pool_class = AsyncAdaptedQueuePool if is_async else QueuePool
+    options["poolclass"] = pool_class if metrics is None else instrumented(pool_class, metrics)
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # Readers no longer block the writer; NORMAL only syncs at checkpoints,
+    # which is durable against application crashes (not power loss)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _configure(engine: Engine, config: Settings):
+    url = engine.url
+    if config.sqlite_wal and url.get_backend_name() == "sqlite" and not _sqlite_in_memory(url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+
+def make_engine(url: str, config: Optional[Settings] = None, metrics: Optional[PoolMetrics] = None) -> Engine:
+    config = config or settings
+    engine = create_engine(url, **engine_options(url, config, metrics))
+    _configure(engine, config)
+    return engine
+
+
+def make_async_engine(url: str, config: Optional[Settings] = None,
+                      metrics: Optional[PoolMetrics] = None) -> AsyncEngine:
+    config = config or settings
+    url = async_database_url(url)
+    engine = create_async_engine(url, **engine_options(url, config, metrics, is_async=True))
+    _configure(engine.sync_engine, config)
+    return engine
+
+
+# Checkout figures for GET /health/db-pool
+pool_metrics = {"sync": PoolMetrics(), "async": PoolMetrics()}
+
+engine = make_engine(settings.database_url, metrics=pool_metrics["sync"])
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+async_engine = make_async_engine(settings.database_url, metrics=pool_metrics["async"])
+# Handlers return ORM values after committing, so don't expire them
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -17,3 +108,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_session_factory() -> Callable[[], Session]:
+    """``SessionLocal``, for dependencies that only sometimes need a
+    session (``get_current_user`` on a principal cache miss)."""
+    return SessionLocal
+
+
+async def get_async_db():
+    """Session for ``async def`` handlers: DB round trips await instead of
+    blocking the event loop."""
+    async with AsyncSessionLocal() as db:
+        yield db
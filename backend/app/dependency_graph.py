@@ -0,0 +1,127 @@
+"""Dependency-graph rescheduling for Gantt date changes.
+
+When a task's due date moves, its transitive dependents are pushed out
+so that each one starts no earlier than the latest due date among its
+predecessors (earliest-start, as in a forward critical-path pass).
+Dependents that already have enough slack stay where they are.
+
+Only the ``task_dependencies`` edges for the project and the date
+columns of the affected tasks are read; rows that move are written
+back in one bulk UPDATE.
+"""
+
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import Task, task_dependencies
+from app.serializers import in_chunks
+
+
+class DependencyCycleError(Exception):
+    """The dependents of a task loop back on themselves."""
+
+    def __init__(self, task_ids: list[int]):
+        self.task_ids = task_ids
+        super().__init__(f"Dependency cycle among tasks {task_ids}")
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes for DateTime(timezone=True)
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _load_edges(db: Session, project_id: int) -> tuple[dict, dict]:
+    """(successors, predecessors) adjacency for the project's tasks."""
+    successors: dict[int, list[int]] = defaultdict(list)
+    predecessors: dict[int, list[int]] = defaultdict(list)
+    rows = db.execute(
+        select(task_dependencies.c.task_id, task_dependencies.c.depends_on_id)
+        .join(Task, Task.id == task_dependencies.c.task_id)
+        .where(Task.project_id == project_id)
+    )
+    for task_id, depends_on_id in rows:
+        successors[depends_on_id].append(task_id)
+        predecessors[task_id].append(depends_on_id)
+    return successors, predecessors
+
+
+def _load_dates(db: Session, task_ids: set[int]) -> dict[int, list]:
+    dates: dict[int, list] = {}
+    for chunk in in_chunks(sorted(task_ids)):
+        for task_id, start, due in db.execute(
+            select(Task.id, Task.start_date, Task.due_date).where(Task.id.in_(chunk))
+        ):
+            dates[task_id] = [_utc(start), _utc(due)]
+    return dates
+
+
+def reschedule(db: Session, task: Task, new_due: datetime) -> list[int]:
+    """Move ``task`` to end at ``new_due`` and push its dependents.
+
+    Returns the ids of rows that changed, ``task.id`` first. Raises
+    ``DependencyCycleError`` without writing anything if the dependents
+    of ``task`` contain a cycle.
+    """
+    successors, predecessors = _load_edges(db, task.project_id)
+
+    # Subgraph reachable from the changed task
+    reachable = {task.id}
+    frontier = deque([task.id])
+    while frontier:
+        for succ in successors.get(frontier.popleft(), ()):
+            if succ not in reachable:
+                reachable.add(succ)
+                frontier.append(succ)
+
+    needed = set(reachable)
+    for node in reachable:
+        needed.update(predecessors.get(node, ()))
+    dates = _load_dates(db, needed)
+
+    old_start, old_due = dates[task.id]
+    new_due = _utc(new_due)
+    dates[task.id] = [old_start + (new_due - old_due) if old_start else None, new_due]
+    changed = [task.id]
+
+    # Kahn's algorithm over the reachable subgraph; the changed task is the only source
+    indegree = {node: 0 for node in reachable}
+    for node in reachable:
+        for succ in successors.get(node, ()):
+            indegree[succ] += 1
+    if indegree[task.id]:
+        raise DependencyCycleError(sorted(reachable))
+
+    ready = deque([task.id])
+    processed = 0
+    while ready:
+        node = ready.popleft()
+        processed += 1
+        if node != task.id:
+            pred_dues = [dates[p][1] for p in predecessors[node] if p in dates and dates[p][1]]
+            start, due = dates[node]
+            anchor = start or due
+            if pred_dues and anchor is not None:
+                earliest = max(pred_dues)
+                if anchor < earliest:
+                    shift = earliest - anchor
+                    dates[node] = [start + shift if start else None, due + shift if due else None]
+                    changed.append(node)
+        for succ in successors.get(node, ()):
+            indegree[succ] -= 1
+            if indegree[succ] == 0:
+                ready.append(succ)
+
+    if processed < len(reachable):
+        raise DependencyCycleError(sorted(n for n, d in indegree.items() if d > 0))
+
+    db.execute(update(Task), [
+        {"id": node, "start_date": dates[node][0], "due_date": dates[node][1]}
+        for node in changed
+    ])
+    return changed
@@ -0,0 +1,295 @@
+"""Transport for live-feed events between worker processes.
+
+``ConnectionManager`` publishes every event on the bus and fans out what
+the bus delivers to its own WebSocket subscribers, so with several
+uvicorn workers a dashboard sees events handled by any of them.
+
+Backends (``Settings.event_bus``):
+
+* ``inprocess`` — delivers straight back to this process (one worker).
+* ``postgres``  — ``NOTIFY`` on a channel every worker ``LISTEN``s on.
+* ``unix``      — one datagram socket per worker in a shared directory;
+  a publish is sent to every socket there. Single host, no database.
+
+Frames are opaque strings; the bus delivers each one exactly once to
+every running worker, including the publisher.
+
+NOTIFY payloads are limited to 8000 bytes, so the Postgres bus sends a
+larger frame as numbered chunks in one statement (hence one
+transaction: listeners get all of them or none) and reassembles them
+on the receiving side. The unix bus does the same with datagrams, whose
+size is bounded by the socket send buffer.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str], None]
+
+# NOTIFY payloads must be shorter than 8000 bytes
+PG_MAX_PAYLOAD = 7999
+# Marks a chunk payload: "<prefix><frame id>:<index>:<count>\n<piece>"
+PG_CHUNK_PREFIX = "\x1echunk:"
+# Incomplete chunked frames are dropped after this many seconds
+PG_CHUNK_TTL = 30.0
+# Seconds between attempts to re-LISTEN after the connection drops
+PG_RECONNECT_DELAY = 2.0
+# How long a listing of peer sockets is reused
+UNIX_PEER_TTL = 1.0
+UNIX_MAX_DATAGRAM = 1 << 20
+# Larger frames are sent as chunks; well under the default AF_UNIX send buffer
+UNIX_CHUNK_PAYLOAD = 1 << 16
+# How long a publish waits for a peer to drain its queue before dropping
+UNIX_SEND_TIMEOUT = 0.5
+
+
+class EventBus:
+    """In-process bus; also the interface the other backends implement."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def publish(self, frame: str):
+        if self._deliver is not None:
+            self._deliver(frame)
+
+
+def split_payload(frame: str, limit: int = PG_MAX_PAYLOAD) -> list[str]:
+    """NOTIFY payloads for ``frame``: the frame itself if it fits,
+    otherwise chunks of at most ``limit`` bytes each."""
+    if len(frame.encode()) <= limit:
+        return [frame]
+    frame_id = uuid.uuid4().hex
+    # Header with room for index and count of up to 9999 chunks each
+    room = limit - len(f"{PG_CHUNK_PREFIX}{frame_id}:0000:0000\n".encode())
+    pieces, rest = [], frame
+    while rest:
+        # Longest prefix that fits, never cutting a UTF-8 sequence in two
+        piece = rest.encode()[:room].decode(errors="ignore")
+        pieces.append(piece)
+        rest = rest[len(piece):]
+    return [f"{PG_CHUNK_PREFIX}{frame_id}:{i}:{len(pieces)}\n{piece}" for i, piece in enumerate(pieces)]
+
+
+class _Reassembler:
+    """Joins chunked payloads back into frames."""
+
+    def __init__(self):
+        self._partial: dict[str, tuple[float, list[Optional[str]]]] = {}
+
+    def add(self, payload: str) -> Optional[str]:
+        """The complete frame, or None while chunks are still missing."""
+        if not payload.startswith(PG_CHUNK_PREFIX):
+            return payload
+        header, _, piece = payload.partition("\n")
+        frame_id, index, count = header[len(PG_CHUNK_PREFIX):].split(":")
+        now = time.monotonic()
+        for stale in [k for k, (at, _) in self._partial.items() if now - at > PG_CHUNK_TTL]:
+            logger.warning("Dropping incomplete chunked event %s", stale)
+            del self._partial[stale]
+        _, pieces = self._partial.setdefault(frame_id, (now, [None] * int(count)))
+        pieces[int(index)] = piece
+        if any(p is None for p in pieces):
+            return None
+        del self._partial[frame_id]
+        return "".join(pieces)
+
+
+class PostgresEventBus(EventBus):
+    def __init__(self, engine, channel: str):
+        super().__init__()
+        self._engine = engine
+        self._channel = channel
+        self._listener = None
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+        self._reconnect: Optional[asyncio.Task] = None
+        self._chunks = _Reassembler()
+
+    def _dedicated_connection(self):
+        # Take a DBAPI connection out of the pool for good
+        proxied = self._engine.raw_connection()
+        proxied.detach()
+        conn = proxied.dbapi_connection
+        conn.autocommit = True
+        return conn
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        await self._listen()
+
+    async def _listen(self):
+        conn = await asyncio.to_thread(self._dedicated_connection)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self._channel}"')
+        self._listener = conn
+        asyncio.get_running_loop().add_reader(conn.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        try:
+            self._listener.poll()
+        except Exception:
+            logger.exception("Event bus LISTEN connection lost")
+            self._drop_listener()
+            self._reconnect = asyncio.create_task(self._relisten())
+            return
+        while self._listener.notifies:
+            self._receive(self._listener.notifies.pop(0).payload)
+
+    def _receive(self, payload: str):
+        frame = self._chunks.add(payload)
+        if frame is not None and self._deliver is not None:
+            self._deliver(frame)
+
+    async def _relisten(self):
+        while self._deliver is not None:
+            await asyncio.sleep(PG_RECONNECT_DELAY)
+            try:
+                await self._listen()
+                return
+            except Exception:
+                logger.warning("Event bus could not re-LISTEN, retrying")
+
+    def _drop_listener(self):
+        if self._listener is None:
+            return
+        try:
+            asyncio.get_running_loop().remove_reader(self._listener.fileno())
+        except Exception:
+            pass
+        try:
+            self._listener.close()
+        except Exception:
+            pass
+        self._listener = None
+
+    async def stop(self):
+        await super().stop()
+        if self._reconnect is not None:
+            self._reconnect.cancel()
+        self._drop_listener()
+        if self._publisher is not None:
+            self._publisher.close()
+            self._publisher = None
+
+    def _notify(self, payloads: list[str]):
+        with self._publish_lock:
+            if self._publisher is None or self._publisher.closed:
+                self._publisher = self._dedicated_connection()
+            try:
+                with self._publisher.cursor() as cur:
+                    # One statement, so the chunks of a frame commit together
+                    cur.execute("SELECT pg_notify(%s, payload) FROM unnest(%s) AS payload",
+                                (self._channel, payloads))
+            except Exception:
+                self._publisher.close()
+                self._publisher = None
+                raise
+
+    async def publish(self, frame: str):
+        await asyncio.to_thread(self._notify, split_payload(frame))
+
+
+class UnixSocketEventBus(EventBus):
+    def __init__(self, directory: str):
+        super().__init__()
+        self._directory = directory
+        self._path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._peers: list[str] = []
+        self._peers_at = 0.0
+        self._chunks = _Reassembler()
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        os.makedirs(self._directory, exist_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self._path)
+        sock.setblocking(False)
+        self._sock = sock
+        asyncio.get_running_loop().add_reader(sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self._sock.recv(UNIX_MAX_DATAGRAM)
+            except BlockingIOError:
+                return
+            frame = self._chunks.add(data.decode())
+            if frame is not None and self._deliver is not None:
+                self._deliver(frame)
+
+    async def stop(self):
+        await super().stop()
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+
+    def _peer_paths(self) -> list[str]:
+        now = time.monotonic()
+        if now - self._peers_at > UNIX_PEER_TTL:
+            self._peers = [e.path for e in os.scandir(self._directory)
+                           if e.name.endswith(".sock") and e.path != self._path]
+            self._peers_at = now
+        return self._peers
+
+    @staticmethod
+    async def _send(sock: socket.socket, data: bytes, path: str):
+        try:
+            sock.sendto(data, path)
+        except BlockingIOError:
+            # Peer queue is full (the chunks of a large frame); let it catch up
+            await asyncio.wait_for(asyncio.get_running_loop().sock_sendto(sock, data, path),
+                                   UNIX_SEND_TIMEOUT)
+
+    async def publish(self, frame: str):
+        await super().publish(frame)
+        sock = self._sock
+        if sock is None:
+            return
+        datagrams = [p.encode() for p in split_payload(frame, UNIX_CHUNK_PAYLOAD)]
+        for path in self._peer_paths():
+            try:
+                for data in datagrams:
+                    await self._send(sock, data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; forget its socket
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                self._peers_at = 0.0
+            except asyncio.TimeoutError:
+                logger.warning("Event bus peer %s is not reading; event dropped", path)
+            except OSError as exc:
+                logger.warning("Event bus could not send to %s (%s); event dropped", path, exc)
+
+
+def create_event_bus(settings, engine) -> EventBus:
+    backend = settings.event_bus
+    if backend == "inprocess":
+        return EventBus()
+    if backend == "postgres":
+        return PostgresEventBus(engine, settings.event_bus_channel)
+    if backend == "unix":
+        return UnixSocketEventBus(settings.event_bus_socket_dir)
+    raise ValueError(f"Unknown event_bus backend: {backend!r}")
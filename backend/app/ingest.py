@@ -0,0 +1,248 @@
+"""Write-behind ingestion for agent actions.
+
+Action endpoints validate a request, hand the row to ``action_pipeline``
+and acknowledge straight away. A single background task drains the
+queue and writes rows in batches — up to ``MAX_BATCH_SIZE`` rows or
+whatever arrived within ``FLUSH_INTERVAL`` of the first one — as one
+multi-row INSERT and one COMMIT, then broadcasts the stored actions as
+one coalesced frame (several if they would not fit in one NOTIFY).
+
+Endpoints wait for the row id by default; with ``wait=false`` they answer
+202 as soon as the row is queued and ``detach`` the future, so a failed
+insert is logged rather than lost.
+
+The queue is bounded: when the writer falls behind, ``submit`` waits
+for room, which slows the callers down instead of growing memory.
+``stop`` flushes everything still queued before returning, so a clean
+shutdown loses nothing.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.event_bus import PG_MAX_PAYLOAD
+from app.models import AgentAction
+from app.schemas import AgentActionResponse
+from app.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.05  # seconds
+MAX_QUEUE_SIZE = 10_000
+# Items accepted by one :batch request
+MAX_BATCH_ITEMS = 1000
+
+_STOP = object()
+# Bus frame of an empty coalesced event: topic header and JSON envelope
+_ENVELOPE_BYTES = len('type:agent_actions\n{"type": "agent_actions", "actions": []}')
+
+
+def action_response(action_id: int, row: dict, agent_name: str, agent_type) -> AgentActionResponse:
+    metadata = row.get("metadata_json")
+    return AgentActionResponse(
+        id=action_id,
+        agent_id=row["agent_id"],
+        agent_name=agent_name,
+        agent_type=agent_type,
+        action_type=row["action_type"],
+        summary=row["summary"],
+        detail=row.get("detail"),
+        task_id=row.get("task_id"),
+        metadata=json.loads(metadata) if metadata else None,
+        created_at=row["created_at"],
+    )
+
+
+def check_batch_size(items: list):
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_ITEMS} items)")
+
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'item'}: {e['msg']}" for e in exc.errors())
+
+
+def insert_actions(db: Session, rows: list[dict]) -> list[Optional[int]]:
+    """Insert ``agent_actions`` rows with one INSERT ... RETURNING and commit.
+
+    Returns the new ids in row order. If the batch fails it is retried
+    row by row so the rest is still stored; failed rows get ``None``.
+    """
+    # Postgres can return ids in parameter order from one batched INSERT;
+    # SQLAlchemy would split it per row on SQLite, whose multi-row
+    # INSERT ... RETURNING already yields rowids in insertion order.
+    ordered = db.get_bind().dialect.name == "postgresql"
+    stmt = insert(AgentAction).returning(AgentAction.id, sort_by_parameter_order=ordered)
+    try:
+        ids = list(db.scalars(stmt, rows))
+        db.commit()
+        return ids
+    except Exception:
+        db.rollback()
+        logger.exception("Batch insert of %d agent actions failed; retrying row by row", len(rows))
+    ids = []
+    for row in rows:
+        try:
+            ids.append(db.scalar(insert(AgentAction).returning(AgentAction.id), row))
+            db.commit()
+        except Exception:
+            db.rollback()
+            ids.append(None)
+    return ids
+
+
+def _frame_chunks(actions: list[dict]) -> Iterator[list[dict]]:
+    """Split coalesced actions so each bus frame (topic header included)
+    fits in one NOTIFY payload."""
+    chunk, size, tags = [], _ENVELOPE_BYTES, set()
+    for action in actions:
+        body = len(json.dumps(action).encode()) + 2  # ", " separator
+        tag = f",agent:{action.get('agent_id')}"
+        cost = body + (0 if tag in tags else len(tag))
+        if chunk and size + cost > PG_MAX_PAYLOAD:
+            yield chunk
+            chunk, size, tags = [], _ENVELOPE_BYTES, set()
+            cost = body + len(tag)
+        chunk.append(action)
+        size += cost
+        tags.add(tag)
+    if chunk:
+        yield chunk
+
+
+async def broadcast_actions(actions: list[AgentActionResponse]):
+    """Publish stored actions: ``agent_action`` for a single action,
+    ``agent_actions`` (oldest first) for several, split into as many
+    frames as it takes to stay under the NOTIFY payload limit."""
+    for chunk in _frame_chunks([a.model_dump(mode="json") for a in actions]):
+        if len(chunk) == 1:
+            await manager.broadcast({"type": "agent_action", "action": chunk[0]})
+        else:
+            await manager.broadcast({"type": "agent_actions", "actions": chunk})
+
+
+def detach(future: asyncio.Future):
+    """Stop waiting for a submitted row: a failure to store it is logged
+    instead of surfacing as an unretrieved future exception."""
+    def log_failure(f: asyncio.Future):
+        if not f.cancelled() and f.exception() is not None:
+            logger.error("Queued agent action was not stored: %s", f.exception())
+
+    future.add_done_callback(log_failure)
+
+
+class _Pending:
+    __slots__ = ("row", "agent_name", "agent_type", "future")
+
+    def __init__(self, row: dict, agent_name: str, agent_type, future: asyncio.Future):
+        self.row = row
+        self.agent_name = agent_name
+        self.agent_type = agent_type
+        self.future = future
+
+
+class ActionPipeline:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=MAX_QUEUE_SIZE)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush every queued row, then stop the writer."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(_STOP)
+        await task
+        self._queue = None
+
+    async def submit(self, row: dict[str, Any], agent_name: str, agent_type) -> asyncio.Future:
+        """Queue an ``agent_actions`` row. The returned future resolves to
+        the row id once it is committed."""
+        if self._task is None:
+            raise RuntimeError("Action pipeline is not running")
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(row, agent_name, agent_type, future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + FLUSH_INTERVAL
+            while len(batch) < MAX_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._flush(batch)
+            except Exception as exc:
+                # Never let one batch take the writer down with it
+                logger.exception("Agent action writer failed on a batch of %d", len(batch))
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(exc)
+
+    def _insert(self, rows: list[dict]) -> list[Optional[int]]:
+        with self._session_factory() as db:
+            return insert_actions(db, rows)
+
+    async def _flush(self, batch: list[_Pending]):
+        try:
+            ids = await asyncio.to_thread(self._insert, [p.row for p in batch])
+        except Exception as exc:
+            logger.exception("Could not store %d agent actions", len(batch))
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(exc)
+            return
+
+        stored = []
+        for p, action_id in zip(batch, ids):
+            if action_id is None:
+                p.future.set_exception(RuntimeError("Agent action could not be stored"))
+                continue
+            p.future.set_result(action_id)
+            stored.append(action_response(action_id, p.row, p.agent_name, p.agent_type))
+        try:
+            await broadcast_actions(stored)
+        except Exception:
+            # The rows are committed; only the live feed misses them
+            logger.exception("Could not broadcast %d agent actions", len(stored))
+
+
+action_pipeline = ActionPipeline()
@@ -0,0 +1,344 @@
+"""In-memory agent liveness table.
+
+Heartbeats land here instead of in a commit: ``beat`` records a
+monotonic timestamp per agent and reports whether the agent just came
+alive. ``agents.last_heartbeat`` is only written when a heartbeat changes
+something (status, current task, liveness edge) or when the stored value
+is older than ``Settings.heartbeat_persist_interval``, so DB writes no
+longer grow with agent count times heartbeat rate. The table also keeps
+the stored ``current_task_id`` it last read or wrote, so a heartbeat
+repeating the current task is not a change.
+
+Liveness reads take the newer of the in-memory beat and the stored
+``last_heartbeat``: after a restart, or for beats handled by another
+worker, the stored value (at most one persist interval old) is used.
+
+``LivenessSweeper`` turns the alive -> dead edge into an event. It keeps
+a min-heap of heartbeat deadlines and sleeps until the earliest one;
+beats do not touch the heap (a popped entry whose agent has beaten since
+is pushed back at its new deadline), so the heap holds one entry per
+watched agent. When a deadline really passes the agent is set OFFLINE,
+its in-progress tasks go back to the queue in one UPDATE, a
+``status_change`` action is logged and one ``agent_down`` frame is
+broadcast. On start the heap is seeded from agents not yet OFFLINE.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Agent, AgentAction, AgentStatus, Task, TaskStatus
+from app.agent_cache import agent_cache
+from app.ingest import action_response
+from app.schemas import AgentBrief
+from app.task_queue import work_signal
+from app.view_cache import agent_changed, tasks_changed
+from app.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_TIMEOUT_SECONDS = 90
+# Pause before retrying after a database error
+RETRY_DELAY = 5.0
+
+
+# current_task_id of an agent whose row this process has not read
+_UNKNOWN = object()
+
+
+class _Beat:
+    __slots__ = ("seen", "seen_at", "persisted_at", "task_id")
+
+    def __init__(self, seen: float, seen_at: datetime, persisted_at: Optional[datetime] = None):
+        self.seen = seen  # time.monotonic()
+        self.seen_at = seen_at  # wall clock, for display and persistence
+        self.persisted_at = persisted_at
+        self.task_id = _UNKNOWN
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class LivenessTable:
+    def __init__(self, timeout: float = HEARTBEAT_TIMEOUT_SECONDS, persist_interval: Optional[float] = None):
+        self.timeout = timeout
+        self.persist_interval = (
+            get_settings().heartbeat_persist_interval if persist_interval is None else persist_interval
+        )
+        self._beats: dict[int, _Beat] = {}
+        self._lock = threading.Lock()
+
+    def beat(self, agent_id: int, persisted: Optional[datetime] = None) -> bool:
+        """Record a heartbeat. Returns True if the agent was not alive before.
+
+        ``persisted`` is the agent's stored ``last_heartbeat`` if the caller
+        has it; it only matters the first time this process sees the agent.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._beats.get(agent_id)
+            was_alive = self._alive(entry, persisted, now)
+            if entry is None:
+                entry = self._beats[agent_id] = _Beat(now, datetime.now(timezone.utc), persisted)
+            else:
+                entry.seen, entry.seen_at = now, datetime.now(timezone.utc)
+        return not was_alive
+
+    def needs_persist(self, agent_id: int) -> bool:
+        """True if the stored ``last_heartbeat`` is due for a refresh."""
+        with self._lock:
+            entry = self._beats.get(agent_id)
+            if entry is None:
+                return False
+            if entry.persisted_at is None:
+                return True
+            return (entry.seen_at - _aware(entry.persisted_at)).total_seconds() >= self.persist_interval
+
+    def task_changed(self, agent_id: int, task_id: Optional[int]) -> bool:
+        """True if a reported ``current_task_id`` differs from the stored one."""
+        if task_id is None:
+            return False
+        with self._lock:
+            entry = self._beats.get(agent_id)
+            return entry is None or entry.task_id is _UNKNOWN or entry.task_id != task_id
+
+    def persisted(self, agent_id: int, at: Optional[datetime], task_id: Optional[int]):
+        """Record the agent row's ``last_heartbeat`` and ``current_task_id``,
+        as just committed or read."""
+        with self._lock:
+            entry = self._beats.get(agent_id)
+            if entry is None:
+                return
+            if at is not None and (entry.persisted_at is None or _aware(at) > _aware(entry.persisted_at)):
+                entry.persisted_at = at
+            entry.task_id = task_id
+
+    def last_heartbeat(self, agent_id: int, persisted: Optional[datetime] = None) -> Optional[datetime]:
+        with self._lock:
+            entry = self._beats.get(agent_id)
+        if entry is None:
+            return persisted
+        if persisted is not None and _aware(persisted) > entry.seen_at:
+            return persisted
+        return entry.seen_at
+
+    def deadline(self, agent_id: int) -> Optional[float]:
+        """Monotonic time at which the agent stops being alive, if seen here."""
+        with self._lock:
+            entry = self._beats.get(agent_id)
+            return None if entry is None else entry.seen + self.timeout
+
+    def is_alive(self, agent_id: int, persisted: Optional[datetime] = None) -> bool:
+        with self._lock:
+            return self._alive(self._beats.get(agent_id), persisted, time.monotonic())
+
+    def _alive(self, entry: Optional[_Beat], persisted: Optional[datetime], now: float) -> bool:
+        if entry is not None and now - entry.seen < self.timeout:
+            return True
+        if persisted is None:
+            return False
+        return datetime.now(timezone.utc) - _aware(persisted) < timedelta(seconds=self.timeout)
+
+    def forget(self, agent_id: int):
+        with self._lock:
+            self._beats.pop(agent_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._beats.clear()
+
+
+liveness = LivenessTable()
+
+
+class LivenessSweeper:
+    def __init__(self, table: LivenessTable = liveness,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self._table = table
+        self._session_factory = session_factory
+        self._heap: list[tuple[float, int]] = []
+        self._watched: set[int] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ── lifecycle ────────────────────────────────────────────────
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._loop = self._wakeup = None
+        self._heap.clear()
+        self._watched.clear()
+
+    # ── scheduling ───────────────────────────────────────────────
+
+    def watch(self, agent_id: int):
+        """Track an agent that just came alive. A no-op while not running."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._push, agent_id, None)
+
+    def _push(self, agent_id: int, deadline: Optional[float]):
+        if deadline is None:
+            deadline = self._table.deadline(agent_id)
+            if deadline is None:
+                return
+        if agent_id in self._watched:
+            return
+        self._watched.add(agent_id)
+        heapq.heappush(self._heap, (deadline, agent_id))
+        if self._wakeup is not None and self._heap[0][1] == agent_id:
+            self._wakeup.set()
+
+    def _load_agents(self) -> list[tuple[int, Optional[datetime]]]:
+        with self._session_factory() as db:
+            return db.execute(
+                select(Agent.id, Agent.last_heartbeat).where(Agent.status != AgentStatus.OFFLINE)
+            ).all()
+
+    async def seed(self):
+        """Watch every agent that is not OFFLINE, from its stored heartbeat."""
+        rows = await asyncio.to_thread(self._load_agents)
+        now, wall = time.monotonic(), datetime.now(timezone.utc)
+        for agent_id, last_heartbeat in rows:
+            deadline = self._table.deadline(agent_id)
+            if deadline is None:
+                if last_heartbeat is None:
+                    continue  # registered, never seen alive
+                deadline = now + (_aware(last_heartbeat) - wall).total_seconds() + self._table.timeout
+            self._push(agent_id, deadline)
+
+    # ── sweeping ─────────────────────────────────────────────────
+
+    def mark_down(self, agent_id: int) -> Optional[dict]:
+        """Set a silent agent OFFLINE and requeue its in-progress tasks.
+
+        Returns the ``agent_down`` payload; None if the agent is gone or
+        already OFFLINE; or ``{"recheck_in": seconds}`` if its stored
+        heartbeat (written by another worker) shows it is still alive.
+        """
+        with self._session_factory() as db:
+            agent = db.query(Agent).filter(
+                Agent.id == agent_id, Agent.status != AgentStatus.OFFLINE,
+            ).first()
+            if agent is None:
+                return None
+            if self._table.is_alive(agent_id, agent.last_heartbeat):
+                remaining = [self._table.timeout - (datetime.now(timezone.utc)
+                                                    - _aware(agent.last_heartbeat)).total_seconds()
+                             ] if agent.last_heartbeat else []
+                deadline = self._table.deadline(agent_id)
+                if deadline is not None:
+                    remaining.append(deadline - time.monotonic())
+                return {"recheck_in": max(remaining)}
+            released = db.execute(
+                update(Task)
+                .where(Task.agent_id == agent_id, Task.status == TaskStatus.IN_PROGRESS)
+                .values(agent_id=None, status=TaskStatus.TODO, lease_expires_at=None)
+                .returning(Task.id, Task.project_id)
+            ).all()
+            old_status = agent.status
+            agent.status = AgentStatus.OFFLINE
+            agent.current_task_id = None
+            action = AgentAction(
+                agent_id=agent_id,
+                action_type="status_change",
+                summary=f"Status: {old_status.value} → offline (no heartbeat for {self._table.timeout:g}s)",
+                metadata_json=json.dumps({
+                    "from": old_status.value,
+                    "to": AgentStatus.OFFLINE.value,
+                    "released_task_ids": [r.id for r in released],
+                }),
+            )
+            db.add(action)
+            for task_id, project_id in released:
+                tasks_changed(db, project_id, task_id)
+            agent_changed(db, agent_id)  # cards it still holds show it OFFLINE
+            db.commit()
+            return {
+                "agent": AgentBrief(
+                    id=agent.id, name=agent.name, agent_type=agent.agent_type,
+                    status=agent.status, is_alive=False,
+                ).model_dump(mode="json"),
+                "action": action_response(action.id, {
+                    "agent_id": agent_id,
+                    "action_type": action.action_type,
+                    "summary": action.summary,
+                    "metadata_json": action.metadata_json,
+                    "created_at": action.created_at,
+                }, agent.name, agent.agent_type).model_dump(mode="json"),
+                "released": [(r.id, r.project_id) for r in released],
+            }
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Handle every deadline due at ``now``; returns agents marked down."""
+        now = time.monotonic() if now is None else now
+        down = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, agent_id = heapq.heappop(self._heap)
+            self._watched.discard(agent_id)
+            deadline = self._table.deadline(agent_id)
+            if deadline is not None and deadline > now:
+                self._push(agent_id, deadline)  # beat since it was scheduled
+                continue
+            event = await asyncio.to_thread(self.mark_down, agent_id)
+            if event is None:
+                continue
+            if "recheck_in" in event:
+                self._push(agent_id, now + event["recheck_in"])
+                continue
+            down += 1
+            released = event.pop("released")
+            agent_cache.set_status(agent_id, AgentStatus.OFFLINE)
+            for task_id, project_id in released:
+                work_signal.notify(project_id)
+            await manager.broadcast({
+                "type": "agent_down",
+                **event,
+                "released_task_ids": [task_id for task_id, _ in released],
+            })
+        return down
+
+    async def _run(self):
+        try:
+            await self.seed()
+        except Exception:
+            logger.exception("Could not load agents for the liveness sweeper")
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Liveness sweep failed")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            wait = self._heap[0][0] - time.monotonic() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=None if wait is None else max(0.0, wait))
+            except asyncio.TimeoutError:
+                pass
+
+
+liveness_sweeper = LivenessSweeper()
@@ -1,28 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text, inspect
-from app.database import engine, Base
-from app.routers import auth, projects, tasks, users, calendar, integrations, agents, coordination, runner, agent_tasks, hooks, briefs, harness
 from app.config import get_settings
+from app.routers import RouterRegistry
 
 settings = get_settings()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# The schema is managed by `python -m app.migrations upgrade`, run once per
+# deploy before the workers start; importing the app does no database work.
 
-# Additive migrations — safe to run multiple times.
-with engine.connect() as conn:
-    inspector = inspect(engine)
-    columns = [c["name"] for c in inspector.get_columns("tasks")]
-    if "correlation_id" not in columns:
-        conn.execute(text("ALTER TABLE tasks ADD COLUMN correlation_id VARCHAR(255)"))
-        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tasks_correlation_id ON tasks(correlation_id)"))
-        conn.commit()
 
-app = FastAPI(
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.database import async_engine, engine
+    from app.event_bus import create_event_bus
+    from app.ingest import action_pipeline
+    from app.liveness import liveness_sweeper
+    from app.reminders import reminder_scheduler
+    from app.task_queue import lease_sweeper
+    from app.websocket import manager
+
+    if settings.migrate_on_startup:
+        from app.migrations import upgrade
+        await asyncio.to_thread(upgrade)
+    await manager.start(create_event_bus(settings, engine))
+    if settings.action_write_behind:
+        action_pipeline.start()
+    if settings.reminder_dispatcher_enabled:
+        reminder_scheduler.start()
+    if settings.liveness_sweeper_enabled:
+        liveness_sweeper.start()
+    if settings.task_lease_sweeper_enabled:
+        lease_sweeper.start()
+    preload = asyncio.create_task(app.routers.preload())
+    yield
+    preload.cancel()
+    await lease_sweeper.stop()
+    await liveness_sweeper.stop()
+    await reminder_scheduler.stop()
+    await action_pipeline.stop()  # flushes queued actions
+    await manager.stop()
+    await async_engine.dispose()
+
+
+class ProjectHubAPI(FastAPI):
+    """Includes router groups from ``app.routers`` on first use, importing
+    them off the event loop so other requests keep being served."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.routers = RouterRegistry(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.routers.pending:
+            if scope["path"] == self.openapi_url:
+                await self.routers.preload()
+            else:
+                await self.routers.load_for(scope["path"])
+        await super().__call__(scope, receive, send)
+
+    def openapi(self):
+        self.routers.load_all()
+        return super().openapi()
+
+
+app = ProjectHubAPI(
     title="ProjectHub API",
     description="Project Management System API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -32,23 +79,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-# Include routers
-app.include_router(auth.router, prefix="/api")
-app.include_router(projects.router, prefix="/api")
-app.include_router(tasks.router, prefix="/api")
-app.include_router(users.router, prefix="/api")
-app.include_router(calendar.router, prefix="/api")
-app.include_router(integrations.router, prefix="/api")
-app.include_router(coordination.router, prefix="/api")
-app.include_router(runner.router, prefix="/api")
-app.include_router(agents.router, prefix="/api")
-app.include_router(agent_tasks.router, prefix="/api")
-app.include_router(hooks.router, prefix="/api")
-app.include_router(briefs.router, prefix="/api")
-app.include_router(harness.router, prefix="/api")
-
 
 @app.get("/")
 def root():
@@ -0,0 +1,192 @@
+"""Versioned schema migrations.
+
+Run once per deploy, before the API workers start (the app itself no
+longer touches the schema when it is imported)::
+
+    python -m app.migrations            # upgrade to the latest version
+    python -m app.migrations status
+
+Applied versions are recorded in ``schema_migrations``. Migration 1
+creates every table from the current models (``create_all`` skips the
+ones that exist), so later migrations only bring older databases up to
+date and must be idempotent: check for a column before adding it, use
+``CREATE INDEX IF NOT EXISTS``. Databases created before this runner
+existed start at version 0 and replay every step safely.
+
+On Postgres the run holds an advisory lock, so two deploys starting at
+once apply each migration only once, and ``DB_STATEMENT_TIMEOUT_MS`` is
+lifted for its transaction.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+# Arbitrary constant for pg_advisory_xact_lock
+LOCK_KEY = 0x70726A68
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def _create_tables(conn: Connection):
+    from app.database import Base
+    import app.models  # noqa: F401 — register tables on Base.metadata
+
+    Base.metadata.create_all(bind=conn)
+
+
+def _task_columns(conn: Connection):
+    columns = {c["name"] for c in inspect(conn).get_columns("tasks")}
+    if "correlation_id" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN correlation_id VARCHAR(255)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_tasks_correlation_id ON tasks(correlation_id)"))
+    if "lease_expires_at" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN lease_expires_at TIMESTAMP WITH TIME ZONE"))
+
+
+def _query_indexes(conn: Connection):
+    # create_all skips indexes on tables that already exist
+    from app.task_queue import CLAIMABLE_SQL
+
+    postgres = conn.dialect.name == "postgresql"
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_project_position_id ON tasks(project_id, position, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_project_start ON tasks(project_id, start_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_project_due ON tasks(project_id, due_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_agent_status ON tasks(agent_id, status)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_claimable ON tasks(priority, created_at, id, project_id) "
+        "WHERE " + CLAIMABLE_SQL
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_lease_expires_at ON tasks(lease_expires_at) "
+        "WHERE lease_expires_at IS NOT NULL"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_reminders_pending_remind_at ON reminders(remind_at) "
+        "WHERE is_sent = " + ("false" if postgres else "0")
+    ))
+    if postgres:
+        # Interval-overlap index for the calendar, as first shipped; see _calendar_open_spans
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_calendar_span ON tasks USING gist "
+            "(tstzrange(LEAST(start_date, due_date), GREATEST(start_date, due_date), '[]'))"
+        ))
+
+
+def _project_view_version(conn: Connection):
+    columns = {c["name"] for c in inspect(conn).get_columns("projects")}
+    if "view_version" not in columns:
+        conn.execute(text("ALTER TABLE projects ADD COLUMN view_version INTEGER NOT NULL DEFAULT 0"))
+
+
+def _calendar_open_spans(conn: Connection):
+    if conn.dialect.name != "postgresql":
+        return
+    # Expression must match calendar._task_span(): a missing date leaves that end open
+    conn.execute(text("DROP INDEX IF EXISTS ix_tasks_calendar_span"))
+    conn.execute(text(
+        "CREATE INDEX ix_tasks_calendar_span ON tasks USING gist (tstzrange("
+        "CASE WHEN start_date IS NOT NULL THEN LEAST(start_date, due_date) END, "
+        "CASE WHEN due_date IS NOT NULL THEN GREATEST(start_date, due_date) END, '[]'))"
+    ))
+
+
+def _task_sort_index(conn: Connection):
+    # Expression must match routers/tasks._sort_position()
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_tasks_project_sort_position_id ON tasks(project_id, (coalesce(position, 0)), id)"
+    ))
+
+
+def _claim_order_index(conn: Connection):
+    from app.task_queue import CLAIMABLE_SQL, URGENCY_RANK_SQL
+
+    # Ranked by urgency, so one claim statement covers every priority
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_tasks_claim_order ON tasks(({URGENCY_RANK_SQL}), created_at, id, project_id) "
+        "WHERE " + CLAIMABLE_SQL
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS ix_tasks_claimable"))
+
+
+# (version, name, apply) in order; append new migrations at the end
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "create tables", _create_tables),
+    (2, "tasks.correlation_id and tasks.lease_expires_at", _task_columns),
+    (3, "task and reminder query indexes", _query_indexes),
+    (4, "projects.view_version", _project_view_version),
+    (5, "open-ended calendar span index", _calendar_open_spans),
+    (6, "task pagination order for NULL positions", _task_sort_index),
+    (7, "claim queue ranked by urgency", _claim_order_index),
+]
+
+
+def _engine(engine: Optional[Engine]) -> Engine:
+    if engine is None:
+        from app.database import engine
+    return engine
+
+
+def applied_versions(conn: Connection) -> set[int]:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.scalars(select(schema_migrations.c.version)))
+
+
+def upgrade(engine: Optional[Engine] = None, target: Optional[int] = None) -> list[int]:
+    """Apply pending migrations up to ``target`` (default: all) in one
+    transaction. Returns the versions applied."""
+    applied_now = []
+    with _engine(engine).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Index builds outlast the request engines' statement_timeout;
+            # LOCAL ends with this transaction, before the connection is pooled again
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        schema_migrations.create(conn, checkfirst=True)
+        done = applied_versions(conn)
+        for version, name, apply in MIGRATIONS:
+            if version in done or (target is not None and version > target):
+                continue
+            apply(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=version, name=name, applied_at=datetime.now(timezone.utc),
+            ))
+            applied_now.append(version)
+    return applied_now
+
+
+def status(engine: Optional[Engine] = None) -> list[tuple[int, str, bool]]:
+    """``(version, name, applied)`` for every known migration."""
+    with _engine(engine).connect() as conn:
+        done = applied_versions(conn)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    parser.add_argument("--target", type=int, help="stop after this version (upgrade only)")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for version, name, applied in status():
+            print(f"{'x' if applied else ' '} {version:>4}  {name}")
+        return 0
+    applied = upgrade(target=args.target)
+    print(f"Applied {len(applied)} migration(s)" + (f": {', '.join(map(str, applied))}" if applied else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
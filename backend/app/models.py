@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Table, Enum as SQLEnum, Index
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 import enum
 
@@ -95,6 +96,9 @@ class Project(Base):
     icon = Column(String(50), default="folder")
     owner_id = Column(Integer, ForeignKey("users.id"))
     is_archived = Column(Boolean, default=False)
+    # Bumped by app.view_cache on every change to the project's board or Gantt
+    # data, so each worker can tell whether its cached views are current
+    view_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -105,6 +109,28 @@ class Project(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Board order (kanban, reorder)
+        Index("ix_tasks_project_position_id", "project_id", "position", "id"),
+        # Keyset pagination order for GET /api/tasks; must match tasks._sort_position
+        Index("ix_tasks_project_sort_position_id", "project_id", text("coalesce(position, 0)"), "id"),
+        # Calendar interval scans (see routers/calendar.py)
+        Index("ix_tasks_project_start", "project_id", "start_date"),
+        Index("ix_tasks_project_due", "project_id", "due_date"),
+        # An agent's claimed tasks (liveness sweeper)
+        Index("ix_tasks_agent_status", "agent_id", "status"),
+        # Agent work queue (see app/task_queue.py); the first expression must
+        # match URGENCY_RANK_SQL and the predicate CLAIMABLE_SQL
+        Index("ix_tasks_claim_order",
+              text("CASE priority WHEN 'URGENT' THEN 0 WHEN 'HIGH' THEN 1 WHEN 'MEDIUM' THEN 2 ELSE 3 END"),
+              "created_at", "id", "project_id",
+              postgresql_where=text("agent_id IS NULL AND parent_id IS NULL AND status IN ('BACKLOG', 'TODO')"),
+              sqlite_where=text("agent_id IS NULL AND parent_id IS NULL AND status IN ('BACKLOG', 'TODO')")),
+        # Lease expiry sweep
+        Index("ix_tasks_lease_expires_at", "lease_expires_at",
+              postgresql_where=text("lease_expires_at IS NOT NULL"),
+              sqlite_where=text("lease_expires_at IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
@@ -131,6 +157,7 @@ class Task(Base):
 
     # Agent assignment
     agent_id = Column(Integer, ForeignKey("agents.id", ondelete="SET NULL"), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # claim lease, see app/task_queue.py
 
     # Relationships
     project = relationship("Project", back_populates="tasks")
@@ -145,10 +172,28 @@ class Task(Base):
     )
     reminders = relationship("Reminder", back_populates="task", cascade="all, delete-orphan")
     agent = relationship("Agent", back_populates="assigned_tasks", foreign_keys=[agent_id])
+    capability_rows = relationship("TaskCapability", cascade="all, delete-orphan")
+    # Capabilities an agent needs to claim this task (see app/task_queue.py)
+    required_capabilities = association_proxy(
+        "capability_rows", "capability", creator=lambda name: TaskCapability(capability=name),
+    )
+
+
+class TaskCapability(Base):
+    """One capability a task requires; the primary key serves the claim-time subset check."""
+    __tablename__ = "task_capabilities"
+
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    capability = Column(String(100), primary_key=True)
 
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Pending reminders in due order, for the dispatcher
+        Index("ix_reminders_pending_remind_at", "remind_at",
+              postgresql_where=text("is_sent = false"), sqlite_where=text("is_sent = 0")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"))
@@ -0,0 +1,83 @@
+"""Connection pool instrumentation.
+
+``instrumented(QueuePool, metrics)`` returns a pool class that times
+every checkout (``Pool.connect``, which includes waiting for a free
+connection and opening a new one) and counts checkouts that had to go
+past ``pool_size`` into the overflow, and checkouts that timed out.
+``app.database`` builds its engines with these pools; ``GET
+/health/db-pool`` reports ``snapshot()`` for each. Figures are per
+worker process since the last restart.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool: Optional[Pool] = None
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if overflowed:
+                self.overflow_checkouts += 1
+
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_wait_ms_avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "checkout_wait_ms_max": round(self.wait_max * 1000, 3),
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            stats.update(
+                pool_size=pool.size(),
+                in_use=pool.checkedout(),
+                idle=pool.checkedin(),
+                overflow=max(0, pool.overflow()),
+            )
+        return stats
+
+
+def instrumented(pool_class: type[QueuePool], metrics: PoolMetrics) -> type[QueuePool]:
+    """Subclass of ``pool_class`` that reports checkouts to ``metrics``."""
+
+    class InstrumentedPool(pool_class):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metrics.pool = self  # also after dispose(), which recreates the pool
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                metrics.timed_out()
+                raise
+            # Past pool_size only if more than pool_size are out with this one;
+            # overflow() stays positive while any overflow connection is out
+            metrics.record(time.perf_counter() - start, self.checkedout() > self.size())
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
@@ -0,0 +1,112 @@
+"""Cache of authenticated users for JWT-protected endpoints.
+
+``get_current_user`` verifies the token on every request but used to load
+the user row each time as well; dashboards polling the feed, queue and
+agent endpoints repeat that lookup thousands of times an hour.
+``principal_cache`` keeps an immutable ``Principal`` snapshot of the user
+per token (its ``sub`` and ``exp``), so those requests skip the query.
+
+Entries expire after ``Settings.principal_cache_ttl`` seconds or when the
+token does, whichever comes first, and the least recently used ones are
+evicted past ``max_entries``. Changes to a user row (profile updates,
+password resets) invalidate every entry for that user. Like
+``app.agent_cache`` this is per process, so other workers see a change
+once the TTL runs out.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.config import get_settings
+
+MAX_CACHED_PRINCIPALS = 1024
+
+
+class Principal(NamedTuple):
+    """The authenticated user, detached from any session."""
+
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    avatar_color: Optional[str]
+    is_active: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.email, user.username, user.full_name,
+                   user.avatar_color, bool(user.is_active), user.created_at)
+
+
+class PrincipalCache:
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = MAX_CACHED_PRINCIPALS):
+        self.ttl = get_settings().principal_cache_ttl if ttl is None else ttl
+        self.max_entries = max_entries
+        # (user id, token exp) -> (expires_at, user id)
+        self._index: OrderedDict[tuple[int, Optional[int]], tuple[float, int]] = OrderedDict()
+        self._users: dict[int, Principal] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, token_exp: Optional[int]) -> Optional[Principal]:
+        key = (user_id, token_exp)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and entry[0] > now and user_id in self._users:
+                self._index.move_to_end(key)
+                self.hits += 1
+                return self._users[user_id]
+            if entry is not None:
+                del self._index[key]
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal, token_exp: Optional[int]):
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        key = (principal.id, token_exp)
+        with self._lock:
+            self._users[principal.id] = principal
+            self._index[key] = (time.monotonic() + ttl, principal.id)
+            self._index.move_to_end(key)
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+            if len(self._users) > self.max_entries:
+                live = {user_id for _, user_id in self._index.values()}
+                self._users = {i: p for i, p in self._users.items() if i in live}
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token for ``user_id``; call after committing a change to the row."""
+        with self._lock:
+            self._users.pop(user_id, None)
+            for k in [k for k, (_, i) in self._index.items() if i == user_id]:
+                del self._index[k]
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._users.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._index),
+            }
+
+
+principal_cache = PrincipalCache()
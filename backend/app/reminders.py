@@ -0,0 +1,184 @@
+"""Background dispatcher for task reminders.
+
+Pending reminders live in the ``reminders`` table behind a partial index
+on ``remind_at WHERE is_sent = false``. The scheduler keeps only the
+next window of them (up to ``HEAP_HORIZON`` ahead, at most
+``MAX_HEAP_SIZE`` rows) in an in-memory min-heap, sleeps until the
+earliest one is due, then claims every due row with a single
+``UPDATE ... RETURNING`` and pushes them over the WebSocket feed.
+
+The heap is only a timer: the claim re-checks ``is_sent`` in the
+database, so reminders deleted in the meantime are skipped and two
+processes never send the same reminder. On start (and whenever the
+window runs out) the heap is refilled from the index, which is also how
+reminders survive a restart.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Reminder, Task
+from app.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+# How far ahead the heap is filled from the database
+HEAP_HORIZON = timedelta(minutes=15)
+MAX_HEAP_SIZE = 10_000
+# Rows claimed per UPDATE ... RETURNING
+CLAIM_BATCH_SIZE = 500
+# Pause before retrying after a database error
+RETRY_DELAY = 5.0
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes for DateTime(timezone=True)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class ReminderScheduler:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._heap: list[tuple[float, int]] = []
+        self._horizon = 0.0  # heap holds every pending reminder due before this timestamp
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ── lifecycle ────────────────────────────────────────────────
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._loop = self._wakeup = None
+        self._heap.clear()
+        self._horizon = 0.0
+
+    # ── scheduling ───────────────────────────────────────────────
+
+    def schedule(self, reminder_id: int, remind_at: datetime):
+        """Note a newly created reminder. Safe to call from request threads;
+        a no-op while the scheduler is not running."""
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._push, reminder_id, _utc(remind_at).timestamp())
+
+    def _push(self, reminder_id: int, due: float):
+        # Reminders beyond the window are picked up by the next refill
+        if due < self._horizon:
+            heapq.heappush(self._heap, (due, reminder_id))
+            if self._wakeup is not None and self._heap[0][1] == reminder_id:
+                self._wakeup.set()
+
+    def _load_window(self, now: float) -> tuple[list, float]:
+        until = datetime.fromtimestamp(now, timezone.utc) + HEAP_HORIZON
+        with self._session_factory() as db:
+            rows = db.execute(
+                select(Reminder.id, Reminder.remind_at)
+                .where(Reminder.is_sent == False, Reminder.remind_at < until)
+                .order_by(Reminder.remind_at)
+                .limit(MAX_HEAP_SIZE)
+            ).all()
+        entries = [(_utc(r.remind_at).timestamp(), r.id) for r in rows]
+        if len(rows) == MAX_HEAP_SIZE:
+            # Window is full: stop it at the last loaded reminder
+            return entries, entries[-1][0]
+        return entries, until.timestamp()
+
+    async def refill(self, now: Optional[float] = None):
+        """Reload the heap with pending reminders due before ``now + HEAP_HORIZON``."""
+        now = time.time() if now is None else now
+        entries, horizon = await asyncio.to_thread(self._load_window, now)
+        # Keep anything pushed while the query ran; duplicates only cost a wakeup
+        entries.extend(e for e in self._heap if e[0] < horizon)
+        heapq.heapify(entries)
+        self._heap = entries
+        self._horizon = horizon
+
+    # ── dispatch ─────────────────────────────────────────────────
+
+    def claim_due(self, now: Optional[float] = None) -> list[dict]:
+        """Mark up to CLAIM_BATCH_SIZE due reminders sent and return them."""
+        now = time.time() if now is None else now
+        cutoff = datetime.fromtimestamp(now, timezone.utc)
+        due_ids = (
+            select(Reminder.id)
+            .where(Reminder.is_sent == False, Reminder.remind_at <= cutoff)
+            .order_by(Reminder.remind_at)
+            .limit(CLAIM_BATCH_SIZE)
+            .scalar_subquery()
+        )
+        with self._session_factory() as db:
+            claimed = db.execute(
+                update(Reminder)
+                .where(Reminder.id.in_(due_ids), Reminder.is_sent == False)
+                .values(is_sent=True)
+                .returning(Reminder.id, Reminder.task_id, Reminder.user_id,
+                           Reminder.remind_at, Reminder.message)
+            ).all()
+            titles = {}
+            if claimed:
+                task_ids = {r.task_id for r in claimed}
+                titles = dict(db.execute(select(Task.id, Task.title).where(Task.id.in_(task_ids))).all())
+            db.commit()
+        return [{
+            "id": r.id,
+            "task_id": r.task_id,
+            "task_title": titles.get(r.task_id),
+            "user_id": r.user_id,
+            "remind_at": _utc(r.remind_at).isoformat(),
+            "message": r.message,
+        } for r in claimed]
+
+    async def dispatch_due(self, now: Optional[float] = None) -> int:
+        """Claim and broadcast everything due at ``now``; returns the count sent."""
+        now = time.time() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            heapq.heappop(self._heap)
+        sent = 0
+        while True:
+            batch = await asyncio.to_thread(self.claim_due, now)
+            for reminder in batch:
+                await manager.broadcast({"type": "reminder", "reminder": reminder}, user_id=reminder["user_id"])
+            sent += len(batch)
+            if len(batch) < CLAIM_BATCH_SIZE:
+                return sent
+
+    async def _run(self):
+        while True:
+            try:
+                if time.time() >= self._horizon:
+                    await self.refill()
+                await self.dispatch_due()
+            except Exception:
+                logger.exception("Reminder dispatch failed")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            # Sleep until the earliest reminder, the end of the window, or a new earlier reminder
+            wake_at = min(self._heap[0][0], self._horizon) if self._heap else self._horizon
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, wake_at - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,188 @@
+"""Bulk task reordering and gap-based ranks for drag and drop.
+
+``apply_reorder`` validates a whole reorder payload with one ownership
+query and writes only the rows that actually change, as a single
+executemany UPDATE. ``move_task`` places one card between its new
+neighbours using gap-based ranks, so a move normally rewrites exactly
+one row; the column is respaced only when two neighbours are adjacent.
+New tasks get ``next_rank`` (a gap below the column's last card), so
+columns start out spaced. A NULL position ranks as 0, as everywhere
+tasks are listed.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.models import Task, Project, TaskStatus
+
+# Distance between neighbouring positions after a respace
+RANK_GAP = 1024
+
+_ROW_COLUMNS = (Task.id, Task.project_id, Task.parent_id, Task.status, Task.position)
+
+
+def _position():
+    """Rank of a card; NULL counts as 0, as in GET /api/tasks and the kanban."""
+    return func.coalesce(Task.position, 0)
+
+
+def _owned_rows(db: Session, user_id: int, ids: set[int]) -> dict:
+    if not ids:
+        return {}
+    rows = db.query(*_ROW_COLUMNS).join(Project, Project.id == Task.project_id).filter(
+        Task.id.in_(ids),
+        Project.owner_id == user_id,
+    ).all()
+    return {r.id: r for r in rows}
+
+
+def _status_change(mapping: dict, old_status: TaskStatus, new_status: TaskStatus):
+    """Set status and keep completed_at in step with it."""
+    if new_status == old_status:
+        return
+    mapping["status"] = new_status
+    if new_status == TaskStatus.DONE:
+        mapping["completed_at"] = datetime.utcnow()
+    elif old_status == TaskStatus.DONE:
+        mapping["completed_at"] = None
+
+
+def _write(db: Session, mappings: list[dict]):
+    if mappings:
+        # ORM bulk UPDATE by primary key: one executemany per distinct key set
+        db.execute(update(Task), mappings)
+
+
+def apply_reorder(db: Session, user_id: int, updates: list[dict]) -> dict[int, set]:
+    """Apply ``[{id, position, status?, parent_id?}]`` in bulk.
+
+    Returns ``{project_id: {task and parent ids touched}}`` so callers
+    can invalidate derived views. Raises HTTPException on bad input.
+    """
+    requested_ids: set[int] = set()
+    parent_ids: set[int] = set()
+    for item in updates:
+        if "id" not in item:
+            raise HTTPException(status_code=400, detail="Each update needs an id")
+        requested_ids.add(item["id"])
+        if item.get("parent_id") is not None:
+            parent_ids.add(item["parent_id"])
+
+    rows = _owned_rows(db, user_id, requested_ids | parent_ids)
+    for item in updates:
+        if item["id"] not in rows:
+            raise HTTPException(status_code=403, detail=f"Task {item['id']} not found or not owned by you")
+    if parent_ids - rows.keys():
+        raise HTTPException(status_code=403, detail="Parent task not found or not owned by you")
+
+    # Later entries for the same id win, as with the per-row loop
+    current = {task_id: {"position": r.position, "status": r.status, "parent_id": r.parent_id}
+               for task_id, r in rows.items()}
+    mappings: dict[int, dict] = {}
+    touched: dict[int, set] = {}
+    for item in updates:
+        task_id = item["id"]
+        state = current[task_id]
+        mapping = mappings.setdefault(task_id, {"id": task_id})
+
+        if "position" in item and item["position"] != state["position"]:
+            mapping["position"] = state["position"] = item["position"]
+        if "status" in item:
+            try:
+                new_status = TaskStatus(item["status"])
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid status: {item['status']}")
+            _status_change(mapping, state["status"], new_status)
+            state["status"] = new_status
+        if "parent_id" in item and item["parent_id"] != state["parent_id"]:
+            touched.setdefault(rows[task_id].project_id, set()).add(state["parent_id"])
+            mapping["parent_id"] = state["parent_id"] = item["parent_id"]
+        touched.setdefault(rows[task_id].project_id, set()).update((task_id, state["parent_id"]))
+
+    _write(db, [m for m in mappings.values() if len(m) > 1])
+    return touched
+
+
+def _column_filter(row, status: TaskStatus):
+    return _column(row.project_id, row.parent_id, status)
+
+
+def _column(project_id: int, parent_id: Optional[int], status: TaskStatus):
+    parent_clause = Task.parent_id == parent_id if parent_id is not None else Task.parent_id == None
+    return and_(Task.project_id == project_id, parent_clause, Task.status == status)
+
+
+def next_rank(db: Session, project_id: int, parent_id: Optional[int], status: TaskStatus) -> int:
+    """Position one RANK_GAP below the last card of a column."""
+    last = db.query(func.max(_position())).filter(_column(project_id, parent_id, status)).scalar()
+    return (last or 0) + RANK_GAP
+
+
+def _respace(db: Session, row, status: TaskStatus):
+    """Renumber a column at RANK_GAP intervals, keeping its current order."""
+    ids = [r.id for r in db.query(Task.id).filter(
+        _column_filter(row, status), Task.id != row.id,
+    ).order_by(_position(), Task.id)]
+    _write(db, [{"id": task_id, "position": (i + 1) * RANK_GAP} for i, task_id in enumerate(ids)])
+
+
+def _rank_after(db: Session, row, status: TaskStatus, after) -> Optional[int]:
+    """Position for ``row`` directly after ``after`` (None = top of column),
+    or None if there is no free integer between the neighbours."""
+    neighbours = db.query(_position()).filter(_column_filter(row, status), Task.id != row.id)
+    low = None
+    if after is not None:
+        low = after.position or 0
+        neighbours = neighbours.filter(or_(
+            _position() > low,
+            and_(_position() == low, Task.id > after.id),
+        ))
+    following = neighbours.order_by(_position(), Task.id).first()
+    high = following[0] if following is not None else None
+    if low is None and high is None:
+        return RANK_GAP
+    if low is None:
+        return high - RANK_GAP
+    if high is None:
+        return low + RANK_GAP
+    if high - low > 1:
+        return (low + high) // 2
+    return None
+
+
+def move_task(db: Session, user_id: int, task_id: int, status: Optional[TaskStatus],
+              after_id: Optional[int]) -> tuple[int, set]:
+    """Move one card to sit after ``after_id`` in the ``status`` column.
+
+    Returns ``(project_id, touched ids)``.
+    """
+    rows = _owned_rows(db, user_id, {task_id} | ({after_id} if after_id is not None else set()))
+    row = rows.get(task_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    target_status = status or row.status
+
+    after = None
+    if after_id is not None:
+        after = rows.get(after_id)
+        if (after is None or after.project_id != row.project_id or after.parent_id != row.parent_id
+                or after.status != target_status):
+            raise HTTPException(status_code=400, detail="after_id must be a card in the target column")
+
+    position = _rank_after(db, row, target_status, after)
+    touched = {task_id}
+    if position is None:
+        # Neighbours are adjacent: respace the column once, then the gap exists
+        _respace(db, row, target_status)
+        touched.update(r.id for r in db.query(Task.id).filter(_column_filter(row, target_status)))
+        after = db.query(*_ROW_COLUMNS).filter(Task.id == after_id).first() if after_id is not None else None
+        position = _rank_after(db, row, target_status, after)
+
+    mapping = {"id": task_id, "position": position}
+    _status_change(mapping, row.status, target_status)
+    _write(db, [mapping])
+    return row.project_id, touched
@@ -1 +1,77 @@
 # Routers
+"""Router registry.
+
+Importing a router module pulls in its schemas, models and services, so
+``app.main`` does not import them up front. ``ROUTERS`` maps a URL prefix
+to the router modules that serve it, in inclusion order; the app includes
+a group when the first request under its prefix arrives, and every group
+before building the OpenAPI schema. The lifespan also preloads the rest
+in the background once the worker is up, so most groups are in place
+before their first request. Imports run in a worker thread; only
+``include_router`` runs on the event loop. Groups under ``/api`` are
+mounted there. A new router goes into the group for its prefix (or a new
+one).
+"""
+
+import asyncio
+import importlib
+
+API_PREFIX = "/api"
+
+ROUTERS: dict[str, tuple[str, ...]] = {
+    "/api/auth": ("auth",),
+    "/api/projects": ("projects",),
+    "/api/tasks": ("tasks",),
+    "/api/users": ("users",),
+    "/api/calendar": ("calendar",),
+    "/api/integrations": ("integrations",),
+    # coordination's fixed paths (/agents/queue, ...) before agents' /agents/{id}
+    "/api/agents": ("coordination", "runner", "agents", "agent_tasks"),
+    "/api/hooks": ("hooks",),
+    "/api/briefs": ("briefs", "harness"),
+    "/health/db-pool": ("health",),  # plain /health stays in app.main: no imports
+}
+
+
+class RouterRegistry:
+    """Includes the groups in ``ROUTERS`` into ``app`` on demand."""
+
+    def __init__(self, app, routers: dict[str, tuple[str, ...]] = ROUTERS):
+        self.app = app
+        self.pending = dict(routers)
+
+    async def load_for(self, path: str):
+        for prefix in list(self.pending):
+            if path == prefix or path.startswith(prefix + "/"):
+                await self._load(prefix)
+
+    async def preload(self):
+        for prefix in list(self.pending):
+            await self._load(prefix)
+
+    def load_all(self):
+        """Synchronous ``preload``, for callers already off the hot path."""
+        for prefix in list(self.pending):
+            modules = self.pending.get(prefix)
+            if modules is not None:
+                self._include(prefix, self._import(modules))
+
+    async def _load(self, prefix: str):
+        modules = self.pending.get(prefix)
+        if modules is None:
+            return
+        # Concurrent first requests may both get here; importlib runs each
+        # module once and the first to come back does the including
+        loaded = await asyncio.to_thread(self._import, modules)
+        if prefix in self.pending:
+            self._include(prefix, loaded)
+
+    @staticmethod
+    def _import(modules: tuple[str, ...]) -> list:
+        return [importlib.import_module(f"{__name__}.{name}") for name in modules]
+
+    def _include(self, prefix: str, loaded: list):
+        mount = API_PREFIX if prefix.startswith(API_PREFIX + "/") else ""
+        for module in loaded:
+            self.app.include_router(module.router, prefix=mount)
+        del self.pending[prefix]
@@ -94,7 +94,7 @@ router = APIRouter(prefix="/agents", tags=["Agent Tasks"])
 
 
 @router.post("/{agent_id}/tasks", status_code=201)
-async def create_agent_task(
+def create_agent_task(
     agent_id: str,
     payload: AgentTaskCreate,
     db: Session = Depends(get_db),
@@ -150,7 +150,7 @@ async def create_agent_task(
 
 
 @router.get("/{agent_id}/tasks")
-async def get_agent_tasks(
+def get_agent_tasks(
     agent_id: str,
     status: Optional[str] = Query(None, description="Comma-separated status filter: pending,in_progress,completed"),
     db: Session = Depends(get_db),
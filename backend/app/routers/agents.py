@@ -2,22 +2,34 @@ import json
 import secrets
 import hashlib
 from datetime import datetime, timezone
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, Header
+from typing import Any, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query, Header
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import Agent, AgentAction, AgentStatus, GitHubLink
 from app.schemas import (
     AgentRegister, AgentResponse, AgentRegistered, AgentHeartbeat,
     AgentActionCreate, AgentActionResponse, AgentBrief,
+    ActionBatchItemResult, ActionBatchResponse, ActionQueued,
     GitHubLinkCreate, GitHubLinkResponse, OrchestratorStatus,
 )
 from app.auth import get_current_user
 from app.websocket import manager
+from app.agent_cache import AgentCredential, agent_cache
+from app.view_cache import agent_cards, agent_changed, cards_changed
+from app.liveness import liveness, liveness_sweeper
+from app.task_queue import normalize_capabilities, parse_capabilities, renew_leases
+from app.ingest import (
+    action_pipeline, action_response, broadcast_actions, check_batch_size, detach,
+    insert_actions, validation_message,
+)
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
-HEARTBEAT_TIMEOUT_SECONDS = 90
 MAX_AGENTS = 5
 
 
@@ -26,30 +38,18 @@ def _hash_key(key: str) -> str:
 
 
 def _agent_is_alive(agent: Agent) -> bool:
-    if not agent.last_heartbeat:
-        return False
-    hb = agent.last_heartbeat
-    if hb.tzinfo is None:
-        hb = hb.replace(tzinfo=timezone.utc)
-    delta = datetime.now(timezone.utc) - hb
-    return delta.total_seconds() < HEARTBEAT_TIMEOUT_SECONDS
+    return liveness.is_alive(agent.id, agent.last_heartbeat)
 
 
 def _to_response(agent: Agent) -> dict:
-    caps = []
-    if agent.capabilities:
-        try:
-            caps = json.loads(agent.capabilities)
-        except (json.JSONDecodeError, TypeError):
-            caps = []
     return AgentResponse(
         id=agent.id,
         name=agent.name,
         agent_type=agent.agent_type,
         status=agent.status,
-        capabilities=caps,
+        capabilities=list(parse_capabilities(agent.capabilities)),
         session_id=agent.session_id,
-        last_heartbeat=agent.last_heartbeat,
+        last_heartbeat=liveness.last_heartbeat(agent.id, agent.last_heartbeat),
         current_task_id=agent.current_task_id,
         current_task=agent.current_task,
         is_alive=_agent_is_alive(agent),
@@ -57,23 +57,54 @@ def _to_response(agent: Agent) -> dict:
     )
 
 
+def _credential(agent) -> AgentCredential:
+    return AgentCredential(agent.id, agent.name, agent.agent_type, agent.status, agent.session_id)
+
+
 def get_agent_by_key(db: Session, api_key: str) -> Agent:
+    """Load the agent row for an X-Agent-Key. For endpoints that modify it."""
     hashed = _hash_key(api_key)
     agent = db.query(Agent).filter(Agent.api_key == hashed).first()
     if not agent:
         raise HTTPException(status_code=401, detail="Invalid agent API key")
+    agent_cache.put(_credential(agent), key_hash=hashed)
     return agent
 
 
+_CREDENTIAL_COLUMNS = (Agent.id, Agent.name, Agent.agent_type, Agent.status, Agent.session_id)
+
+
+def _cache_credential(row, hashed: str) -> AgentCredential:
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid agent API key")
+    credential = _credential(row)
+    agent_cache.put(credential, key_hash=hashed)
+    return credential
+
+
+def authenticate_agent(db: Session, api_key: str) -> AgentCredential:
+    """Resolve an X-Agent-Key to a cached ``AgentCredential``, querying only on a miss."""
+    hashed = _hash_key(api_key)
+    credential = agent_cache.get_by_key(hashed)
+    if credential is None:
+        row = db.execute(select(*_CREDENTIAL_COLUMNS).where(Agent.api_key == hashed)).first()
+        credential = _cache_credential(row, hashed)
+    return credential
+
+
+async def authenticate_agent_async(db: AsyncSession, api_key: str) -> AgentCredential:
+    """``authenticate_agent`` for handlers on ``get_async_db``."""
+    hashed = _hash_key(api_key)
+    credential = agent_cache.get_by_key(hashed)
+    if credential is None:
+        row = (await db.execute(select(*_CREDENTIAL_COLUMNS).where(Agent.api_key == hashed))).first()
+        credential = _cache_credential(row, hashed)
+    return credential
+
+
 # ============ Agent Registration ============
 
-@router.post("/register", response_model=AgentRegistered)
-async def register_agent(
-    data: AgentRegister,
-    db: Session = Depends(get_db),
-    _user=Depends(get_current_user),
-):
-    """Register a new agent. Requires JWT auth. Returns the API key (shown only once)."""
+def _register_agent(db: Session, data: AgentRegister) -> tuple[Agent, str]:
     # Enforce MAX_AGENTS limit
     current_count = db.query(Agent).count()
     if current_count >= MAX_AGENTS:
@@ -82,13 +113,16 @@ async def register_agent(
             detail=f"Agent limit reached ({MAX_AGENTS}). Remove an agent before registering a new one.",
         )
 
+    if data.session_id:
+        agent_cache.invalidate_session(data.session_id)
+
     raw_key = secrets.token_urlsafe(32)
     hashed_key = _hash_key(raw_key)
 
     agent = Agent(
         name=data.name,
         agent_type=data.agent_type,
-        capabilities=json.dumps(data.capabilities),
+        capabilities=json.dumps(normalize_capabilities(data.capabilities)),
         session_id=data.session_id,
         api_key=hashed_key,
         metadata_json=json.dumps(data.metadata) if data.metadata else None,
@@ -96,6 +130,17 @@ async def register_agent(
     db.add(agent)
     db.commit()
     db.refresh(agent)
+    return agent, raw_key
+
+
+@router.post("/register", response_model=AgentRegistered)
+async def register_agent(
+    data: AgentRegister,
+    db: AsyncSession = Depends(get_async_db),
+    _user=Depends(get_current_user),
+):
+    """Register a new agent. Requires JWT auth. Returns the API key (shown only once)."""
+    agent, raw_key = await db.run_sync(_register_agent, data)
 
     await manager.broadcast({
         "type": "agent_registered",
@@ -114,61 +159,93 @@ async def heartbeat(
     agent_id: int,
     data: AgentHeartbeat,
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Agent heartbeat. Updates status and liveness. Key via X-Agent-Key header."""
-    agent = get_agent_by_key(db, x_agent_key)
+    """Agent heartbeat. Updates status and liveness. Key via X-Agent-Key header.
+
+    Liveness is tracked in memory (``app.liveness``). The agent row is only
+    written when the heartbeat changes something or the stored
+    ``last_heartbeat`` is due for a refresh; those writes also renew the
+    agent's task leases. A ``heartbeat`` frame is only broadcast when the
+    agent comes alive or changes status. An agent this process has not
+    heard from lately is checked against its stored row first, so a
+    restart or another worker's beats do not make it "come alive" again.
+    """
+    agent = await authenticate_agent_async(db, x_agent_key)
     if agent.id != agent_id:
         raise HTTPException(status_code=403, detail="Key does not match agent")
 
-    agent.last_heartbeat = datetime.now(timezone.utc)
+    stored = None
+    if not liveness.is_alive(agent.id):
+        # Silent as far as this process knows (first beat here, or beats
+        # went to other workers): the row says whether it really came alive
+        stored = (await db.execute(
+            select(Agent.last_heartbeat, Agent.current_task_id).where(Agent.id == agent.id)
+        )).first()
+    came_alive = liveness.beat(agent.id, stored.last_heartbeat if stored else None)
+    if stored:
+        liveness.persisted(agent.id, stored.last_heartbeat, stored.current_task_id)
+    new_status = data.status
+    if came_alive:
+        liveness_sweeper.watch(agent.id)
+        if new_status is None and agent.status == AgentStatus.OFFLINE:
+            new_status = AgentStatus.IDLE  # marked down by the sweeper, back now
+    status_changed = new_status is not None and new_status != agent.status
+    if not (came_alive or status_changed or liveness.task_changed(agent.id, data.current_task_id)
+            or liveness.needs_persist(agent.id)):
+        return {"ok": True}
+
+    row = await db.get(Agent, agent.id)
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid agent API key")
+    seen_at = liveness.last_heartbeat(agent.id)
+    row.last_heartbeat = seen_at
     status_action = None
-    if data.status:
-        old_status = agent.status
-        agent.status = data.status
-        if old_status != data.status:
-            status_action = AgentAction(
-                agent_id=agent.id,
-                action_type="status_change",
-                summary=f"Status: {old_status.value} → {data.status.value}",
-                metadata_json=json.dumps({"from": old_status.value, "to": data.status.value}),
-            )
-            db.add(status_action)
+    if new_status and row.status != new_status:
+        old_status = row.status
+        row.status = new_status
+        status_action = AgentAction(
+            agent_id=row.id,
+            action_type="status_change",
+            summary=f"Status: {old_status.value} → {new_status.value}",
+            metadata_json=json.dumps({"from": old_status.value, "to": new_status.value}),
+        )
+        db.add(status_action)
     if data.current_task_id is not None:
-        agent.current_task_id = data.current_task_id
-    db.commit()
-    db.refresh(agent)
+        row.current_task_id = data.current_task_id
+    await db.run_sync(renew_leases, agent.id)
     if status_action:
-        db.refresh(status_action)
+        await db.run_sync(agent_changed, agent.id)
+    await db.commit()
+    liveness.persisted(agent.id, seen_at, row.current_task_id)
+    status = new_status if status_action else agent.status
+    agent_cache.set_status(agent.id, status)
 
-    await manager.broadcast({
-        "type": "heartbeat",
-        "agent": AgentBrief(
-            id=agent.id, name=agent.name,
-            agent_type=agent.agent_type, status=agent.status,
-            is_alive=True,
-        ).model_dump(mode="json"),
-    })
-
-    # Broadcast status change as an agent_action so it appears in the live feed
-    if status_action:
+    if came_alive or status_action:
         await manager.broadcast({
-            "type": "agent_action",
-            "action": AgentActionResponse(
-                id=status_action.id,
-                agent_id=status_action.agent_id,
-                agent_name=agent.name,
-                agent_type=agent.agent_type,
-                action_type=status_action.action_type,
-                summary=status_action.summary,
-                detail=None,
-                task_id=None,
-                metadata={"from": json.loads(status_action.metadata_json)["from"],
-                          "to": json.loads(status_action.metadata_json)["to"]},
-                created_at=status_action.created_at,
+            "type": "heartbeat",
+            "agent": AgentBrief(
+                id=agent.id, name=agent.name,
+                agent_type=agent.agent_type, status=status,
+                is_alive=True,
             ).model_dump(mode="json"),
         })
 
+    # Broadcast status change as an agent_action so it appears in the live feed
+    if status_action:
+        await db.refresh(status_action)
+        await broadcast_actions([action_response(
+            status_action.id,
+            {
+                "agent_id": status_action.agent_id,
+                "action_type": status_action.action_type,
+                "summary": status_action.summary,
+                "metadata_json": status_action.metadata_json,
+                "created_at": status_action.created_at,
+            },
+            agent.name, agent.agent_type,
+        )])
+
     return {"ok": True}
 
 
@@ -195,6 +272,12 @@ def orchestrator_status(db: Session = Depends(get_db), _user=Depends(get_current
     )
 
 
+@router.get("/credential-cache")
+def credential_cache_stats(_user=Depends(get_current_user)):
+    """Hit rate of the X-Agent-Key / session_id lookup cache in this worker."""
+    return agent_cache.stats()
+
+
 @router.get("/actions/feed", response_model=list[AgentActionResponse])
 def global_action_feed(
     limit: int = Query(default=100, ge=1, le=500),
@@ -241,70 +324,135 @@ def get_agent(agent_id: int, db: Session = Depends(get_db), _user=Depends(get_cu
     return _to_response(agent)
 
 
-@router.delete("/{agent_id}")
-async def deregister_agent(agent_id: int, db: Session = Depends(get_db), _user=Depends(get_current_user)):
+def _deregister_agent(db: Session, agent_id: int) -> str:
     agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
+    name = agent.name
 
-    await manager.broadcast({
-        "type": "agent_deregistered",
-        "agent_id": agent_id,
-        "agent_name": agent.name,
-    })
-
+    # Its cards lose the agent (tasks.agent_id is SET NULL)
+    cards = agent_cards(db, agent_id)
     # Delete orphaned actions before deleting the agent
     db.query(AgentAction).filter(AgentAction.agent_id == agent_id).delete()
     db.delete(agent)
+    cards_changed(db, cards)
     db.commit()
+    agent_cache.invalidate_agent(agent_id)
+    liveness.forget(agent_id)
+    return name
+
+
+@router.delete("/{agent_id}")
+async def deregister_agent(agent_id: int, db: AsyncSession = Depends(get_async_db),
+                           _user=Depends(get_current_user)):
+    name = await db.run_sync(_deregister_agent, agent_id)
+    await manager.broadcast({
+        "type": "agent_deregistered",
+        "agent_id": agent_id,
+        "agent_name": name,
+    })
     return {"ok": True}
 
 
 # ============ Agent Actions ============
 
-@router.post("/{agent_id}/actions", response_model=AgentActionResponse)
+@router.post("/{agent_id}/actions", response_model=AgentActionResponse, responses={
+    202: {"model": ActionQueued, "description": "Queued for a batched write (``wait=false``)"},
+})
 async def create_action(
     agent_id: int,
     data: AgentActionCreate,
+    wait: bool = Query(default=True, description="Wait for the row to be stored and return it; "
+                                                 "false answers 202 once it is queued"),
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Agent logs an action (tool call, decision, etc.). Key via X-Agent-Key header."""
-    agent = get_agent_by_key(db, x_agent_key)
+    """Agent logs an action (tool call, decision, etc.). Key via X-Agent-Key header.
+
+    Returns the stored action. With ``wait=false`` and write-behind enabled
+    the request is acknowledged with 202 as soon as the action is queued.
+    """
+    agent = await authenticate_agent_async(db, x_agent_key)
     if agent.id != agent_id:
         raise HTTPException(status_code=403, detail="Key does not match agent")
 
-    action = AgentAction(
-        agent_id=agent_id,
-        action_type=data.action_type,
-        summary=data.summary,
-        detail=data.detail,
-        task_id=data.task_id,
-        metadata_json=json.dumps(data.metadata) if data.metadata else None,
-    )
+    row = {
+        "agent_id": agent_id,
+        "action_type": data.action_type,
+        "summary": data.summary,
+        "detail": data.detail,
+        "task_id": data.task_id,
+        "metadata_json": json.dumps(data.metadata) if data.metadata else None,
+    }
+
+    if action_pipeline.running:
+        stored = await action_pipeline.submit(row, agent.name, agent.agent_type)
+        if not wait:
+            detach(stored)
+            return JSONResponse(status_code=202, content=ActionQueued().model_dump())
+        return action_response(await stored, row, agent.name, agent.agent_type)
+
+    action = AgentAction(**row)
     db.add(action)
-    db.commit()
-    db.refresh(action)
+    await db.commit()
+    await db.refresh(action)
 
-    response = AgentActionResponse(
-        id=action.id,
-        agent_id=action.agent_id,
-        agent_name=agent.name,
-        agent_type=agent.agent_type,
-        action_type=action.action_type,
-        summary=action.summary,
-        detail=action.detail,
-        task_id=action.task_id,
-        metadata=data.metadata,
-        created_at=action.created_at,
-    )
+    response = action_response(action.id, {**row, "created_at": action.created_at},
+                               agent.name, agent.agent_type)
+    await broadcast_actions([response])
+    return response
 
-    await manager.broadcast({
-        "type": "agent_action",
-        "action": response.model_dump(mode="json"),
-    })
 
-    return response
+@router.post("/{agent_id}/actions:batch", response_model=ActionBatchResponse)
+async def create_actions_batch(
+    agent_id: int,
+    items: list[dict[str, Any]] = Body(...),
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Log many actions in one request and one transaction.
+
+    Each item is validated on its own; ``results[i]`` reports the stored
+    id or the error for ``items[i]``. Stored actions go out as a single
+    WebSocket frame.
+    """
+    check_batch_size(items)
+    agent = await authenticate_agent_async(db, x_agent_key)
+    if agent.id != agent_id:
+        raise HTTPException(status_code=403, detail="Key does not match agent")
+
+    created_at = datetime.now(timezone.utc)
+    results: list[Optional[ActionBatchItemResult]] = []
+    rows, row_indexes = [], []
+    for index, item in enumerate(items):
+        try:
+            data = AgentActionCreate.model_validate(item)
+        except ValidationError as exc:
+            results.append(ActionBatchItemResult(index=index, ok=False, error=validation_message(exc)))
+            continue
+        rows.append({
+            "agent_id": agent_id,
+            "action_type": data.action_type,
+            "summary": data.summary,
+            "detail": data.detail,
+            "task_id": data.task_id,
+            "metadata_json": json.dumps(data.metadata) if data.metadata else None,
+            "created_at": created_at,
+        })
+        row_indexes.append(index)
+        results.append(None)
+
+    stored = []
+    ids = await db.run_sync(insert_actions, rows) if rows else []
+    for index, row, action_id in zip(row_indexes, rows, ids):
+        if action_id is None:
+            results[index] = ActionBatchItemResult(index=index, ok=False, error="Could not be stored")
+            continue
+        results[index] = ActionBatchItemResult(index=index, ok=True, action_id=action_id)
+        stored.append(action_response(action_id, row, agent.name, agent.agent_type))
+
+    await broadcast_actions(stored)
+    return ActionBatchResponse(stored=len(stored), results=results)
 
 
 @router.get("/{agent_id}/actions", response_model=list[AgentActionResponse])
@@ -353,12 +501,12 @@ def list_actions(
 # ============ GitHub Links ============
 
 @router.post("/github-links", response_model=GitHubLinkResponse)
-async def create_github_link(
+def create_github_link(
     data: GitHubLinkCreate,
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
     db: Session = Depends(get_db),
 ):
-    get_agent_by_key(db, x_agent_key)  # validate key
+    authenticate_agent(db, x_agent_key)  # validate key
     link = GitHubLink(
         task_id=data.task_id,
         project_id=data.project_id,
@@ -383,7 +531,17 @@ def get_github_links(task_id: int, db: Session = Depends(get_db), _user=Depends(
 # ============ WebSocket Live Feed ============
 
 @router.websocket("/ws/feed")
-async def websocket_feed(websocket: WebSocket, token: Optional[str] = Query(None)):
+async def websocket_feed(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    topics: Optional[str] = Query(None, description="Comma-separated topics, e.g. agent:5,project:2,type:heartbeat"),
+):
+    """Live event feed.
+
+    With no topics every event is delivered. Clients can change their
+    subscription at any time by sending
+    ``{"subscribe": [...]}`` or ``{"unsubscribe": [...]}``.
+    """
     # Validate JWT before accepting the connection
     if not token:
         await websocket.close(code=4001, reason="Missing token")
@@ -396,14 +554,24 @@ async def websocket_feed(websocket: WebSocket, token: Optional[str] = Query(None
         if payload.get("sub") is None:
             await websocket.close(code=4001, reason="Invalid token")
             return
+        user_id = int(payload["sub"])
     except (JWTError, Exception):
         await websocket.close(code=4001, reason="Invalid token")
         return
 
-    await manager.connect(websocket)
+    await manager.connect(websocket, [t for t in (topics or "").split(",") if t], user_id=user_id)
     try:
         while True:
-            # Keep connection alive, ignore client messages
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            try:
+                request = json.loads(text)
+            except ValueError:
+                continue  # Keep-alive pings and other chatter
+            if not isinstance(request, dict):
+                continue
+            if isinstance(request.get("subscribe"), list):
+                manager.subscribe(websocket, map(str, request["subscribe"]))
+            if isinstance(request.get("unsubscribe"), list):
+                manager.unsubscribe(websocket, map(str, request["unsubscribe"]))
     except WebSocketDisconnect:
         manager.disconnect(websocket)
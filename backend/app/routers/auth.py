@@ -2,18 +2,22 @@ from datetime import timedelta, datetime, timezone
 import secrets
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User, PasswordResetToken
 from app.schemas import Token, UserCreate, UserResponse, LoginRequest
 from app.auth import (
-    authenticate_user,
+    Principal,
+    authenticate_user_async,
     create_access_token,
-    get_password_hash,
+    get_password_hash_async,
     get_current_user,
 )
 from app.config import get_settings
+from app.principal_cache import principal_cache
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 settings = get_settings()
@@ -34,11 +38,11 @@ class ResetPasswordRequest(BaseModel):
 
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    existing_user = db.query(User).filter(
+    existing_user = (await db.execute(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,7 +50,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -55,14 +59,14 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,7 +81,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: Principal = Depends(get_current_user)):
     return current_user
 
 
@@ -120,13 +124,13 @@ def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db
 
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
     # Find valid token
-    reset_token = db.query(PasswordResetToken).filter(
+    reset_token = (await db.execute(select(PasswordResetToken).where(
         PasswordResetToken.token == request.token,
         PasswordResetToken.used == False,
         PasswordResetToken.expires_at > datetime.now(timezone.utc)
-    ).first()
+    ))).scalars().first()
 
     if not reset_token:
         raise HTTPException(
@@ -135,12 +139,13 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
         )
 
     # Update password
-    user = db.query(User).filter(User.id == reset_token.user_id).first()
-    user.hashed_password = get_password_hash(request.new_password)
+    user = await db.get(User, reset_token.user_id)
+    user.hashed_password = await get_password_hash_async(request.new_password)
 
     # Mark token as used
     reset_token.used = True
 
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate_user(user.id)
 
     return {"message": "Password reset successfully"}
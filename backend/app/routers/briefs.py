@@ -39,9 +39,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from app.auth import get_current_user
+from app.auth import Principal, get_current_user
 from app.database import get_db
-from app.models import Brief, BriefBackpropEntry, BriefEdit, BriefStatus, User
+from app.models import Brief, BriefBackpropEntry, BriefEdit, BriefStatus
 from app.schemas import (
     BriefApprove,
     BriefApproveResponse,
@@ -320,7 +320,7 @@ def _write_to_pluteus(brief: Brief, markdown: str) -> tuple[Optional[str], Optio
 def create_brief(
     payload: BriefCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> BriefDetail:
     """Land a draft from aletheia-brief. Status starts PENDING."""
     brief = Brief(
@@ -348,7 +348,7 @@ def create_brief(
 @router.get("/pending", response_model=list[BriefSummary])
 def list_pending(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> list[BriefSummary]:
     """Briefs awaiting review, newest-first."""
     briefs = (
@@ -363,7 +363,7 @@ def list_pending(
 @router.get("/sent", response_model=list[BriefSummary])
 def list_sent(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> list[BriefSummary]:
     """Archive of approved briefs, newest-first."""
     briefs = (
@@ -382,7 +382,7 @@ def list_unreliable(
     threshold: float = 0.30,
     window_days: int = 30,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> list[UnreliableSourceOut]:
     """Surface Amphora nodes whose cumulative backprop decrement in the
     window exceeds ``threshold``. Helo reviews + approves retirement
@@ -425,7 +425,7 @@ def retire_unreliable_source(
     node_id: str,
     payload: RetireRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> RetireResponse:
     """Delete an Amphora node after Helo's explicit approval.
 
@@ -454,7 +454,7 @@ def retire_unreliable_source(
 def get_brief(
     brief_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> BriefDetail:
     brief = db.query(Brief).filter(Brief.id == brief_id).first()
     if not brief:
@@ -466,7 +466,7 @@ def get_brief(
 def diff_edits(
     brief_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> BriefDiffResponse:
     """Diff an approved brief's edits against its original for wp-10."""
     brief = db.query(Brief).filter(Brief.id == brief_id).first()
@@ -484,7 +484,7 @@ def approve_brief(
     brief_id: int,
     payload: BriefApprove,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> BriefApproveResponse:
     """Accept a brief, optionally with edits. Persist to Pluteus."""
     brief = db.query(Brief).filter(Brief.id == brief_id).first()
@@ -593,7 +593,7 @@ def reject_brief(
     brief_id: int,
     payload: BriefReject,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> BriefDetail:
     """Reject a brief with reason. Does not retry — next cycle generates fresh."""
     brief = db.query(Brief).filter(Brief.id == brief_id).first()
@@ -1,15 +1,67 @@
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy import case, or_, func, literal_column, select, union
 from app.database import get_db
-from app.models import Task, Project, User
-from app.schemas import TaskResponse, UserBrief
-from app.auth import get_current_user
+from app.models import Task, Project, TaskStatus
+from app.schemas import TaskResponse
+from app.auth import Principal, get_current_user
+from app.serializers import load_assignees
 
 router = APIRouter(prefix="/calendar", tags=["Calendar"])
 
+_CALENDAR_COLUMNS = (
+    Task.id, Task.title, Task.start_date, Task.due_date, Task.color,
+    Task.status, Task.priority, Task.project_id,
+)
+
+
+def _owned_projects(db: Session, user_id: int, project_id: Optional[int]) -> dict:
+    """{project_id: (name, color)} for the user's projects, optionally just one."""
+    query = db.query(Project.id, Project.name, Project.color).filter(Project.owner_id == user_id)
+    if project_id:
+        query = query.filter(Project.id == project_id)
+    return {p.id: (p.name, p.color) for p in query}
+
+
+def _task_span():
+    """A task's calendar interval as a Postgres range. A task with only a
+    start date runs on indefinitely, one with only a due date has been
+    running all along. Must match the ix_tasks_calendar_span expression."""
+    return func.tstzrange(
+        case((Task.start_date != None, func.least(Task.start_date, Task.due_date))),
+        case((Task.due_date != None, func.greatest(Task.start_date, Task.due_date))),
+        literal_column("'[]'"),
+    )
+
+
+def _overlapping_tasks(db: Session, project_ids, start: datetime, end: datetime) -> list:
+    """Top-level tasks whose [start_date, due_date] interval overlaps [start, end];
+    a missing date leaves that end of the interval open."""
+    def tasks_where(*clauses):
+        return select(*_CALENDAR_COLUMNS).where(
+            Task.project_id.in_(project_ids), Task.parent_id == None, *clauses,
+        )
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Served by the GiST index on the span expression
+        query = tasks_where(
+            or_(Task.start_date != None, Task.due_date != None),
+            _task_span().op("&&")(func.tstzrange(start, end, literal_column("'[]'"))),
+        )
+    else:
+        # One range scan per branch on (project_id, due_date) / (project_id, start_date);
+        # an OR in a single WHERE would only use the project_id prefix
+        query = union(
+            tasks_where(Task.due_date.between(start, end)),
+            tasks_where(Task.start_date.between(start, end)),
+            tasks_where(Task.start_date < start, Task.due_date > end),
+            tasks_where(Task.start_date < start, Task.due_date == None),
+            tasks_where(Task.due_date > end, Task.start_date == None),
+        )
+    return sorted(db.execute(query).all(), key=lambda t: t.id)
+
 
 @router.get("/tasks")
 def get_calendar_tasks(
@@ -17,56 +69,35 @@ def get_calendar_tasks(
     end_date: date = Query(..., description="End of date range"),
     project_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get tasks that fall within a date range for calendar view"""
     start_datetime = datetime.combine(start_date, datetime.min.time())
     end_datetime = datetime.combine(end_date, datetime.max.time())
 
-    query = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.project)
-    ).join(Project).filter(
-        Project.owner_id == current_user.id,
-        Task.parent_id == None,
-    )
-
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
+    projects = _owned_projects(db, current_user.id, project_id)
+    if not projects:
+        return []
 
     # Tasks that overlap with the date range
-    query = query.filter(
-        or_(
-            # Has due date in range
-            and_(Task.due_date >= start_datetime, Task.due_date <= end_datetime),
-            # Has start date in range
-            and_(Task.start_date >= start_datetime, Task.start_date <= end_datetime),
-            # Spans the entire range
-            and_(Task.start_date <= start_datetime, Task.due_date >= end_datetime),
-        )
-    )
-
-    tasks = query.all()
+    tasks = _overlapping_tasks(db, list(projects), start_datetime, end_datetime)
+    assignees = load_assignees(db, [t.id for t in tasks])
 
     # Format for calendar
     events = []
     for task in tasks:
+        project_name, project_color = projects[task.project_id]
         events.append({
             "id": task.id,
             "title": task.title,
             "start": task.start_date.isoformat() if task.start_date else task.due_date.isoformat() if task.due_date else None,
             "end": task.due_date.isoformat() if task.due_date else task.start_date.isoformat() if task.start_date else None,
-            "color": task.color or task.project.color,
+            "color": task.color or project_color,
             "status": task.status.value,
             "priority": task.priority.value,
             "project_id": task.project_id,
-            "project_name": task.project.name,
-            "assignees": [UserBrief(
-                id=u.id,
-                username=u.username,
-                full_name=u.full_name,
-                avatar_color=u.avatar_color
-            ).model_dump() for u in task.assignees],
+            "project_name": project_name,
+            "assignees": [u.model_dump() for u in assignees.get(task.id, [])],
         })
 
     return events
@@ -76,29 +107,31 @@ def get_calendar_tasks(
 def get_upcoming_deadlines(
     days: int = Query(7, description="Number of days to look ahead"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get tasks with upcoming deadlines"""
     now = datetime.utcnow()
     end_date = now + timedelta(days=days)
 
-    tasks = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.project)
-    ).join(Project).filter(
-        Project.owner_id == current_user.id,
-        Task.parent_id == None,
-        Task.due_date >= now,
-        Task.due_date <= end_date,
-        Task.status != "done"
-    ).order_by(Task.due_date).all()
+    projects = _owned_projects(db, current_user.id, None)
+    if not projects:
+        return []
+
+    tasks = db.execute(
+        select(*_CALENDAR_COLUMNS).where(
+            Task.project_id.in_(projects),
+            Task.parent_id == None,
+            Task.due_date.between(now, end_date),
+            Task.status != TaskStatus.DONE,
+        ).order_by(Task.due_date)
+    ).all()
 
     return [{
         "id": task.id,
         "title": task.title,
         "due_date": task.due_date.isoformat(),
         "priority": task.priority.value,
-        "project_name": task.project.name,
-        "project_color": task.project.color,
+        "project_name": projects[task.project_id][0],
+        "project_color": projects[task.project_id][1],
         "days_until": (task.due_date.date() - now.date()).days,
     } for task in tasks]
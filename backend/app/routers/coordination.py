@@ -1,12 +1,14 @@
 """Agent coordination: inter-agent messaging, task queue, and directives."""
 
+import asyncio
 import json
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import (
     Agent, AgentMessage, AgentDirective, AgentAction, Task, Project,
     AgentStatus, MessageStatus, DirectiveType, TaskStatus, TaskPriority,
@@ -19,22 +21,22 @@ from app.schemas import (
 )
 from app.auth import get_current_user
 from app.websocket import manager
-from app.routers.agents import get_agent_by_key, _agent_is_alive
+from app.view_cache import agent_changed, tasks_changed
+from app.agent_cache import agent_cache
+from app.ingest import action_response, broadcast_actions
+from app.task_queue import (
+    CLAIMABLE, MAX_CLAIM, MAX_CLAIM_WAIT, claim_tasks, normalize_capabilities, notify_if_claimable,
+    parse_capabilities, renew_leases, required_capabilities, urgency_rank, work_signal,
+)
+from app.routers.agents import authenticate_agent, get_agent_by_key, _agent_is_alive
 
 router = APIRouter(prefix="/agents", tags=["coordination"])
 
 
 # ============ Inter-Agent Messaging ============
 
-@router.post("/{agent_id}/messages", response_model=AgentMessageResponse)
-async def send_message(
-    agent_id: int,
-    data: AgentMessageCreate,
-    x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
-):
-    """Send a message from one agent to another. Authenticated by sender's API key."""
-    sender = get_agent_by_key(db, x_agent_key)
+def _send_message(db: Session, agent_id: int, data: AgentMessageCreate, x_agent_key: str) -> AgentMessageResponse:
+    sender = authenticate_agent(db, x_agent_key)
     if sender.id != agent_id:
         raise HTTPException(status_code=403, detail="Key does not match agent")
 
@@ -58,7 +60,7 @@ async def send_message(
     db.commit()
     db.refresh(msg)
 
-    response = AgentMessageResponse(
+    return AgentMessageResponse(
         id=msg.id,
         sender_id=msg.sender_id,
         sender_name=sender.name,
@@ -75,6 +77,17 @@ async def send_message(
         read_at=msg.read_at,
     )
 
+
+@router.post("/{agent_id}/messages", response_model=AgentMessageResponse)
+async def send_message(
+    agent_id: int,
+    data: AgentMessageCreate,
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Send a message from one agent to another. Authenticated by sender's API key."""
+    response = await db.run_sync(_send_message, agent_id, data, x_agent_key)
+
     # Broadcast to WebSocket so dashboard sees messages in real-time
     await manager.broadcast({
         "type": "agent_message",
@@ -85,7 +98,7 @@ async def send_message(
 
 
 @router.get("/{agent_id}/messages/inbox", response_model=list[AgentMessageResponse])
-async def get_inbox(
+def get_inbox(
     agent_id: int,
     status: Optional[MessageStatus] = None,
     limit: int = Query(default=50, ge=1, le=200),
@@ -106,7 +119,7 @@ async def get_inbox(
 
 
 @router.get("/{agent_id}/messages/outbox", response_model=list[AgentMessageResponse])
-async def get_outbox(
+def get_outbox(
     agent_id: int,
     limit: int = Query(default=50, ge=1, le=200),
     db: Session = Depends(get_db),
@@ -125,14 +138,14 @@ async def get_outbox(
 
 
 @router.post("/{agent_id}/messages/{message_id}/ack")
-async def acknowledge_message(
+def acknowledge_message(
     agent_id: int,
     message_id: int,
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
     db: Session = Depends(get_db),
 ):
     """Mark a message as read. Agent key auth."""
-    agent = get_agent_by_key(db, x_agent_key)
+    agent = authenticate_agent(db, x_agent_key)
     if agent.id != agent_id:
         raise HTTPException(status_code=403, detail="Key does not match agent")
 
@@ -150,7 +163,7 @@ async def acknowledge_message(
 
 
 @router.get("/messages/threads/{thread_id}", response_model=list[AgentMessageResponse])
-async def get_thread(
+def get_thread(
     thread_id: str,
     db: Session = Depends(get_db),
     _user=Depends(get_current_user),
@@ -168,18 +181,13 @@ async def get_thread(
 
 # ============ Agent Directives (User → Agent) ============
 
-@router.post("/{agent_id}/directives", response_model=AgentDirectiveResponse)
-async def create_directive(
-    agent_id: int,
-    data: AgentDirectiveCreate,
-    db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-):
-    """Send a directive to an agent from the dashboard. JWT auth."""
+def _create_directive(db: Session, agent_id: int, data: AgentDirectiveCreate,
+                      user) -> tuple[AgentDirectiveResponse, AgentActionResponse]:
     agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+    old_status = agent.status
     directive = AgentDirective(
         agent_id=agent_id,
         directive_type=data.directive_type,
@@ -210,7 +218,10 @@ async def create_directive(
         }),
     )
     db.add(action)
+    if agent.status != old_status:
+        agent_changed(db, agent.id)
     db.commit()
+    agent_cache.set_status(agent.id, agent.status)
     db.refresh(directive)
     db.refresh(action)
 
@@ -231,6 +242,29 @@ async def create_directive(
         acknowledged_at=directive.acknowledged_at,
         created_at=directive.created_at,
     )
+    return response, AgentActionResponse(
+        id=action.id,
+        agent_id=action.agent_id,
+        agent_name=agent.name,
+        agent_type=agent.agent_type,
+        action_type=action.action_type,
+        summary=action.summary,
+        detail=action.detail,
+        task_id=None,
+        metadata=json.loads(action.metadata_json) if action.metadata_json else None,
+        created_at=action.created_at,
+    )
+
+
+@router.post("/{agent_id}/directives", response_model=AgentDirectiveResponse)
+async def create_directive(
+    agent_id: int,
+    data: AgentDirectiveCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user),
+):
+    """Send a directive to an agent from the dashboard. JWT auth."""
+    response, action = await db.run_sync(_create_directive, agent_id, data, user)
 
     # Broadcast directive and status change
     await manager.broadcast({
@@ -239,25 +273,14 @@ async def create_directive(
     })
     await manager.broadcast({
         "type": "agent_action",
-        "action": AgentActionResponse(
-            id=action.id,
-            agent_id=action.agent_id,
-            agent_name=agent.name,
-            agent_type=agent.agent_type,
-            action_type=action.action_type,
-            summary=action.summary,
-            detail=action.detail,
-            task_id=None,
-            metadata=json.loads(action.metadata_json) if action.metadata_json else None,
-            created_at=action.created_at,
-        ).model_dump(mode="json"),
+        "action": action.model_dump(mode="json"),
     })
 
     return response
 
 
 @router.get("/{agent_id}/directives", response_model=list[AgentDirectiveResponse])
-async def list_directives(
+def list_directives(
     agent_id: int,
     pending_only: bool = Query(default=False),
     limit: int = Query(default=20, ge=1, le=100),
@@ -291,15 +314,8 @@ async def list_directives(
     return results
 
 
-@router.post("/{agent_id}/directives/{directive_id}/ack")
-async def acknowledge_directive(
-    agent_id: int,
-    directive_id: int,
-    x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
-):
-    """Agent acknowledges a directive. Agent key auth."""
-    agent = get_agent_by_key(db, x_agent_key)
+def _acknowledge_directive(db: Session, agent_id: int, directive_id: int, x_agent_key: str):
+    agent = authenticate_agent(db, x_agent_key)
     if agent.id != agent_id:
         raise HTTPException(status_code=403, detail="Key does not match agent")
 
@@ -314,6 +330,17 @@ async def acknowledge_directive(
     directive.acknowledged_at = datetime.now(timezone.utc)
     db.commit()
 
+
+@router.post("/{agent_id}/directives/{directive_id}/ack")
+async def acknowledge_directive(
+    agent_id: int,
+    directive_id: int,
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Agent acknowledges a directive. Agent key auth."""
+    await db.run_sync(_acknowledge_directive, agent_id, directive_id, x_agent_key)
+
     await manager.broadcast({
         "type": "directive_acknowledged",
         "agent_id": agent_id,
@@ -326,7 +353,7 @@ async def acknowledge_directive(
 # ============ Task Queue ============
 
 @router.get("/queue", response_model=list[TaskQueueItem])
-async def list_task_queue(
+def list_task_queue(
     project_id: Optional[int] = None,
     priority: Optional[TaskPriority] = None,
     limit: int = Query(default=50, ge=1, le=200),
@@ -338,23 +365,16 @@ async def list_task_queue(
     query = (
         db.query(Task)
         .options(joinedload(Task.project))
-        .filter(
-            Task.agent_id.is_(None),
-            Task.parent_id.is_(None),  # Only top-level tasks
-            Task.status.in_([TaskStatus.BACKLOG, TaskStatus.TODO]),
-        )
+        .filter(CLAIMABLE)  # top-level, unassigned, BACKLOG or TODO
     )
     if project_id:
         query = query.filter(Task.project_id == project_id)
     if priority:
         query = query.filter(Task.priority == priority)
 
-    # Priority order: urgent > high > medium > low
-    priority_order = [TaskPriority.URGENT, TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW]
-    tasks = query.order_by(
-        Task.priority.asc(),  # enum order matches urgency
-        Task.created_at.asc(),
-    ).limit(limit).all()
+    # Same order claims are handed out in: urgent > high > medium > low, oldest first
+    tasks = query.order_by(urgency_rank, Task.created_at.asc(), Task.id).limit(limit).all()
+    capabilities = required_capabilities(db, [t.id for t in tasks])
 
     return [TaskQueueItem(
         id=t.id,
@@ -364,52 +384,38 @@ async def list_task_queue(
         priority=t.priority,
         project_id=t.project_id,
         project_name=t.project.name if t.project else None,
-        required_capabilities=[],  # Can be extended via task metadata
+        required_capabilities=capabilities.get(t.id, []),
         estimated_hours=t.estimated_hours,
         created_at=t.created_at,
     ) for t in tasks]
 
 
-@router.post("/queue/claim")
-async def claim_task(
-    data: TaskClaimRequest,
-    x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
-):
-    """Agent claims the highest-priority unassigned task matching its capabilities.
-    Returns the claimed task or 204 if nothing available."""
+def _claimant(db: Session, x_agent_key: str, data: TaskClaimRequest) -> tuple[int, list[str]]:
+    """The claiming agent's id and the capabilities it may claim with."""
     agent = get_agent_by_key(db, x_agent_key)
-
     if not _agent_is_alive(agent):
         raise HTTPException(status_code=409, detail="Agent must send heartbeat before claiming tasks")
 
-    query = (
-        db.query(Task)
-        .options(joinedload(Task.project))
-        .filter(
-            Task.agent_id.is_(None),
-            Task.parent_id.is_(None),
-            Task.status.in_([TaskStatus.BACKLOG, TaskStatus.TODO]),
-        )
-    )
-    if data.project_id:
-        query = query.filter(Task.project_id == data.project_id)
-    if data.priorities:
-        query = query.filter(Task.priority.in_(data.priorities))
-
-    task = query.order_by(Task.priority.asc(), Task.created_at.asc()).first()
-
-    if not task:
-        raise HTTPException(status_code=204, detail="No tasks available")
-
-    # Claim it
-    task.agent_id = agent.id
-    task.status = TaskStatus.IN_PROGRESS
-    agent.current_task_id = task.id
+    # Only tasks whose requirements the agent (narrowed by the request) covers
+    capabilities = set(parse_capabilities(agent.capabilities))
+    if data.required_capabilities is not None:
+        capabilities &= set(normalize_capabilities(data.required_capabilities))
+    return agent.id, sorted(capabilities)
+
+
+def _record_claims(db: Session, agent_id: int, task_ids: list[int]):
+    """Point the agent at its claimed tasks, log the claims and commit.
+    Returns the events to broadcast and the response items."""
+    agent = db.get(Agent, agent_id)
+    tasks = {t.id: t for t in db.query(Task).options(joinedload(Task.project)).filter(Task.id.in_(task_ids))}
+    tasks = [tasks[i] for i in task_ids]
+    task_capabilities = required_capabilities(db, task_ids)
+    old_status = agent.status
+    agent.current_task_id = tasks[0].id
     agent.status = AgentStatus.WORKING
 
-    # Log the claim
-    action = AgentAction(
+    # Log the claims
+    actions = [AgentAction(
         agent_id=agent.id,
         action_type="task_update",
         summary=f"Claimed task: {task.title}",
@@ -419,36 +425,33 @@ async def claim_task(
             "task_id": task.id,
             "project_id": task.project_id,
         }),
-    )
-    db.add(action)
+    ) for task in tasks]
+    db.add_all(actions)
+    if agent.status != old_status:
+        agent_changed(db, agent.id)  # every card showing the agent, the claimed ones included
+    else:
+        for task in tasks:
+            tasks_changed(db, task.project_id, task.id)
     db.commit()
-    db.refresh(task)
-    db.refresh(action)
+    agent_cache.set_status(agent.id, agent.status)
 
-    await manager.broadcast({
+    events = [{
         "type": "task_claimed",
         "agent_id": agent.id,
         "agent_name": agent.name,
         "task_id": task.id,
         "task_title": task.title,
-    })
-    await manager.broadcast({
-        "type": "agent_action",
-        "action": AgentActionResponse(
-            id=action.id,
-            agent_id=action.agent_id,
-            agent_name=agent.name,
-            agent_type=agent.agent_type,
-            action_type=action.action_type,
-            summary=action.summary,
-            detail=None,
-            task_id=task.id,
-            metadata=json.loads(action.metadata_json),
-            created_at=action.created_at,
-        ).model_dump(mode="json"),
-    })
-
-    return TaskQueueItem(
+        "project_id": task.project_id,
+    } for task in tasks]
+    responses = [action_response(a.id, {
+        "agent_id": a.agent_id,
+        "action_type": a.action_type,
+        "summary": a.summary,
+        "task_id": a.task_id,
+        "metadata_json": a.metadata_json,
+        "created_at": a.created_at,
+    }, agent.name, agent.agent_type) for a in actions]
+    items = [TaskQueueItem(
         id=task.id,
         title=task.title,
         description=task.description,
@@ -456,19 +459,92 @@ async def claim_task(
         priority=task.priority,
         project_id=task.project_id,
         project_name=task.project.name if task.project else None,
-        required_capabilities=[],
+        required_capabilities=task_capabilities.get(task.id, []),
         estimated_hours=task.estimated_hours,
         created_at=task.created_at,
-    )
+        lease_expires_at=task.lease_expires_at,
+    ) for task in tasks]
+    return events, responses, items
+
+
+async def _claim(db: AsyncSession, x_agent_key: str, data: TaskClaimRequest, count: int,
+                 wait: float = 0) -> list[TaskQueueItem]:
+    # The claim helpers are shared with sync code; run_sync keeps their
+    # round trips on the async driver instead of blocking the loop
+    agent_id, capabilities = await db.run_sync(_claimant, x_agent_key, data)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        # Register before checking so work created in between still wakes us
+        waiter = work_signal.waiter(data.project_id, data.priorities) if wait else None
+        task_ids = await db.run_sync(claim_tasks, agent_id, count, project_id=data.project_id,
+                                     priorities=data.priorities, capabilities=capabilities)
+        if task_ids or waiter is None or loop.time() >= deadline:
+            break
+        await db.rollback()  # hand the connection back while idle
+        try:
+            await asyncio.wait_for(waiter.future, deadline - loop.time())
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            work_signal.discard(waiter, data.project_id)
+    if waiter is not None:
+        work_signal.discard(waiter, data.project_id)
+    if not task_ids:
+        await db.rollback()
+        raise HTTPException(status_code=204, detail="No tasks available")
 
+    events, actions, items = await db.run_sync(_record_claims, agent_id, task_ids)
+    for event in events:
+        await manager.broadcast(event)
+    await broadcast_actions(actions)
+    return items
 
-@router.post("/queue/release")
-async def release_task(
-    task_id: int = Query(...),
+
+@router.post("/queue/claim")
+async def claim_task(
+    data: TaskClaimRequest,
+    wait: float = Query(default=0, ge=0, le=MAX_CLAIM_WAIT, description="Long-poll for up to this many seconds"),
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Agent claims the highest-priority unassigned task matching its capabilities.
+    Returns the claimed task or 204 if nothing available. With ``wait``,
+    blocks up to that many seconds for a task to become available."""
+    return (await _claim(db, x_agent_key, data, 1, wait))[0]
+
+
+@router.post("/queue/claim-many", response_model=list[TaskQueueItem])
+async def claim_many_tasks(
+    data: TaskClaimRequest,
+    count: int = Query(..., ge=1, le=MAX_CLAIM),
+    wait: float = Query(default=0, ge=0, le=MAX_CLAIM_WAIT, description="Long-poll for up to this many seconds"),
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Claim up to ``count`` tasks at once, most urgent first.
+    Returns the claimed tasks or 204 if nothing available; ``wait`` as for /queue/claim."""
+    return await _claim(db, x_agent_key, data, count, wait)
+
+
+@router.post("/queue/renew")
+def renew_task_lease(
+    task_id: Optional[int] = Query(default=None, description="Renew one task; default all of the agent's"),
+    seconds: Optional[float] = Query(default=None, ge=1, le=24 * 3600),
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
     db: Session = Depends(get_db),
 ):
-    """Agent releases a claimed task back to the queue."""
+    """Extend the lease on claimed tasks (heartbeats also renew them)."""
+    agent = authenticate_agent(db, x_agent_key)
+    expires_at = renew_leases(db, agent.id, task_id=task_id, seconds=seconds)
+    if expires_at is None:
+        raise HTTPException(status_code=404, detail="Task not found or not claimed by this agent")
+    db.commit()
+    return {"ok": True, "lease_expires_at": expires_at}
+
+
+def _release_task(db: Session, task_id: int, x_agent_key: str) -> dict:
     agent = get_agent_by_key(db, x_agent_key)
 
     task = db.query(Task).filter(Task.id == task_id, Task.agent_id == agent.id).first()
@@ -477,6 +553,8 @@ async def release_task(
 
     task.agent_id = None
     task.status = TaskStatus.TODO
+    task.lease_expires_at = None
+    old_status = agent.status
     if agent.current_task_id == task_id:
         agent.current_task_id = None
         agent.status = AgentStatus.IDLE
@@ -489,26 +567,35 @@ async def release_task(
         metadata_json=json.dumps({"action": "release", "task_id": task.id}),
     )
     db.add(action)
+    tasks_changed(db, task.project_id, task.id)
+    if agent.status != old_status:
+        agent_changed(db, agent.id)
     db.commit()
+    agent_cache.set_status(agent.id, agent.status)
+    notify_if_claimable(task)
 
-    await manager.broadcast({
+    return {
         "type": "task_released",
         "agent_id": agent.id,
         "agent_name": agent.name,
         "task_id": task.id,
         "task_title": task.title,
-    })
-
-    return {"ok": True}
+        "project_id": task.project_id,
+    }
 
 
-@router.post("/queue/complete")
-async def complete_task(
+@router.post("/queue/release")
+async def release_task(
     task_id: int = Query(...),
     x_agent_key: str = Header(..., alias="X-Agent-Key"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Agent marks a claimed task as complete."""
+    """Agent releases a claimed task back to the queue."""
+    await manager.broadcast(await db.run_sync(_release_task, task_id, x_agent_key))
+    return {"ok": True}
+
+
+def _complete_task(db: Session, task_id: int, x_agent_key: str) -> dict:
     agent = get_agent_by_key(db, x_agent_key)
 
     task = db.query(Task).filter(Task.id == task_id, Task.agent_id == agent.id).first()
@@ -517,6 +604,8 @@ async def complete_task(
 
     task.status = TaskStatus.DONE
     task.completed_at = datetime.now(timezone.utc)
+    task.lease_expires_at = None
+    old_status = agent.status
     if agent.current_task_id == task_id:
         agent.current_task_id = None
         agent.status = AgentStatus.IDLE
@@ -529,16 +618,31 @@ async def complete_task(
         metadata_json=json.dumps({"action": "complete", "task_id": task.id}),
     )
     db.add(action)
+    if agent.status != old_status:
+        agent_changed(db, agent.id)  # includes the completed card
+    else:
+        tasks_changed(db, task.project_id, task.id)
     db.commit()
+    agent_cache.set_status(agent.id, agent.status)
 
-    await manager.broadcast({
+    return {
         "type": "task_completed",
         "agent_id": agent.id,
         "agent_name": agent.name,
         "task_id": task.id,
         "task_title": task.title,
-    })
+        "project_id": task.project_id,
+    }
+
 
+@router.post("/queue/complete")
+async def complete_task(
+    task_id: int = Query(...),
+    x_agent_key: str = Header(..., alias="X-Agent-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Agent marks a claimed task as complete."""
+    await manager.broadcast(await db.run_sync(_complete_task, task_id, x_agent_key))
     return {"ok": True}
 
 
@@ -16,9 +16,8 @@ import os
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
-from app.auth import get_current_user
+from app.auth import Principal, get_current_user
 from app.database import get_db
-from app.models import User
 
 try:
     from aletheia.harness import (
@@ -59,7 +58,7 @@ def harness_metrics(
     end: str = Query(..., description="ISO week, e.g. 2026-W17"),
     reader: str | None = None,
     project: str | None = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> dict:
     """Aggregate match/miss/hallucination rates for a week range."""
@@ -82,7 +81,7 @@ def harness_metrics(
 @router.get("/gate")
 def harness_gate(
     as_of: str | None = Query(None, description="ISO 8601 timestamp; default now"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ) -> dict:
     """Trailing-6-week auto-ship gate status. Returns
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+
+from app.auth import get_current_user
+from app.database import pool_metrics
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/db-pool")
+def db_pool_stats(_user=Depends(get_current_user)):
+    """Connection checkouts, wait times, overflow and timeouts per engine in this worker."""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
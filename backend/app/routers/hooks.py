@@ -8,12 +8,20 @@ for localhost hooks.
 """
 
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from datetime import datetime, timezone
+from typing import Any, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models import Agent, AgentAction
-from app.schemas import ToolActionHookEvent, AgentActionResponse
-from app.websocket import manager
+from app.schemas import ToolActionHookEvent, ActionBatchItemResult, ActionBatchResponse
+from app.agent_cache import AgentCredential, agent_cache
+from app.ingest import (
+    action_pipeline, action_response, broadcast_actions, check_batch_size, detach,
+    insert_actions, validation_message,
+)
 
 router = APIRouter(prefix="/hooks", tags=["hooks"])
 
@@ -21,21 +29,28 @@ router = APIRouter(prefix="/hooks", tags=["hooks"])
 NOISY_TOOLS = {"Read", "Glob", "Grep", "LS", "Search", "Skill"}
 
 
-@router.post("/tool-action", status_code=200)
-async def tool_action_hook(
-    event: ToolActionHookEvent,
-    db: Session = Depends(get_db),
-):
-    """Accept a Claude Code PostToolUse hook event and log it as an agent action."""
-    # Skip noisy tools server-side
-    if event.tool_name in NOISY_TOOLS:
-        return {"ok": True, "skipped": True, "reason": "noisy_tool"}
+async def _agents_by_session(db: AsyncSession, session_ids: set[str]) -> dict[str, AgentCredential]:
+    """Resolve hook session ids through ``agent_cache``, querying only the misses."""
+    agents, missing = {}, set()
+    for session_id in session_ids:
+        agent = agent_cache.get_by_session(session_id)
+        if agent is None:
+            missing.add(session_id)
+        else:
+            agents[session_id] = agent
+    if missing:
+        rows = await db.execute(select(
+            Agent.id, Agent.name, Agent.agent_type, Agent.status, Agent.session_id,
+        ).where(Agent.session_id.in_(missing)))
+        for row in rows:
+            agent = AgentCredential(row.id, row.name, row.agent_type, row.status, row.session_id)
+            agent_cache.put(agent)
+            agents[row.session_id] = agent
+    return agents
 
-    # Look up agent by session_id
-    agent = db.query(Agent).filter(Agent.session_id == event.session_id).first()
-    if not agent:
-        raise HTTPException(status_code=404, detail="Unknown session_id")
 
+def _hook_row(event: ToolActionHookEvent, agent: AgentCredential) -> dict:
+    """agent_actions row for a PostToolUse event."""
     # Build summary from tool name + truncated input
     input_preview = ""
     if event.tool_input:
@@ -43,37 +58,107 @@ async def tool_action_hook(
         input_preview = raw[:200]
     summary = f"{event.tool_name}: {input_preview}" if input_preview else event.tool_name
 
-    action = AgentAction(
-        agent_id=agent.id,
-        action_type="tool_call",
-        summary=summary[:500],
-        detail=json.dumps(event.tool_input) if event.tool_input else None,
-        metadata_json=json.dumps({
+    return {
+        "agent_id": agent.id,
+        "action_type": "tool_call",
+        "summary": summary[:500],
+        "detail": json.dumps(event.tool_input) if event.tool_input else None,
+        "metadata_json": json.dumps({
             "tool_name": event.tool_name,
             "hook_type": "PostToolUse",
             "session_id": event.session_id,
         }),
-    )
+    }
+
+
+@router.post("/tool-action", status_code=200)
+async def tool_action_hook(
+    event: ToolActionHookEvent,
+    wait: bool = Query(default=True, description="Wait for the row to be stored; false skips action_id"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Accept a Claude Code PostToolUse hook event and log it as an agent action.
+
+    With ``wait=false`` and write-behind enabled the action is only queued
+    and no ``action_id`` is returned.
+    """
+    # Skip noisy tools server-side
+    if event.tool_name in NOISY_TOOLS:
+        return {"ok": True, "skipped": True, "reason": "noisy_tool"}
+
+    # Look up agent by session_id
+    agent = (await _agents_by_session(db, {event.session_id})).get(event.session_id)
+    if not agent:
+        raise HTTPException(status_code=404, detail="Unknown session_id")
+
+    row = _hook_row(event, agent)
+
+    if action_pipeline.running:
+        stored = await action_pipeline.submit(row, agent.name, agent.agent_type)
+        if not wait:
+            detach(stored)
+            return {"ok": True, "queued": True}
+        return {"ok": True, "action_id": await stored}
+
+    action = AgentAction(**row)
     db.add(action)
-    db.commit()
-    db.refresh(action)
-
-    response = AgentActionResponse(
-        id=action.id,
-        agent_id=action.agent_id,
-        agent_name=agent.name,
-        agent_type=agent.agent_type,
-        action_type=action.action_type,
-        summary=action.summary,
-        detail=action.detail,
-        task_id=None,
-        metadata=json.loads(action.metadata_json),
-        created_at=action.created_at,
-    )
-
-    await manager.broadcast({
-        "type": "agent_action",
-        "action": response.model_dump(mode="json"),
-    })
+    await db.commit()
+    await db.refresh(action)
+
+    await broadcast_actions([action_response(action.id, {**row, "created_at": action.created_at},
+                                             agent.name, agent.agent_type)])
 
     return {"ok": True, "action_id": action.id}
+
+
+@router.post("/tool-action:batch", response_model=ActionBatchResponse)
+async def tool_action_hook_batch(
+    events: list[dict[str, Any]] = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Log many PostToolUse events in one request and one transaction.
+
+    Events may come from different sessions. ``results[i]`` reports the
+    stored id, a skip (noisy tool) or the error for ``events[i]``; stored
+    actions go out as a single WebSocket frame.
+    """
+    check_batch_size(events)
+    results: list[Optional[ActionBatchItemResult]] = []
+    parsed: dict[int, ToolActionHookEvent] = {}
+    for index, item in enumerate(events):
+        try:
+            event = ToolActionHookEvent.model_validate(item)
+        except ValidationError as exc:
+            results.append(ActionBatchItemResult(index=index, ok=False, error=validation_message(exc)))
+            continue
+        if event.tool_name in NOISY_TOOLS:
+            results.append(ActionBatchItemResult(index=index, ok=True, skipped=True))
+            continue
+        parsed[index] = event
+        results.append(None)
+
+    session_ids = {e.session_id for e in parsed.values()}
+    agents = await _agents_by_session(db, session_ids)
+
+    created_at = datetime.now(timezone.utc)
+    rows, row_indexes = [], []
+    for index, event in parsed.items():
+        agent = agents.get(event.session_id)
+        if agent is None:
+            results[index] = ActionBatchItemResult(index=index, ok=False, error="Unknown session_id")
+            continue
+        rows.append({**_hook_row(event, agent), "created_at": created_at})
+        row_indexes.append(index)
+
+    stored = []
+    ids = await db.run_sync(insert_actions, rows) if rows else []
+    for index, row, action_id in zip(row_indexes, rows, ids):
+        if action_id is None:
+            results[index] = ActionBatchItemResult(index=index, ok=False, error="Could not be stored")
+            continue
+        results[index] = ActionBatchItemResult(index=index, ok=True, action_id=action_id)
+        agent = agents[parsed[index].session_id]
+        stored.append(action_response(action_id, row, agent.name, agent.agent_type))
+
+    await broadcast_actions(stored)
+    return ActionBatchResponse(stored=len(stored), results=results)
@@ -3,8 +3,7 @@
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 import httpx
-from app.models import User
-from app.auth import get_current_user
+from app.auth import Principal, get_current_user
 from app.config import get_settings
 
 router = APIRouter(prefix="/integrations/pluteus", tags=["Pluteus Integration"])
@@ -32,7 +31,7 @@ def _check_configured():
 
 
 @router.get("/status")
-def integration_status(current_user: User = Depends(get_current_user)):
+def integration_status(current_user: Principal = Depends(get_current_user)):
     """Check if Pluteus integration is configured and reachable."""
     if not settings.pluteus_url:
         return {"configured": False, "reachable": False}
@@ -55,7 +54,7 @@ def integration_status(current_user: User = Depends(get_current_user)):
 @router.get("/decisions")
 def get_decisions(
     correlation_id: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Proxy decisions from Pluteus API."""
     _check_configured()
@@ -82,7 +81,7 @@ def get_decisions(
 @router.get("/decisions/{decision_id}")
 def get_decision(
     decision_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Proxy a single decision from Pluteus API."""
     _check_configured()
@@ -104,7 +103,7 @@ def get_decision(
 @router.get("/search")
 def search_pluteus(
     q: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     """Proxy search to Pluteus API."""
     _check_configured()
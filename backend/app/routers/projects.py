@@ -1,20 +1,36 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 from app.database import get_db
-from app.models import Project, Task, User, TaskStatus
+from app.models import Project, Task, TaskStatus
 from app.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
-from app.auth import get_current_user
+from app.auth import Principal, get_current_user
+from app.view_cache import project_changed
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
 
+def get_task_counts(db: Session, project_ids: List[int]) -> dict[int, tuple[int, int]]:
+    """Top-level (task_count, completed_count) per project in one grouped query"""
+    if not project_ids:
+        return {}
+    rows = db.query(
+        Task.project_id,
+        func.count(Task.id),
+        func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)),
+    ).filter(
+        Task.project_id.in_(project_ids),
+        Task.parent_id == None,
+    ).group_by(Task.project_id).all()
+    return {project_id: (total, completed or 0) for project_id, total, completed in rows}
+
+
 @router.get("/", response_model=List[ProjectResponse])
 def get_projects(
     include_archived: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     query = db.query(Project).filter(Project.owner_id == current_user.id)
     if not include_archived:
@@ -23,14 +39,10 @@ def get_projects(
     projects = query.all()
 
     # Add task counts
+    counts = get_task_counts(db, [p.id for p in projects])
     result = []
     for project in projects:
-        task_count = db.query(Task).filter(Task.project_id == project.id, Task.parent_id == None).count()
-        completed_count = db.query(Task).filter(
-            Task.project_id == project.id,
-            Task.parent_id == None,
-            Task.status == TaskStatus.DONE
-        ).count()
+        task_count, completed_count = counts.get(project.id, (0, 0))
 
         project_dict = {
             "id": project.id,
@@ -53,7 +65,7 @@ def get_projects(
 def create_project(
     project_data: ProjectCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     db_project = Project(
         **project_data.model_dump(),
@@ -69,7 +81,7 @@ def create_project(
 def get_project(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -78,12 +90,7 @@ def get_project(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    task_count = db.query(Task).filter(Task.project_id == project.id, Task.parent_id == None).count()
-    completed_count = db.query(Task).filter(
-        Task.project_id == project.id,
-        Task.parent_id == None,
-        Task.status == TaskStatus.DONE
-    ).count()
+    task_count, completed_count = get_task_counts(db, [project.id]).get(project.id, (0, 0))
 
     return ProjectResponse(
         id=project.id,
@@ -104,7 +111,7 @@ def update_project(
     project_id: int,
     project_data: ProjectUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -117,6 +124,7 @@ def update_project(
     for key, value in update_data.items():
         setattr(project, key, value)
 
+    project_changed(db, project_id)
     db.commit()
     db.refresh(project)
     return project
@@ -126,7 +134,7 @@ def update_project(
 def delete_project(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -136,5 +144,6 @@ def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
 
     db.delete(project)
+    project_changed(db, project_id)
     db.commit()
     return {"message": "Project deleted"}
@@ -1,89 +1,98 @@
+import base64
+import json
 from typing import List, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func, or_
 from app.database import get_db
 from app.models import Task, Project, User, TaskStatus, TaskPriority, Reminder, Agent
 from app.schemas import (
-    TaskCreate, TaskUpdate, TaskResponse, TaskBrief, UserBrief,
-    GanttTask, KanbanBoard, KanbanColumn,
+    TaskCreate, TaskUpdate, TaskMove, TaskResponse, TaskBrief,
+    GanttTask, KanbanBoard,
     ReminderCreate, ReminderResponse, AgentBrief
 )
-from app.auth import get_current_user
+from app.auth import Principal, get_current_user
+from app.serializers import TASK_COLUMNS, serialize_tasks, build_gantt
+from app.config import get_settings
+from app.reminders import reminder_scheduler
+from app.view_cache import board_cache, cards_changed, gantt_cache, tasks_changed
+from app.task_queue import normalize_capabilities, notify_if_claimable, work_signal
+from app.reorder import RANK_GAP, apply_reorder, move_task, next_rank
+from app.dependency_graph import DependencyCycleError, reschedule
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
+settings = get_settings()
 
 
 def get_task_response(task: Task, db: Session) -> TaskResponse:
-    """Convert Task model to TaskResponse with computed fields"""
-    subtask_count = len(task.subtasks) if task.subtasks else 0
-    subtask_completed = len([s for s in task.subtasks if s.status == TaskStatus.DONE]) if task.subtasks else 0
-
-    return TaskResponse(
-        id=task.id,
-        title=task.title,
-        description=task.description,
-        status=task.status,
-        priority=task.priority,
-        color=task.color,
-        start_date=task.start_date,
-        due_date=task.due_date,
-        completed_at=task.completed_at,
-        estimated_hours=task.estimated_hours,
-        parent_id=task.parent_id,
-        position=task.position,
-        project_id=task.project_id,
-        created_at=task.created_at,
-        updated_at=task.updated_at,
-        assignees=[UserBrief(
-            id=u.id,
-            username=u.username,
-            full_name=u.full_name,
-            avatar_color=u.avatar_color
-        ) for u in task.assignees],
-        subtasks=[TaskBrief(
-            id=s.id,
-            title=s.title,
-            status=s.status,
-            priority=s.priority
-        ) for s in task.subtasks] if task.subtasks else [],
-        dependencies=[TaskBrief(
-            id=d.id,
-            title=d.title,
-            status=d.status,
-            priority=d.priority
-        ) for d in task.dependencies] if task.dependencies else [],
-        subtask_count=subtask_count,
-        subtask_completed=subtask_completed,
-        agent_id=task.agent_id,
-        agent=AgentBrief(
-            id=task.agent.id,
-            name=task.agent.name,
-            agent_type=task.agent.agent_type,
-            status=task.agent.status,
-            is_alive=False,  # Simplified — liveness requires heartbeat check
-        ) if task.agent else None,
-    )
+    """Convert a single Task to TaskResponse with computed fields"""
+    return serialize_tasks(db, [task])[0]
+
+
+# Scalar columns a client may request via ?fields= (no nested collections)
+PROJECTABLE_FIELDS = {c.name for c in TASK_COLUMNS}
+
+
+def _sort_position():
+    """Pagination sort key: a NULL position sorts as 0 on every backend.
+    Must match the ix_tasks_project_sort_position_id expression."""
+    return func.coalesce(Task.position, 0)
+
+
+def _encode_cursor(position: Optional[int], task_id: int) -> str:
+    raw = json.dumps([position, task_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[Optional[int], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (None if position is None else int(position)), int(task_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    response: Response,
     project_id: Optional[int] = None,
     status: Optional[TaskStatus] = None,
     priority: Optional[TaskPriority] = None,
     correlation_id: Optional[str] = Query(None, description="Filter by correlation ID"),
     parent_id: Optional[int] = Query(None, description="Filter by parent task (null for top-level)"),
     include_subtasks: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit to return every match"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    fields: Optional[str] = Query(None, description="Comma-separated scalar fields to return, e.g. id,title,status"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    query = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).join(Project).filter(Project.owner_id == current_user.id)
+    """List tasks ordered by (position, id), a NULL position counting as 0.
+
+    With ``limit`` the result is one keyset page; the cursor for the next
+    page is returned in the ``X-Next-Cursor`` header (absent on the last
+    page). With ``fields`` only the named columns are selected and no
+    assignees/subtasks/dependencies are loaded.
+    """
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in PROJECTABLE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown or non-scalar fields: {', '.join(unknown)}")
+        # position/id are always fetched so the cursor can be built
+        columns = [Task.__table__.c[f] for f in dict.fromkeys(selected + ["position", "id"])]
+    else:
+        selected = None
+        # Plain rows; related collections are loaded in bulk by serialize_tasks
+        columns = TASK_COLUMNS
+
+    query = db.query(*columns).select_from(Task).join(Project).filter(
+        Project.owner_id == current_user.id
+    )
 
     if project_id:
         query = query.filter(Task.project_id == project_id)
@@ -98,15 +107,41 @@ def get_tasks(
     elif not include_subtasks:
         query = query.filter(Task.parent_id == None)
 
-    tasks = query.order_by(Task.position).all()
-    return [get_task_response(task, db) for task in tasks]
+    if cursor:
+        after_position, after_id = _decode_cursor(cursor)
+        after = func.coalesce(after_position, 0)
+        query = query.filter(or_(
+            _sort_position() > after,
+            and_(_sort_position() == after, Task.id > after_id),
+        ))
+
+    query = query.order_by(_sort_position(), Task.id)
+    if limit:
+        tasks = query.limit(limit + 1).all()
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            response.headers["X-Next-Cursor"] = _encode_cursor(tasks[-1].position, tasks[-1].id)
+    else:
+        tasks = query.all()
+
+    if selected is None:
+        return serialize_tasks(db, tasks)
+
+    # Projection bypasses response_model validation, so the cursor header is copied over
+    headers = {}
+    if "X-Next-Cursor" in response.headers:
+        headers["X-Next-Cursor"] = response.headers["X-Next-Cursor"]
+    return JSONResponse(
+        content=jsonable_encoder([{f: getattr(t, f) for f in selected} for t in tasks]),
+        headers=headers,
+    )
 
 
 @router.post("/", response_model=TaskResponse)
 def create_task(
     task_data: TaskCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     # Verify project ownership
     project = db.query(Project).filter(
@@ -123,8 +158,13 @@ def create_task(
             raise HTTPException(status_code=400, detail="Agent not found")
 
     # Create task
-    task_dict = task_data.model_dump(exclude={"assignee_ids", "dependency_ids", "subtasks"})
+    task_dict = task_data.model_dump(exclude={"assignee_ids", "dependency_ids", "subtasks", "required_capabilities"})
+    if task_dict["position"] is None:
+        task_dict["position"] = next_rank(db, task_data.project_id, task_data.parent_id,
+                                          task_data.status or TaskStatus.BACKLOG)
     db_task = Task(**task_dict)
+    if task_data.required_capabilities:
+        db_task.required_capabilities = normalize_capabilities(task_data.required_capabilities)
 
     # Add assignees
     if task_data.assignee_ids:
@@ -141,26 +181,21 @@ def create_task(
 
     # Create subtasks
     if task_data.subtasks:
-        for st in task_data.subtasks:
+        for i, st in enumerate(task_data.subtasks):
             subtask = Task(
                 title=st.title,
                 status=TaskStatus.DONE if st.completed else TaskStatus.TODO,
                 priority=TaskPriority.MEDIUM,
                 project_id=task_data.project_id,
                 parent_id=db_task.id,
+                position=(i + 1) * RANK_GAP,
             )
             db.add(subtask)
 
+    tasks_changed(db, db_task.project_id, db_task.id, db_task.parent_id)
     db.commit()
     db.refresh(db_task)
-
-    # Re-fetch with eager loading to avoid N+1
-    db_task = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).filter(Task.id == db_task.id).first()
+    notify_if_claimable(db_task)
 
     return get_task_response(db_task, db)
 
@@ -169,14 +204,9 @@ def create_task(
 def get_task(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    task = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).join(Project).filter(
+    task = db.query(Task).join(Project).filter(
         Task.id == task_id,
         Project.owner_id == current_user.id
     ).first()
@@ -192,13 +222,12 @@ def update_task(
     task_id: int,
     task_data: TaskUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     task = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
+        selectinload(Task.assignees),
+        selectinload(Task.subtasks),
+        selectinload(Task.dependencies),
     ).join(Project).filter(
         Task.id == task_id,
         Project.owner_id == current_user.id
@@ -215,6 +244,7 @@ def update_task(
         if subtask_inputs is not None:
             existing_subtasks = {s.id: s for s in task.subtasks} if task.subtasks else {}
             seen_ids = set()
+            last_position = max((s.position or 0 for s in existing_subtasks.values()), default=0)
 
             for st in subtask_inputs:
                 new_status = TaskStatus.DONE if st["completed"] else TaskStatus.TODO
@@ -234,7 +264,9 @@ def update_task(
                         priority=TaskPriority.MEDIUM,
                         project_id=task.project_id,
                         parent_id=task.id,
+                        position=last_position + RANK_GAP,
                     )
+                    last_position = new_sub.position
                     db.add(new_sub)
 
             # Delete removed subtasks
@@ -256,6 +288,12 @@ def update_task(
             dependencies = db.query(Task).filter(Task.id.in_(dependency_ids)).all()
             task.dependencies = dependencies
 
+    # Handle required capabilities separately
+    if "required_capabilities" in update_data:
+        capabilities = update_data.pop("required_capabilities")
+        if capabilities is not None:
+            task.required_capabilities = normalize_capabilities(capabilities)
+
     # Validate agent_id if provided
     if "agent_id" in update_data and update_data["agent_id"] is not None:
         agent = db.query(Agent).filter(Agent.id == update_data["agent_id"]).first()
@@ -269,19 +307,17 @@ def update_task(
         elif update_data["status"] != TaskStatus.DONE and task.status == TaskStatus.DONE:
             task.completed_at = None
 
+    # Old parent loses this card from its subtask counts if the task moves
+    old_parent_id = task.parent_id
+
     # Update other fields
     for key, value in update_data.items():
         setattr(task, key, value)
 
+    tasks_changed(db, task.project_id, task.id, task.parent_id, old_parent_id)
     db.commit()
-
-    # Re-fetch with eager loading to avoid N+1/DetachedInstanceError
-    task = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).filter(Task.id == task_id).first()
+    db.refresh(task)
+    notify_if_claimable(task)
 
     return get_task_response(task, db)
 
@@ -290,12 +326,12 @@ def update_task(
 def delete_task(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     task = db.query(Task).options(
-        joinedload(Task.subtasks),
-        joinedload(Task.assignees),
-        joinedload(Task.dependencies),
+        selectinload(Task.subtasks),
+        selectinload(Task.assignees),
+        selectinload(Task.dependencies),
     ).join(Project).filter(
         Task.id == task_id,
         Project.owner_id == current_user.id
@@ -304,7 +340,12 @@ def delete_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    # Cards that list this task as a dependency need re-rendering too
+    touched = [task.id, task.parent_id] + [d.id for d in task.dependents]
+    project_id = task.project_id
+
     db.delete(task)
+    tasks_changed(db, project_id, *touched)
     db.commit()
     return {"message": "Task deleted"}
 
@@ -314,8 +355,9 @@ def delete_task(
 def get_gantt_tasks(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    """Top-level tasks with progress and dependency ids, cached per project."""
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -324,61 +366,28 @@ def get_gantt_tasks(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    tasks = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).filter(
-        Task.project_id == project_id,
-        Task.parent_id == None,
-    ).order_by(Task.position).all()
-
-    gantt_tasks = []
-    for task in tasks:
-        # Calculate progress based on subtasks or status
-        if task.subtasks:
-            completed = len([s for s in task.subtasks if s.status == TaskStatus.DONE])
-            progress = (completed / len(task.subtasks)) * 100 if task.subtasks else 0
-        else:
-            status_progress = {
-                TaskStatus.BACKLOG: 0,
-                TaskStatus.TODO: 10,
-                TaskStatus.IN_PROGRESS: 50,
-                TaskStatus.REVIEW: 80,
-                TaskStatus.DONE: 100,
-            }
-            progress = status_progress.get(task.status, 0)
-
-        gantt_tasks.append(GanttTask(
-            id=task.id,
-            title=task.title,
-            start_date=task.start_date,
-            due_date=task.due_date,
-            status=task.status,
-            priority=task.priority,
-            color=task.color or project.color,
-            progress=progress,
-            dependencies=[d.id for d in task.dependencies],
-            assignees=[UserBrief(
-                id=u.id,
-                username=u.username,
-                full_name=u.full_name,
-                avatar_color=u.avatar_color
-            ) for u in task.assignees],
-            parent_id=task.parent_id,
-        ))
+    def build() -> list:
+        return [t.model_dump(mode="json") for t in build_gantt(db, project_id, project.color)]
 
-    return gantt_tasks
+    if settings.gantt_cache_enabled:
+        payload = gantt_cache.get(project_id, project.view_version, build)
+    else:
+        payload = build()
+    return JSONResponse(content=payload)
 
 
 # ============ Kanban View ============
 @router.get("/kanban/{project_id}", response_model=KanbanBoard)
 def get_kanban_board(
     project_id: int,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    """Board columns for a project, served from the cached snapshot.
+
+    Sends an ``ETag``; a matching ``If-None-Match`` gets a 304.
+    """
     # Verify project ownership
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -387,37 +396,15 @@ def get_kanban_board(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Get all top-level tasks
-    tasks = db.query(Task).options(
-        joinedload(Task.assignees),
-        joinedload(Task.subtasks),
-        joinedload(Task.dependencies),
-        joinedload(Task.agent),
-    ).filter(
-        Task.project_id == project_id,
-        Task.parent_id == None
-    ).order_by(Task.position).all()
-
-    # Group by status
-    columns = []
-    status_config = [
-        (TaskStatus.BACKLOG, "Backlog", None),
-        (TaskStatus.TODO, "To Do", None),
-        (TaskStatus.IN_PROGRESS, "In Progress", 3),  # WIP limit
-        (TaskStatus.REVIEW, "Review", None),
-        (TaskStatus.DONE, "Done", None),
-    ]
-
-    for status, title, wip_limit in status_config:
-        status_tasks = [get_task_response(t, db) for t in tasks if t.status == status]
-        columns.append(KanbanColumn(
-            status=status,
-            title=title,
-            tasks=status_tasks,
-            wip_limit=wip_limit,
-        ))
+    snapshot = board_cache.get(db, project_id, project.view_version)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if snapshot.etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
 
-    return KanbanBoard(project_id=project_id, columns=columns)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 
 # ============ Bulk Update (for drag-drop) ============
@@ -425,50 +412,47 @@ def get_kanban_board(
 def reorder_tasks(
     updates: List[dict],  # [{id, position, status?, parent_id?}]
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    for update in updates:
-        task = db.query(Task).join(Project).filter(
-            Task.id == update["id"],
-            Project.owner_id == current_user.id
-        ).first()
-
-        if not task:
-            raise HTTPException(status_code=403, detail=f"Task {update['id']} not found or not owned by you")
-        task.position = update.get("position", task.position)
-        if "status" in update:
-            try:
-                new_status = TaskStatus(update["status"])
-            except ValueError:
-                raise HTTPException(status_code=400, detail=f"Invalid status: {update['status']}")
-            if new_status == TaskStatus.DONE and task.status != TaskStatus.DONE:
-                task.completed_at = datetime.utcnow()
-            elif new_status != TaskStatus.DONE and task.status == TaskStatus.DONE:
-                task.completed_at = None
-            task.status = new_status
-        if "parent_id" in update:
-            if update["parent_id"] is not None:
-                parent = db.query(Task).join(Project).filter(
-                    Task.id == update["parent_id"],
-                    Project.owner_id == current_user.id
-                ).first()
-                if not parent:
-                    raise HTTPException(status_code=403, detail="Parent task not found or not owned by you")
-            task.parent_id = update["parent_id"]
-
+    """Apply a drag-drop batch: one ownership query, one bulk UPDATE of changed rows."""
+    touched = apply_reorder(db, current_user.id, updates)
+    cards_changed(db, touched)
     db.commit()
+    if any("status" in u for u in updates):
+        for project_id in touched:
+            work_signal.notify(project_id)
     return {"message": "Tasks reordered"}
 
 
+@router.post("/{task_id}/move")
+def move_task_card(
+    task_id: int,
+    move: TaskMove,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Place one card after ``after_id`` (or at the top) of a status column.
+
+    Uses gap-based positions, so normally only the moved row is written.
+    """
+    project_id, touched = move_task(db, current_user.id, task_id, move.status, move.after_id)
+    tasks_changed(db, project_id, *touched)
+    db.commit()
+    if move.status in (TaskStatus.BACKLOG, TaskStatus.TODO):
+        work_signal.notify(project_id)
+    position = db.query(Task.position).filter(Task.id == task_id).scalar()
+    return {"message": "Task moved", "id": task_id, "position": position}
+
+
 # ============ Dependency Auto-Adjust ============
 @router.post("/{task_id}/adjust-dates")
 def adjust_dependent_dates(
     task_id: int,
     new_end_date: datetime,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """When a task's end date changes, shift all dependent tasks accordingly"""
+    """When a task's end date changes, push dependent tasks that would now start too early"""
     task = db.query(Task).join(Project).filter(
         Task.id == task_id,
         Project.owner_id == current_user.id
@@ -477,42 +461,13 @@ def adjust_dependent_dates(
     if not task or not task.due_date:
         raise HTTPException(status_code=404, detail="Task not found or has no due date")
 
-    # Keep as datetime for consistent arithmetic with DateTime columns
-    new_end = new_end_date
-
-    # Calculate the shift (both are datetime objects)
-    shift = new_end - task.due_date
-    task.due_date = new_end
-    if task.start_date:
-        task.start_date = task.start_date + shift
-
-    # Pre-fetch all tasks in the same project with their dependents to avoid N+1
-    all_tasks = db.query(Task).options(
-        joinedload(Task.dependents),
-    ).filter(Task.project_id == task.project_id).all()
-    task_map = {t.id: t for t in all_tasks}
-
-    # BFS to adjust all dependents using pre-fetched data
-    adjusted = [task_id]
-    to_process = [t.id for t in task_map[task_id].dependents] if task_id in task_map else []
-
-    while to_process:
-        dep_id = to_process.pop(0)
-        if dep_id in adjusted:
-            continue
-
-        dep = task_map.get(dep_id)
-        if not dep:
-            continue
-
-        if dep.start_date:
-            dep.start_date = dep.start_date + shift
-        if dep.due_date:
-            dep.due_date = dep.due_date + shift
-
-        adjusted.append(dep_id)
-        to_process.extend(d.id for d in dep.dependents)
+    try:
+        adjusted = reschedule(db, task, new_end_date)
+    except DependencyCycleError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Dependency cycle detected among tasks {e.task_ids}")
 
+    tasks_changed(db, task.project_id, *adjusted)
     db.commit()
     return {"message": f"Adjusted {len(adjusted)} tasks", "adjusted_ids": adjusted}
 
@@ -523,7 +478,7 @@ def create_reminder(
     task_id: int,
     reminder_data: ReminderCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     task = db.query(Task).join(Project).filter(
         Task.id == task_id,
@@ -542,6 +497,7 @@ def create_reminder(
     db.add(reminder)
     db.commit()
     db.refresh(reminder)
+    reminder_scheduler.schedule(reminder.id, reminder.remind_at)
     return reminder
 
 
@@ -549,7 +505,7 @@ def create_reminder(
 def get_task_reminders(
     task_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     reminders = db.query(Reminder).filter(
         Reminder.task_id == task_id,
@@ -562,7 +518,7 @@ def get_task_reminders(
 def delete_reminder(
     reminder_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     reminder = db.query(Reminder).filter(
         Reminder.id == reminder_id,
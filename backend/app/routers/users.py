@@ -1,10 +1,14 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User
 from app.schemas import UserResponse, UserUpdate, UserBrief
-from app.auth import get_current_user, get_password_hash
+from app.auth import Principal, get_current_user, get_password_hash_async
+from app import view_cache
+from app.principal_cache import principal_cache
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -12,7 +16,7 @@ router = APIRouter(prefix="/users", tags=["Users"])
 @router.get("/", response_model=List[UserBrief])
 def get_users(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all users (for assignment dropdowns)"""
     users = db.query(User).filter(User.is_active == True).all()
@@ -28,7 +32,7 @@ def get_users(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -40,30 +44,34 @@ def get_user(
 def update_current_user(
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     update_data = user_data.model_dump(exclude_unset=True)
 
+    user = db.query(User).filter(User.id == current_user.id).first()
     for key, value in update_data.items():
-        setattr(current_user, key, value)
+        setattr(user, key, value)
 
+    # Names and avatar colours are baked into cached board/Gantt payloads
+    view_cache.user_changed(db, user.id)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    principal_cache.invalidate_user(user.id)
+    db.refresh(user)
+    return user
 
 
 @router.post("/", response_model=UserResponse)
-def create_user(
+async def create_user(
     user_data: dict,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new user (any authenticated user can add team members)"""
     # Check if user exists
-    existing_user = db.query(User).filter(
+    existing_user = (await db.execute(select(User).where(
         (User.email == user_data.get("email")) |
         (User.username == user_data.get("username"))
-    ).first()
+    ))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -71,7 +79,7 @@ def create_user(
         )
 
     # Create user
-    hashed_password = get_password_hash(user_data.get("password"))
+    hashed_password = await get_password_hash_async(user_data.get("password"))
     db_user = User(
         email=user_data.get("email"),
         username=user_data.get("username"),
@@ -80,6 +88,6 @@ def create_user(
         hashed_password=hashed_password,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
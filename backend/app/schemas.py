@@ -86,7 +86,7 @@ class TaskBase(BaseModel):
     estimated_hours: Optional[int] = None
     correlation_id: Optional[str] = None
     parent_id: Optional[int] = None
-    position: Optional[int] = 0
+    position: Optional[int] = None  # default: below the last card of its column
 
 
 class SubtaskInput(BaseModel):
@@ -101,6 +101,7 @@ class TaskCreate(TaskBase):
     dependency_ids: Optional[List[int]] = []
     agent_id: Optional[int] = None
     subtasks: Optional[List[SubtaskInput]] = None
+    required_capabilities: Optional[List[str]] = None  # an agent must have all of these to claim
 
 
 class TaskUpdate(BaseModel):
@@ -120,6 +121,12 @@ class TaskUpdate(BaseModel):
     dependency_ids: Optional[List[int]] = None
     agent_id: Optional[int] = None
     subtasks: Optional[List[SubtaskInput]] = None
+    required_capabilities: Optional[List[str]] = None
+
+
+class TaskMove(BaseModel):
+    status: Optional[TaskStatus] = None  # None keeps the current column
+    after_id: Optional[int] = None  # None moves the card to the top
 
 
 class TaskBrief(BaseModel):
@@ -290,6 +297,25 @@ class AgentActionResponse(BaseModel):
         from_attributes = True
 
 
+class ActionBatchItemResult(BaseModel):
+    index: int  # Position in the request array
+    ok: bool
+    action_id: Optional[int] = None
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+class ActionQueued(BaseModel):
+    """202 body for an action accepted with ``wait=false``; it has no id yet."""
+    ok: bool = True
+    queued: bool = True
+
+
+class ActionBatchResponse(BaseModel):
+    stored: int
+    results: List[ActionBatchItemResult]
+
+
 class GitHubLinkCreate(BaseModel):
     task_id: Optional[int] = None
     project_id: Optional[int] = None
@@ -377,6 +403,7 @@ class AgentDirectiveResponse(BaseModel):
 
 # ============ Task Queue Schemas ============
 class TaskClaimRequest(BaseModel):
+    # Narrows the agent's registered capabilities for this claim
     required_capabilities: Optional[List[str]] = None
     project_id: Optional[int] = None
     priorities: Optional[List[TaskPriority]] = None
@@ -393,6 +420,7 @@ class TaskQueueItem(BaseModel):
     required_capabilities: List[str] = []
     estimated_hours: Optional[int] = None
     created_at: datetime
+    lease_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
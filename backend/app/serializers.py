@@ -0,0 +1,230 @@
+"""Set-based serialization for Task responses.
+
+Builds ``TaskResponse`` objects for a whole page of tasks from a fixed
+number of ``IN`` queries (assignees, subtasks, dependencies, agents)
+instead of walking ORM relationship collections row by row. Callers
+pass the task rows themselves — ORM ``Task`` instances or plain rows
+selected with ``TASK_COLUMNS`` both work, only attribute access is used.
+"""
+
+from collections import defaultdict
+from typing import Iterable, Sequence
+
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from app.models import Task, User, Agent, TaskStatus, task_assignees, task_dependencies
+from app.schemas import TaskResponse, TaskBrief, UserBrief, AgentBrief, GanttTask
+
+# Columns of the tasks table, for queries that want plain rows instead
+# of identity-mapped ORM objects.
+TASK_COLUMNS = tuple(Task.__table__.columns)
+
+# Upper bound on bound parameters per IN clause. SQLite builds before
+# 3.32 cap a statement at 999 variables.
+IN_CHUNK_SIZE = 900
+
+
+def in_chunks(ids: Sequence[int], size: int = IN_CHUNK_SIZE) -> Iterable[list[int]]:
+    for i in range(0, len(ids), size):
+        yield list(ids[i:i + size])
+
+
+def load_assignees(db: Session, task_ids: Sequence[int]) -> dict[int, list[UserBrief]]:
+    result: dict[int, list[UserBrief]] = defaultdict(list)
+    for chunk in in_chunks(task_ids):
+        rows = db.execute(
+            select(
+                task_assignees.c.task_id, User.id, User.username,
+                User.full_name, User.avatar_color,
+            )
+            .join(User, User.id == task_assignees.c.user_id)
+            .where(task_assignees.c.task_id.in_(chunk))
+            .order_by(task_assignees.c.task_id, User.id)
+        )
+        for task_id, user_id, username, full_name, avatar_color in rows:
+            result[task_id].append(UserBrief(
+                id=user_id,
+                username=username,
+                full_name=full_name,
+                avatar_color=avatar_color,
+            ))
+    return result
+
+
+def _load_subtasks(db: Session, task_ids: Sequence[int]) -> dict[int, list[TaskBrief]]:
+    result: dict[int, list[TaskBrief]] = defaultdict(list)
+    for chunk in in_chunks(task_ids):
+        rows = db.execute(
+            select(Task.parent_id, Task.id, Task.title, Task.status, Task.priority)
+            .where(Task.parent_id.in_(chunk))
+            .order_by(Task.parent_id, Task.id)
+        )
+        for parent_id, sub_id, title, status, priority in rows:
+            result[parent_id].append(TaskBrief(
+                id=sub_id, title=title, status=status, priority=priority,
+            ))
+    return result
+
+
+def _load_dependencies(db: Session, task_ids: Sequence[int]) -> dict[int, list[TaskBrief]]:
+    result: dict[int, list[TaskBrief]] = defaultdict(list)
+    for chunk in in_chunks(task_ids):
+        rows = db.execute(
+            select(task_dependencies.c.task_id, Task.id, Task.title, Task.status, Task.priority)
+            .join(Task, Task.id == task_dependencies.c.depends_on_id)
+            .where(task_dependencies.c.task_id.in_(chunk))
+            .order_by(task_dependencies.c.task_id, Task.id)
+        )
+        for task_id, dep_id, title, status, priority in rows:
+            result[task_id].append(TaskBrief(
+                id=dep_id, title=title, status=status, priority=priority,
+            ))
+    return result
+
+
+def _load_agents(db: Session, agent_ids: Sequence[int]) -> dict[int, AgentBrief]:
+    result: dict[int, AgentBrief] = {}
+    for chunk in in_chunks(agent_ids):
+        rows = db.execute(
+            select(Agent.id, Agent.name, Agent.agent_type, Agent.status)
+            .where(Agent.id.in_(chunk))
+        )
+        for agent_id, name, agent_type, status in rows:
+            result[agent_id] = AgentBrief(
+                id=agent_id,
+                name=name,
+                agent_type=agent_type,
+                status=status,
+                is_alive=False,  # Simplified — liveness requires heartbeat check
+            )
+    return result
+
+
+def serialize_tasks(db: Session, tasks: Sequence) -> list[TaskResponse]:
+    """Serialize ``tasks`` in order, loading related rows in bulk.
+
+    Issues four queries per ``IN_CHUNK_SIZE`` tasks regardless of how
+    many assignees, subtasks or dependencies each task has.
+    """
+    if not tasks:
+        return []
+
+    task_ids = [t.id for t in tasks]
+    agent_ids = sorted({t.agent_id for t in tasks if t.agent_id is not None})
+
+    assignees = load_assignees(db, task_ids)
+    subtasks = _load_subtasks(db, task_ids)
+    dependencies = _load_dependencies(db, task_ids)
+    agents = _load_agents(db, agent_ids) if agent_ids else {}
+
+    responses = []
+    for task in tasks:
+        task_subtasks = subtasks.get(task.id, [])
+        responses.append(TaskResponse(
+            id=task.id,
+            title=task.title,
+            description=task.description,
+            status=task.status,
+            priority=task.priority,
+            color=task.color,
+            start_date=task.start_date,
+            due_date=task.due_date,
+            completed_at=task.completed_at,
+            estimated_hours=task.estimated_hours,
+            correlation_id=task.correlation_id,
+            parent_id=task.parent_id,
+            position=task.position,
+            project_id=task.project_id,
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+            assignees=assignees.get(task.id, []),
+            subtasks=task_subtasks,
+            dependencies=dependencies.get(task.id, []),
+            subtask_count=len(task_subtasks),
+            subtask_completed=sum(1 for s in task_subtasks if s.status == TaskStatus.DONE),
+            agent_id=task.agent_id,
+            agent=agents.get(task.agent_id) if task.agent_id is not None else None,
+        ))
+    return responses
+
+
+# Progress shown for tasks without subtasks
+STATUS_PROGRESS = {
+    TaskStatus.BACKLOG: 0,
+    TaskStatus.TODO: 10,
+    TaskStatus.IN_PROGRESS: 50,
+    TaskStatus.REVIEW: 80,
+    TaskStatus.DONE: 100,
+}
+
+
+def _id_list_agg(db: Session, column):
+    """Aggregate ``column`` into a list per group: array_agg on Postgres,
+    group_concat elsewhere (parsed by ``_parse_id_list``)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.array_agg(column)
+    return func.group_concat(column)
+
+
+def _parse_id_list(value) -> list[int]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return sorted(int(v) for v in value.split(","))
+    return sorted(value)
+
+
+def build_gantt(db: Session, project_id: int, project_color: str) -> list[GanttTask]:
+    """Gantt rows for a project's top-level tasks.
+
+    Subtask progress and dependency ids come from SQL aggregates joined
+    onto the task rows, so no subtask or dependency objects are loaded;
+    assignees are one further IN query.
+    """
+    progress = (
+        select(
+            Task.parent_id.label("task_id"),
+            func.count(Task.id).label("total"),
+            func.sum(case((Task.status == TaskStatus.DONE, 1), else_=0)).label("done"),
+        )
+        .where(Task.project_id == project_id, Task.parent_id != None)
+        .group_by(Task.parent_id)
+        .subquery()
+    )
+    deps = (
+        select(
+            task_dependencies.c.task_id,
+            _id_list_agg(db, task_dependencies.c.depends_on_id).label("ids"),
+        )
+        .join(Task, Task.id == task_dependencies.c.task_id)
+        .where(Task.project_id == project_id)
+        .group_by(task_dependencies.c.task_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Task.id, Task.title, Task.start_date, Task.due_date, Task.status,
+            Task.priority, Task.color, Task.parent_id,
+            progress.c.total, progress.c.done, deps.c.ids,
+        )
+        .outerjoin(progress, progress.c.task_id == Task.id)
+        .outerjoin(deps, deps.c.task_id == Task.id)
+        .where(Task.project_id == project_id, Task.parent_id == None)
+        .order_by(Task.position, Task.id)
+    ).all()
+
+    assignees = load_assignees(db, [r.id for r in rows])
+    return [GanttTask(
+        id=r.id,
+        title=r.title,
+        start_date=r.start_date,
+        due_date=r.due_date,
+        status=r.status,
+        priority=r.priority,
+        color=r.color or project_color,
+        progress=(r.done / r.total) * 100 if r.total else STATUS_PROGRESS.get(r.status, 0),
+        dependencies=_parse_id_list(r.ids),
+        assignees=assignees.get(r.id, []),
+        parent_id=r.parent_id,
+    ) for r in rows]
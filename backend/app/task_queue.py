@@ -0,0 +1,355 @@
+"""Agent work queue: atomic, index-backed task claims.
+
+A task is claimable while it is top-level, unassigned and in BACKLOG or
+TODO (``CLAIMABLE``). ``ix_tasks_claim_order`` is a partial index over
+exactly that set, ordered ``(URGENCY_RANK, created_at, id)`` and
+covering ``project_id``, so picking the next task is a short index range
+scan no matter how many tasks are assigned or done. The rank is an
+expression (priority is stored by name, which does not sort by urgency);
+queries must spell it exactly as the index does to use it.
+
+``claim_tasks`` hands out tasks with one ``UPDATE ... WHERE id IN
+(SELECT ... ORDER BY rank, created_at, id LIMIT n) RETURNING``:
+
+* Postgres locks the candidates with ``FOR UPDATE SKIP LOCKED``, so
+  concurrent claimers each take different rows without waiting.
+* SQLite has no row locks; the outer ``UPDATE`` repeats the claimable
+  predicate as a compare-and-set, and SQLite runs one writer at a time,
+  so a row is only ever claimed once.
+
+Claims are leases, like SQS visibility timeouts: each claimed task gets
+a ``lease_expires_at`` deadline (``Settings.task_lease_seconds``). The
+agent's heartbeats renew its leases whenever they persist (see
+``app.liveness``), and ``POST /queue/renew`` renews one explicitly.
+``LeaseSweeper`` sleeps until the earliest deadline in
+``ix_tasks_lease_expires_at`` and puts every lapsed task back in the
+queue with one ``UPDATE``.
+
+Tasks may require capabilities (``task_capabilities``, one row per
+task and capability). A claim only takes tasks whose requirements are a
+subset of the agent's capabilities: the candidate query adds ``NOT
+EXISTS (a requirement of this task outside the agent's set)``, which is a
+primary-key probe per candidate, so matching stays inside the same
+single indexed statement. Agent capabilities are normalized when the
+agent registers and decoded through ``parse_capabilities``, which
+memoizes each stored value.
+
+Idle agents can long-poll (``wait=``) instead of re-polling. Writes that
+make a task claimable call ``work_signal.notify(project_id, priority)``,
+which wakes the matching waiters so they retry the claim; while nothing
+is signalled a waiting agent costs no queries. Signals are in-process:
+with several workers, work created on another worker is picked up when
+the wait times out.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence
+
+from sqlalchemy import Integer, exists, func, insert, literal_column, select, text, update
+from sqlalchemy.orm import Session
+
+from app.agent_cache import agent_cache
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Agent, AgentAction, AgentStatus, Task, TaskCapability, TaskPriority, TaskStatus
+from app.view_cache import agent_changed, cards_changed
+from app.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+# Literal SQL so it matches the partial index predicate exactly
+# (SQLite only uses a partial index when the query repeats its terms).
+CLAIMABLE_SQL = "agent_id IS NULL AND parent_id IS NULL AND status IN ('BACKLOG', 'TODO')"
+CLAIMABLE = text(CLAIMABLE_SQL)
+
+URGENCY = [TaskPriority.URGENT, TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW]
+# Sort key for "most urgent first"; literal SQL so it matches the
+# ix_tasks_claim_order expression. A task without a priority ranks as LOW.
+URGENCY_RANK_SQL = (
+    "CASE priority " + " ".join(f"WHEN '{p.name}' THEN {i}" for i, p in enumerate(URGENCY[:-1]))
+    + f" ELSE {len(URGENCY) - 1} END"
+)
+urgency_rank = literal_column(URGENCY_RANK_SQL, Integer)
+
+MAX_CLAIM = 50
+# Longest a claim may long-poll for work (seconds)
+MAX_CLAIM_WAIT = 30.0
+# Longest the lease sweeper sleeps when no lease is due sooner
+MAX_SWEEP_SLEEP = 60.0
+# Pause before retrying after a database error
+RETRY_DELAY = 5.0
+
+
+def normalize_capabilities(capabilities: Optional[Iterable[str]]) -> list[str]:
+    """Trimmed, lower-cased, de-duplicated and sorted capability names."""
+    return sorted({c.strip().lower() for c in capabilities or () if c and c.strip()})
+
+
+@lru_cache(maxsize=1024)
+def parse_capabilities(raw: Optional[str]) -> tuple[str, ...]:
+    """Decode an agent's stored ``capabilities`` JSON (memoized per value)."""
+    if not raw:
+        return ()
+    try:
+        return tuple(normalize_capabilities(json.loads(raw)))
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return ()
+
+
+def required_capabilities(db: Session, task_ids: Sequence[int]) -> dict[int, list[str]]:
+    """Required capabilities for ``task_ids`` in one query."""
+    found: dict[int, list[str]] = defaultdict(list)
+    if task_ids:
+        rows = db.execute(
+            select(TaskCapability.task_id, TaskCapability.capability)
+            .where(TaskCapability.task_id.in_(task_ids))
+            .order_by(TaskCapability.task_id, TaskCapability.capability)
+        )
+        for task_id, capability in rows:
+            found[task_id].append(capability)
+    return found
+
+
+def lease_deadline(seconds: Optional[float] = None) -> datetime:
+    seconds = get_settings().task_lease_seconds if seconds is None else seconds
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def claim_tasks(
+    db: Session,
+    agent_id: int,
+    count: int = 1,
+    project_id: Optional[int] = None,
+    priorities: Optional[Sequence[TaskPriority]] = None,
+    capabilities: Optional[Sequence[str]] = None,
+) -> list[int]:
+    """Assign up to ``count`` claimable tasks to ``agent_id``.
+
+    With ``capabilities``, only tasks whose required capabilities are all
+    in that set are claimed (an empty set matches tasks with none);
+    None skips capability matching. Returns the claimed ids, most urgent (then oldest) first. The caller
+    commits; on Postgres the claimed rows stay locked until then.
+    """
+    for_update = db.get_bind().dialect.name == "postgresql"
+    candidates = select(Task.id).where(CLAIMABLE)
+    if priorities:
+        candidates = candidates.where(Task.priority.in_(priorities))
+    if capabilities is not None:
+        candidates = candidates.where(~exists().where(
+            TaskCapability.task_id == Task.id, TaskCapability.capability.not_in(capabilities),
+        ))
+    if project_id:
+        candidates = candidates.where(Task.project_id == project_id)
+    candidates = candidates.order_by(urgency_rank, Task.created_at, Task.id).limit(count)
+    if for_update:
+        candidates = candidates.with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(Task)
+        .where(Task.id.in_(candidates.scalar_subquery()), CLAIMABLE)
+        .values(agent_id=agent_id, status=TaskStatus.IN_PROGRESS, lease_expires_at=lease_deadline())
+        .returning(Task.id, urgency_rank.label("rank"), Task.created_at)
+        .execution_options(synchronize_session=False)
+    ).all()
+    # RETURNING comes back in no particular order
+    return [r.id for r in sorted(rows, key=lambda r: (r.rank, r.created_at, r.id))]
+
+
+class _Waiter:
+    __slots__ = ("future", "priorities")
+
+    def __init__(self, future: asyncio.Future, priorities: Optional[frozenset]):
+        self.future = future
+        self.priorities = priorities
+
+
+class WorkSignal:
+    """Wakes long-polling claimers when a task becomes claimable."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # project id (None = any project) -> waiters
+        self._waiters: dict[Optional[int], set[_Waiter]] = defaultdict(set)
+
+    def waiter(self, project_id: Optional[int] = None,
+               priorities: Optional[Sequence[TaskPriority]] = None) -> _Waiter:
+        """Register interest before re-checking the queue, so no signal is lost."""
+        self._loop = asyncio.get_running_loop()
+        waiter = _Waiter(self._loop.create_future(), frozenset(priorities) if priorities else None)
+        self._waiters[project_id].add(waiter)
+        return waiter
+
+    def discard(self, waiter: _Waiter, project_id: Optional[int] = None):
+        waiters = self._waiters.get(project_id)
+        if waiters is not None:
+            waiters.discard(waiter)
+            if not waiters:
+                del self._waiters[project_id]
+
+    def notify(self, project_id: int, priority: Optional[TaskPriority] = None):
+        """Task(s) in ``project_id`` became claimable. Safe from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake(project_id, priority)
+        else:
+            self._loop.call_soon_threadsafe(self._wake, project_id, priority)
+
+    def _wake(self, project_id: int, priority: Optional[TaskPriority]):
+        for key in (project_id, None):
+            waiters = self._waiters.get(key)
+            if not waiters:
+                continue
+            woken = {w for w in waiters
+                     if priority is None or w.priorities is None or priority in w.priorities}
+            for waiter in woken:
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+            waiters -= woken
+            if not waiters:
+                del self._waiters[key]
+
+
+work_signal = WorkSignal()
+
+
+def notify_if_claimable(task: Task):
+    """Signal waiters if ``task`` (as just committed) is in the claimable set."""
+    if (task.agent_id is None and task.parent_id is None
+            and task.status in (TaskStatus.BACKLOG, TaskStatus.TODO)):
+        work_signal.notify(task.project_id, task.priority)
+
+
+def renew_leases(db: Session, agent_id: int, task_id: Optional[int] = None,
+                 seconds: Optional[float] = None) -> Optional[datetime]:
+    """Push back the lease on the agent's claimed tasks (or just ``task_id``).
+
+    Returns the new deadline, or None if nothing was leased. The caller commits.
+    """
+    expires_at = lease_deadline(seconds)
+    stmt = (
+        update(Task)
+        .where(Task.agent_id == agent_id, Task.status == TaskStatus.IN_PROGRESS,
+               Task.lease_expires_at.is_not(None))
+        .values(lease_expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    if task_id is not None:
+        stmt = stmt.where(Task.id == task_id)
+    return expires_at if db.execute(stmt).rowcount else None
+
+
+class LeaseSweeper:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def expire(self, now: Optional[datetime] = None) -> tuple[list, Optional[datetime]]:
+        """Requeue every task whose lease lapsed before ``now``.
+
+        Returns the requeued ``(task id, project id, agent id, title)`` rows
+        and the next lease deadline.
+        """
+        now = datetime.now(timezone.utc) if now is None else now
+        lapsed = [Task.lease_expires_at.is_not(None), Task.lease_expires_at < now,
+                  Task.status == TaskStatus.IN_PROGRESS]
+        with self._session_factory() as db:
+            candidates = select(Task.id, Task.project_id, Task.agent_id, Task.title).where(*lapsed)
+            if db.get_bind().dialect.name == "postgresql":
+                candidates = candidates.with_for_update(skip_locked=True)
+            candidates = db.execute(candidates).all()
+            expired = []
+            if candidates:
+                # Re-check in the UPDATE: a renewal may have landed in between
+                requeued = set(db.execute(
+                    update(Task)
+                    .where(Task.id.in_([c.id for c in candidates]), *lapsed)
+                    .values(agent_id=None, status=TaskStatus.TODO, lease_expires_at=None)
+                    .returning(Task.id)
+                    .execution_options(synchronize_session=False)
+                ).scalars())
+                expired = [tuple(c) for c in candidates if c.id in requeued]
+            if expired:
+                db.execute(
+                    update(Agent)
+                    .where(Agent.current_task_id.in_([task_id for task_id, *_ in expired]))
+                    .values(current_task_id=None, status=AgentStatus.IDLE)
+                    .execution_options(synchronize_session=False)
+                )
+                rows = [{
+                    "agent_id": agent_id,
+                    "action_type": "task_update",
+                    "summary": f"Lease expired: {title}",
+                    "task_id": task_id,
+                    "metadata_json": json.dumps({"action": "lease_expired", "task_id": task_id}),
+                } for task_id, _, agent_id, title in expired if agent_id is not None]
+                if rows:
+                    db.execute(insert(AgentAction), rows)
+            next_deadline = db.scalar(
+                select(func.min(Task.lease_expires_at)).where(Task.lease_expires_at.is_not(None))
+            )
+            if expired:
+                requeued_cards: dict[int, list[int]] = {}
+                for task_id, project_id, _, _ in expired:
+                    requeued_cards.setdefault(project_id, []).append(task_id)
+                cards_changed(db, requeued_cards)
+                # Agents left IDLE show that on their other cards
+                idled = {agent_id for _, _, agent_id, _ in expired if agent_id is not None}
+                if idled:
+                    agent_changed(db, *idled)
+            db.commit()
+        return expired, next_deadline
+
+    async def sweep(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Requeue lapsed leases and broadcast them; returns the next deadline."""
+        expired, next_deadline = await asyncio.to_thread(self.expire, now)
+        if expired:
+            for task_id, project_id, agent_id, _ in expired:
+                work_signal.notify(project_id)
+                if agent_id is not None:
+                    agent_cache.set_status(agent_id, AgentStatus.IDLE)
+            await manager.broadcast({
+                "type": "leases_expired",
+                "tasks": [{"task_id": task_id, "project_id": project_id, "agent_id": agent_id}
+                          for task_id, project_id, agent_id, _ in expired],
+            })
+        return next_deadline
+
+    async def _run(self):
+        while True:
+            try:
+                next_deadline = await self.sweep()
+            except Exception:
+                logger.exception("Lease sweep failed")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            # New leases and renewals only ever end later than this one
+            delay = MAX_SWEEP_SLEEP
+            if next_deadline is not None:
+                if next_deadline.tzinfo is None:
+                    next_deadline = next_deadline.replace(tzinfo=timezone.utc)
+                delay = min(delay, (next_deadline - datetime.now(timezone.utc)).total_seconds())
+            await asyncio.sleep(max(0.05, delay))
+
+
+lease_sweeper = LeaseSweeper()
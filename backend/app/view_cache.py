@@ -0,0 +1,320 @@
+"""Per-project view caches for the Kanban board and Gantt chart.
+
+Write paths call ``tasks_changed(db, project_id, task_id, ...)`` before
+they commit (``agent_changed`` when an agent's status changes, since
+cards show it). The commit then bumps ``projects.view_version`` in the
+same transaction as the data, as its last statement, and once it has
+succeeded records the change locally; a rollback forgets it. The Kanban board is patched incrementally:
+the next read re-serializes only those cards (plus cards whose
+dependency list shows one of them) before re-rendering. The Gantt
+payload is cheap to rebuild from one aggregate query, so it is simply
+dropped and rebuilt on read.
+
+Caches live in process memory, so with several workers a snapshot may
+have been built before a write another worker made. Reads pass the
+project's current ``view_version`` (the endpoints load the project row
+anyway): a snapshot is served only when its version, plus the changes
+this worker has recorded since, matches; otherwise it is rebuilt. The
+board ETag is a hash of the rendered board, so a stale ETag never
+outlives the version check.
+"""
+
+import bisect
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Project, Task, TaskStatus, task_assignees, task_dependencies
+from app.serializers import TASK_COLUMNS, serialize_tasks
+
+# (status, title, wip_limit) in board order
+KANBAN_COLUMNS = [
+    (TaskStatus.BACKLOG, "Backlog", None),
+    (TaskStatus.TODO, "To Do", None),
+    (TaskStatus.IN_PROGRESS, "In Progress", 3),  # WIP limit
+    (TaskStatus.REVIEW, "Review", None),
+    (TaskStatus.DONE, "Done", None),
+]
+
+MAX_CACHED_BOARDS = 256
+
+
+class BoardSnapshot:
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.version: Optional[int] = None  # projects.view_version it reflects
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.cards: dict[int, dict] = {}  # task id -> TaskResponse JSON
+        self.columns: dict[str, list[int]] = {s.value: [] for s, _, _ in KANBAN_COLUMNS}
+        self.body: bytes = b""
+        self.etag: str = ""
+
+    def _sort_key(self, task_id: int) -> tuple[int, int]:
+        return (self.cards[task_id]["position"] or 0, task_id)
+
+    def remove(self, task_id: int):
+        card = self.cards.pop(task_id, None)
+        if card is not None:
+            self.columns[card["status"]].remove(task_id)
+
+    def put(self, card: dict):
+        self.remove(card["id"])
+        self.cards[card["id"]] = card
+        column = self.columns[card["status"]]
+        bisect.insort(column, card["id"], key=self._sort_key)
+
+    def render(self):
+        """Re-render the KanbanBoard JSON body and its ETag from the cards."""
+        board = {
+            "project_id": self.project_id,
+            "columns": [{
+                "status": status.value,
+                "title": title,
+                "tasks": [self.cards[i] for i in self.columns[status.value]],
+                "wip_limit": wip_limit,
+            } for status, title, wip_limit in KANBAN_COLUMNS],
+        }
+        self.body = json.dumps(board, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+class BoardCache:
+    def __init__(self, max_boards: int = MAX_CACHED_BOARDS):
+        self.max_boards = max_boards
+        self._snapshots: OrderedDict[int, BoardSnapshot] = OrderedDict()
+        # project id -> (changed task ids, version bumps they account for)
+        self._dirty: dict[int, tuple[set[int], int]] = {}
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, project_id: int, *task_ids: Optional[int]):
+        """Record that ``task_ids`` changed and ``view_version`` was bumped once."""
+        with self._lock:
+            if project_id not in self._snapshots:
+                return
+            dirty, bumps = self._dirty.get(project_id, (set(), 0))
+            dirty.update(t for t in task_ids if t is not None)
+            self._dirty[project_id] = (dirty, bumps + 1)
+
+    def invalidate(self, project_id: int):
+        with self._lock:
+            self._snapshots.pop(project_id, None)
+            self._dirty.pop(project_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._dirty.clear()
+
+    def get(self, db: Session, project_id: int, version: int) -> BoardSnapshot:
+        """Snapshot for ``project_id`` at ``version``, built or patched as needed.
+
+        Read ``version`` before calling, so the board is built from data at
+        least that new.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(project_id)
+            if snapshot is None:
+                snapshot = BoardSnapshot(project_id)
+                self._snapshots[project_id] = snapshot
+                self._dirty.pop(project_id, None)
+                while len(self._snapshots) > self.max_boards:
+                    evicted, _ = self._snapshots.popitem(last=False)
+                    self._dirty.pop(evicted, None)
+            else:
+                self._snapshots.move_to_end(project_id)
+
+        with snapshot.lock:
+            try:
+                with self._lock:
+                    dirty, bumps = self._dirty.pop(project_id, (set(), 0))
+                if snapshot.version is not None and snapshot.version + bumps == version:
+                    # Every change since the snapshot was made here; patch it
+                    if dirty:
+                        self._patch(db, snapshot, dirty)
+                elif snapshot.version != version or dirty:
+                    # New, or another worker wrote to the project
+                    snapshot.reset()
+                    self._build(db, snapshot)
+                snapshot.version = version
+                return snapshot
+            except Exception:
+                # Half-applied snapshots are never served; rebuild on next read
+                self.invalidate(project_id)
+                raise
+
+    def _build(self, db: Session, snapshot: BoardSnapshot):
+        rows = db.query(*TASK_COLUMNS).filter(
+            Task.project_id == snapshot.project_id,
+            Task.parent_id == None,
+        ).order_by(func.coalesce(Task.position, 0), Task.id).all()
+        for response in serialize_tasks(db, rows):
+            card = response.model_dump(mode="json")
+            snapshot.cards[card["id"]] = card
+            snapshot.columns[card["status"]].append(card["id"])
+        snapshot.render()
+
+    def _patch(self, db: Session, snapshot: BoardSnapshot, dirty: set[int]):
+        # Cards embed dependency briefs, so dependents of a changed task change too
+        dependents = db.execute(
+            select(task_dependencies.c.task_id).where(task_dependencies.c.depends_on_id.in_(dirty))
+        ).scalars()
+        dirty = dirty | set(dependents)
+
+        rows = db.query(*TASK_COLUMNS).filter(Task.id.in_(dirty)).all()
+        on_board = [
+            r for r in rows
+            if r.project_id == snapshot.project_id and r.parent_id is None
+        ]
+        for task_id in dirty - {r.id for r in on_board}:
+            snapshot.remove(task_id)
+        for response in serialize_tasks(db, on_board):
+            snapshot.put(response.model_dump(mode="json"))
+        snapshot.render()
+
+
+class GanttCache:
+    """Rendered Gantt payloads per project, dropped on any task change."""
+
+    def __init__(self, max_projects: int = MAX_CACHED_BOARDS):
+        self.max_projects = max_projects
+        self._payloads: OrderedDict[int, tuple[int, list]] = OrderedDict()  # id -> (version, payload)
+        # Bumped by invalidate(); a build that raced one is not stored
+        self._generations: dict[int, int] = {}
+        self._epoch = 0  # bumped by clear()
+        self._lock = threading.Lock()
+
+    def get(self, project_id: int, version: int, build: Callable[[], list]) -> list:
+        """Payload at ``version`` (read before calling), built if not cached."""
+        with self._lock:
+            entry = self._payloads.get(project_id)
+            if entry is not None and entry[0] == version:
+                self._payloads.move_to_end(project_id)
+                return entry[1]
+            generation = (self._epoch, self._generations.get(project_id, 0))
+        payload = build()
+        with self._lock:
+            if generation == (self._epoch, self._generations.get(project_id, 0)):
+                self._payloads[project_id] = (version, payload)
+                self._payloads.move_to_end(project_id)
+                while len(self._payloads) > self.max_projects:
+                    self._payloads.popitem(last=False)
+        return payload
+
+    def invalidate(self, project_id: int):
+        with self._lock:
+            self._payloads.pop(project_id, None)
+            self._generations[project_id] = self._generations.get(project_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+
+board_cache = BoardCache()
+gantt_cache = GanttCache()
+
+
+# Session.info key: {project id: changed task ids, or None to drop the project's views}
+_PENDING = "view_cache.pending"
+
+
+def _stage(db: Session, project_id: int, task_ids: Optional[Iterable[Optional[int]]]):
+    pending = db.info.setdefault(_PENDING, {})
+    if task_ids is None or (project_id in pending and pending[project_id] is None):
+        pending[project_id] = None
+    else:
+        pending.setdefault(project_id, set()).update(t for t in task_ids if t is not None)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_view_versions(db: Session):
+    pending = db.info.get(_PENDING)
+    if not pending:
+        return
+    # Write the data first so the projects rows are locked only briefly, at the very end
+    db.flush()
+    db.execute(
+        update(Project)
+        .where(Project.id.in_(sorted(pending)))
+        .values(
+            view_version=Project.view_version + 1,
+            updated_at=Project.updated_at,  # the project itself did not change
+        )
+        .execution_options(synchronize_session="evaluate")
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_view_changes(db: Session):
+    for project_id, task_ids in db.info.pop(_PENDING, {}).items():
+        if task_ids is None:
+            board_cache.invalidate(project_id)
+        else:
+            board_cache.mark_dirty(project_id, *task_ids)
+        gantt_cache.invalidate(project_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_view_changes(db: Session):
+    db.info.pop(_PENDING, None)
+
+
+def tasks_changed(db: Session, project_id: int, *task_ids: Optional[int]):
+    """Tell every project view that ``task_ids`` changed. Call before commit."""
+    _stage(db, project_id, task_ids)
+
+
+def cards_changed(db: Session, changed: dict[int, list[int]]):
+    """``tasks_changed`` for ``{project id: task ids}``. Call before commit."""
+    for project_id, task_ids in changed.items():
+        _stage(db, project_id, task_ids)
+
+
+def agent_cards(db: Session, *agent_ids: int) -> dict[int, list[int]]:
+    """``{project id: task ids}`` of the cards showing these agents."""
+    cards: dict[int, list[int]] = {}
+    for project_id, task_id in db.execute(
+        select(Task.project_id, Task.id).where(Task.agent_id.in_(agent_ids))
+    ):
+        cards.setdefault(project_id, []).append(task_id)
+    return cards
+
+
+def agent_changed(db: Session, *agent_ids: int):
+    """An agent's status (shown on its task cards) changed. Call before commit."""
+    db.flush()
+    cards_changed(db, agent_cards(db, *agent_ids))
+
+
+def project_changed(db: Session, project_id: int):
+    """Project-level fields (e.g. color) changed; drop derived views. Call before commit."""
+    _stage(db, project_id, None)
+
+
+def user_changed(db: Session, user_id: int):
+    """A user's display fields changed; drop the views of the projects they
+    own or have assigned tasks in. Call before commit."""
+    assigned = (
+        select(Task.project_id)
+        .join(task_assignees, task_assignees.c.task_id == Task.id)
+        .where(task_assignees.c.user_id == user_id)
+    )
+    projects = select(Project.id).where(or_(Project.owner_id == user_id, Project.id.in_(assigned)))
+    for project_id in db.scalars(projects):
+        _stage(db, project_id, None)
+
+
+def clear_all():
+    """Drop every cached view in this worker."""
+    board_cache.clear()
+    gantt_cache.clear()
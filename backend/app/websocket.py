@@ -1,39 +1,171 @@
+import asyncio
 import json
 import logging
 from fastapi import WebSocket
-from typing import Any
+from typing import Any, Iterable, Optional
+
+from app.event_bus import EventBus
 
 logger = logging.getLogger(__name__)
 
+# Frames buffered per connection before the slow-consumer policy kicks in
+SEND_QUEUE_SIZE = 256
+# Frames a connection may lose in one backlog before it is disconnected
+MAX_DROPPED_FRAMES = 1024
+
+# Keys whose values become topics, e.g. {"agent_id": 5} -> "agent:5"
+_TOPIC_KEYS = {"agent_id": "agent", "project_id": "project", "user_id": "user"}
+_NESTED_KEYS = ("agent", "action", "message", "directive", "reminder")
+# Bus-frame header topic marking an event private to one user
+_OWNER_PREFIX = "owner:"
+
+
+def topics_for(message: dict[str, Any]) -> set[str]:
+    """Topics an event is published on: its type plus any agent, project or
+    user ids found at the top level, in a nested object or in a list of
+    objects."""
+    topics = {f"type:{message.get('type')}"}
+    scopes = [message] + [message[k] for k in _NESTED_KEYS if isinstance(message.get(k), dict)]
+    # Coalesced frames, e.g. {"type": "agent_actions", "actions": [...]}
+    scopes += [item for value in message.values() if isinstance(value, list)
+               for item in value if isinstance(item, dict)]
+    for scope in scopes:
+        for key, prefix in _TOPIC_KEYS.items():
+            if scope.get(key) is not None:
+                topics.add(f"{prefix}:{scope[key]}")
+    if isinstance(message.get("agent"), dict) and message["agent"].get("id") is not None:
+        topics.add(f"agent:{message['agent']['id']}")
+    return topics
+
+
+class _Subscriber:
+    """One connection: its topic filter, send queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, topics: Iterable[str], user_id: Optional[int] = None):
+        self.websocket = websocket
+        self.topics = set(topics)
+        self.user_id = None if user_id is None else str(user_id)
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.dropped = 0
+        self.sender: Optional[asyncio.Task] = None
+
+    def wants(self, topics: set[str], owner: Optional[str] = None) -> bool:
+        if owner is not None and owner != self.user_id:
+            return False  # Private to another user, whatever the topic filter says
+        # No subscription means everything, as before topics existed
+        return not self.topics or not self.topics.isdisjoint(topics)
+
 
 class ConnectionManager:
+    """Fan-out for the live feed.
+
+    ``broadcast`` serializes an event once and only enqueues the frame
+    for matching subscribers; each connection has its own sender task,
+    so a slow browser tab never blocks the request that published the
+    event. When a connection's queue is full the oldest frame is
+    dropped, and after MAX_DROPPED_FRAMES drops without the queue
+    draining the connection is closed.
+
+    Events travel through an ``EventBus`` so that subscribers on every
+    worker process receive them; the default bus stays in-process.
+
+    Events broadcast with a ``user_id`` are private: they only reach
+    connections authenticated as that user, regardless of topics.
+    """
+
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self._subscribers: dict[WebSocket, _Subscriber] = {}
+        self._bus: Optional[EventBus] = None  # None: deliver in-process
+
+    async def start(self, bus: EventBus):
+        await bus.start(self._deliver)
+        self._bus = bus
+
+    async def stop(self):
+        if self._bus is not None:
+            await self._bus.stop()
+            self._bus = None
 
-    async def connect(self, websocket: WebSocket):
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self._subscribers)
+
+    async def connect(self, websocket: WebSocket, topics: Iterable[str] = (), user_id: Optional[int] = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Total: {len(self.active_connections)}")
+        sub = _Subscriber(websocket, topics, user_id)
+        sub.sender = asyncio.create_task(self._send_loop(sub))
+        self._subscribers[websocket] = sub
+        logger.info(f"WebSocket connected. Total: {len(self._subscribers)}")
 
     def disconnect(self, websocket: WebSocket):
+        sub = self._subscribers.pop(websocket, None)
+        if sub is None:
+            return  # Already removed by the slow-consumer policy
+        if sub.sender is not None and sub.sender is not asyncio.current_task():
+            sub.sender.cancel()
+        logger.info(f"WebSocket disconnected. Total: {len(self._subscribers)}")
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        sub = self._subscribers.get(websocket)
+        if sub is not None:
+            sub.topics.update(topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        sub = self._subscribers.get(websocket)
+        if sub is not None:
+            sub.topics.difference_update(topics)
+
+    async def broadcast(self, message: dict[str, Any], topics: Iterable[str] = (), user_id: Optional[int] = None):
+        """Publish ``message`` on its derived topics plus ``topics``; with
+        ``user_id``, only to that user's connections. Never waits on a
+        client."""
+        event_topics = topics_for(message) | set(topics)
+        if user_id is not None:
+            event_topics.add(f"{_OWNER_PREFIX}{user_id}")
+        # Bus frame: comma-separated topics, newline, event JSON (which has no raw newlines)
+        bus_frame = ",".join(sorted(event_topics)) + "\n" + json.dumps(message)
+        if self._bus is None:
+            self._deliver(bus_frame)
+        else:
+            await self._bus.publish(bus_frame)
+
+    def _deliver(self, bus_frame: str):
+        header, _, frame = bus_frame.partition("\n")
+        event_topics = set(header.split(","))
+        owner = next((t[len(_OWNER_PREFIX):] for t in event_topics if t.startswith(_OWNER_PREFIX)), None)
+        for sub in list(self._subscribers.values()):
+            if sub.wants(event_topics, owner):
+                self._enqueue(sub, frame)
+
+    def _enqueue(self, sub: _Subscriber, frame: str):
+        if sub.queue.full():
+            if sub.dropped >= MAX_DROPPED_FRAMES:
+                logger.warning("Disconnecting slow WebSocket consumer")
+                self.disconnect(sub.websocket)
+                asyncio.create_task(self._close(sub.websocket))
+                return
+            sub.queue.get_nowait()
+            sub.dropped += 1
+        sub.queue.put_nowait(frame)
+
+    async def _send_loop(self, sub: _Subscriber):
+        try:
+            while True:
+                frame = await sub.queue.get()
+                await sub.websocket.send_text(frame)
+                if sub.queue.empty():
+                    sub.dropped = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(sub.websocket)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
         try:
-            self.active_connections.remove(websocket)
-        except ValueError:
-            pass  # Already removed by broadcast() cleanup
-        logger.info(f"WebSocket disconnected. Total: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict[str, Any]):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            try:
-                self.active_connections.remove(conn)
-            except ValueError:
-                pass  # Already removed by disconnect()
+            await websocket.close(code=1013, reason="Too slow")
+        except Exception:
+            pass
 
 
 manager = ConnectionManager()
@@ -0,0 +1 @@
+# Micro-benchmarks for ProjectHub backend hot paths
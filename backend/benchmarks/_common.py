@@ -0,0 +1,63 @@
+"""Shared helpers for the backend benchmarks.
+
+Benchmarks run against a throwaway SQLite database so they need no
+running Postgres. Run them from ``backend/``::
+
+    python -m benchmarks.bench_task_serializer
+"""
+
+import os
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+import app.models  # noqa: F401 — register tables on Base.metadata
+
+
+def make_session(url: str = "sqlite:///:memory:"):
+    """Fresh schema on a private engine. Returns (engine, session)."""
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, autoflush=False)()
+
+
+class QueryCounter:
+    """Counts statements sent to ``engine`` while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timed(results: dict, key: str):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+def report(title: str, rows: list[tuple]):
+    print(f"\n{title}")
+    print("-" * len(title))
+    for row in rows:
+        print("  " + "  ".join(str(c) for c in row))
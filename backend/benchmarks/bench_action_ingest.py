@@ -0,0 +1,91 @@
+"""Agent action ingestion: commit per request vs. the write-behind pipeline.
+
+Uses a file-backed SQLite database so every COMMIT pays for a real
+fsync, as it would on the API server. Five simulated agents submit
+N_ACTIONS between them.
+
+    python -m benchmarks.bench_action_ingest [N_ACTIONS]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+from benchmarks._common import QueryCounter, make_session, report, timed
+
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest
+from app.ingest import ActionPipeline
+from app.models import Agent, AgentAction, AgentType
+
+N_AGENTS = 5
+
+
+def seed(db) -> list[Agent]:
+    agents = [Agent(name=f"agent-{i}", agent_type=AgentType.CLAUDE_CODE, api_key=f"k{i}")
+              for i in range(N_AGENTS)]
+    db.add_all(agents)
+    db.commit()
+    return agents
+
+
+def _row(agent: Agent, n: int) -> dict:
+    return {"agent_id": agent.id, "action_type": "tool_call",
+            "summary": f"Edit: file_{n}.py", "metadata_json": '{"tool_name": "Edit"}'}
+
+
+def per_request(db, agents, n_actions: int):
+    """The previous request path: INSERT, COMMIT and refresh for every action."""
+    for n in range(n_actions):
+        action = AgentAction(**_row(agents[n % N_AGENTS], n))
+        db.add(action)
+        db.commit()
+        db.refresh(action)
+
+
+def write_behind(engine, agents, n_actions: int):
+    async def agent_loop(pipeline, agent, count):
+        for n in range(count):
+            await pipeline.submit(_row(agent, n), agent.name, agent.agent_type)
+
+    async def run():
+        pipeline = ActionPipeline(session_factory=sessionmaker(bind=engine))
+        pipeline.start()
+        per_agent = n_actions // N_AGENTS
+        await asyncio.gather(*(agent_loop(pipeline, a, per_agent) for a in agents))
+        await pipeline.stop()
+
+    asyncio.run(run())
+
+
+async def _no_broadcast(message):
+    pass
+
+
+def main(n_actions: int = 5_000):
+    ingest.manager.broadcast = _no_broadcast
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("per-request", "write-behind"):
+            engine, db = make_session(f"sqlite:///{os.path.join(tmp, name)}.db")
+            agents = seed(db)
+            timings: dict = {}
+            with QueryCounter(engine) as qc, timed(timings, name):
+                if name == "per-request":
+                    per_request(db, agents, n_actions)
+                else:
+                    write_behind(engine, agents, n_actions)
+            stored = db.query(AgentAction).count()
+            seconds = timings[name]
+            rows.append((f"{name:<12}", f"stored={stored:<6}", f"statements={qc.count:<6}",
+                         f"{seconds * 1000:9.1f} ms", f"{stored / seconds:10.0f} actions/s"))
+            db.close()
+            engine.dispose()
+
+    report(f"ingest {n_actions} agent actions from {N_AGENTS} agents", rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000)
@@ -0,0 +1,157 @@
+"""Concurrent agent traffic: blocking DB calls vs. the asyncio driver.
+
+N_AGENTS simulated agents each send heartbeats that change status (so
+every one writes the agent row) interleaved with logged actions, messages
+to a peer and task claims, each claim then completed or released, all at
+once, through the ASGI app. "blocking" runs the handlers on a session
+whose round trips block the event loop, as the ``async def`` handlers did
+on ``get_db``; "async" uses ``get_async_db`` on aiosqlite / asyncpg.
+
+Besides throughput it reports the longest event-loop stall seen by a 1 ms
+ticker: with blocking calls every request queues behind the DB work of
+the others. Engines come from ``app.database`` so they use the pool
+settings (``DB_POOL_SIZE`` etc.) and, on SQLite, WAL. SQLite still runs
+one writer at a time; pass a Postgres URL to see throughput scale with
+the connection pool.
+
+    python -m benchmarks.bench_async_agents [N_AGENTS] [ROUNDS] [DATABASE_URL]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks._common import report
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest
+from app.agent_cache import agent_cache
+from app.database import Base, get_async_db, make_async_engine, make_engine
+from app.liveness import liveness
+from app.main import app
+from app.models import Agent, AgentType, Project, Task, TaskStatus, User
+from app.routers.agents import _hash_key
+
+
+def seed(url: str, n_agents: int, n_tasks: int) -> list[int]:
+    engine = create_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        agents = [Agent(name=f"agent-{i}", agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key(f"key-{i}"))
+                  for i in range(n_agents)]
+        db.add_all(agents)
+        project = Project(name="Bench", owner=User(username="bench", email="bench@example.com", hashed_password="x"))
+        db.add_all(Task(title=f"task {i}", project=project, status=TaskStatus.TODO) for i in range(n_tasks))
+        db.commit()
+        ids = [a.id for a in agents]
+    engine.dispose()
+    return ids
+
+
+async def agent_traffic(client: httpx.AsyncClient, index: int, ids: list[int], rounds: int, latencies: list):
+    agent_id, peer_id = ids[index], ids[(index + 1) % len(ids)]
+    headers = {"X-Agent-Key": f"key-{index}"}
+
+    async def post(path, body=None, **params):
+        start = time.perf_counter()
+        resp = await client.post(path, headers=headers, json=body, params=params)
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        return resp
+
+    for i in range(rounds):
+        await post(f"/api/agents/{agent_id}/heartbeat", {"status": "working" if i % 2 else "idle"})
+        await post(f"/api/agents/{agent_id}/actions", {"action_type": "tool_call", "summary": f"step {i}"})
+        await post(f"/api/agents/{agent_id}/messages", {"recipient_id": peer_id, "subject": f"step {i}"})
+        claimed = await post("/api/agents/queue/claim", {})
+        if claimed.status_code == 200:
+            # Alternate finishing and handing back the claimed task
+            await post(f"/api/agents/queue/{'release' if i % 2 else 'complete'}", task_id=claimed.json()["id"])
+
+
+async def run(url: str, mode: str, n_agents: int, rounds: int):
+    ids = seed(url, n_agents, n_agents * rounds)
+    agent_cache.clear()
+    liveness.clear()
+
+    if mode == "blocking":
+        sync_engine = make_engine(url)
+        SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+
+        async def get_db_override():
+            # AsyncSession API, but every round trip runs on the event loop thread
+            session = AsyncSession(sync_session_class=lambda **kw: SyncSession())
+            try:
+                yield session
+            finally:
+                session.sync_session.close()
+        dispose = sync_engine.dispose
+    else:
+        async_engine = make_async_engine(url)
+        Sessions = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+        async def get_db_override():
+            async with Sessions() as session:
+                yield session
+
+        async def dispose():
+            await async_engine.dispose()
+
+    app.dependency_overrides[get_async_db] = get_db_override
+    stalls, latencies, done = [0.0], [], asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls[0] = max(stalls[0], now - last - 0.001)
+            last = now
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tick = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            await asyncio.gather(*(agent_traffic(client, i, ids, rounds, latencies) for i in range(len(ids))))
+            seconds = time.perf_counter() - start
+            done.set()
+            await tick
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        result = dispose()
+        if asyncio.iscoroutine(result):
+            await result
+
+    latencies.sort()
+    return (f"{mode:<9}", f"requests={len(latencies):<6}", f"{len(latencies) / seconds:8.0f} req/s",
+            f"p50 {latencies[len(latencies) // 2] * 1000:6.1f} ms",
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.1f} ms",
+            f"max loop stall {stalls[0] * 1000:6.1f} ms")
+
+
+def main(n_agents: int = 20, rounds: int = 25, url: str = ""):
+    async def noop_broadcast(message, topics=(), user_id=None):
+        pass
+
+    ingest.manager.broadcast = noop_broadcast  # no WebSocket clients here
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("blocking", "async"):
+            db_url = url or f"sqlite:///{os.path.join(tmp, mode)}.db"
+            rows.append(asyncio.run(run(db_url, mode, n_agents, rounds)))
+    report(f"{n_agents} agents x {rounds} rounds of heartbeat + action + message + claim + complete/release", rows)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if len(args) > 0 else 20,
+         int(args[1]) if len(args) > 1 else 25,
+         args[2] if len(args) > 2 else "")
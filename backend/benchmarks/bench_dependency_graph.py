@@ -0,0 +1,91 @@
+"""adjust-dates: ORM BFS shift vs. edge-table earliest-start pass.
+
+Builds a synthetic project of N tasks where each task depends on up to
+five earlier ones (~50k edges at the default size), then moves the due
+date of the first task and times both implementations.
+
+    python -m benchmarks.bench_dependency_graph [N_TASKS]
+"""
+
+import random
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks._common import QueryCounter, make_session, report, timed
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from app.dependency_graph import reschedule
+from app.models import Project, Task, User, task_dependencies
+
+EDGES_PER_TASK = 5
+
+
+def seed(db, n_tasks: int) -> int:
+    owner = User(username="bench", email="bench@bench.test", hashed_password="x")
+    project = Project(name="Graph", owner=owner)
+    db.add_all([owner, project])
+    db.flush()
+
+    base = datetime(2026, 1, 1)
+    db.execute(insert(Task), [
+        {"title": f"T{i}", "project_id": project.id,
+         "start_date": base + timedelta(hours=i), "due_date": base + timedelta(hours=i + 4)}
+        for i in range(n_tasks)
+    ])
+    ids = [r.id for r in db.query(Task.id).order_by(Task.id)]
+    rng = random.Random(42)
+    edges = []
+    for i in range(1, n_tasks):
+        for dep in rng.sample(range(max(0, i - 50), i), min(EDGES_PER_TASK, i)):
+            edges.append({"task_id": ids[i], "depends_on_id": ids[dep]})
+    db.execute(insert(task_dependencies), edges)
+    db.commit()
+    return project.id, ids[0], len(edges)
+
+
+def legacy_adjust(db, task, new_end):
+    """The previous implementation: load every task with dependents, BFS with list.pop(0)."""
+    shift = new_end - task.due_date
+    task.due_date = new_end
+    task.start_date = task.start_date + shift
+    all_tasks = db.query(Task).options(joinedload(Task.dependents)).filter(
+        Task.project_id == task.project_id).all()
+    task_map = {t.id: t for t in all_tasks}
+    adjusted = [task.id]
+    to_process = [t.id for t in task_map[task.id].dependents]
+    while to_process:
+        dep_id = to_process.pop(0)
+        if dep_id in adjusted:
+            continue
+        dep = task_map[dep_id]
+        dep.start_date = dep.start_date + shift
+        dep.due_date = dep.due_date + shift
+        adjusted.append(dep_id)
+        to_process.extend(d.id for d in dep.dependents)
+    db.flush()
+    return adjusted
+
+
+def main(n_tasks: int = 10_000):
+    rows = []
+    for name, fn in (("bfs-shift", legacy_adjust), ("graph", reschedule)):
+        engine, db = make_session()
+        project_id, root_id, n_edges = seed(db, n_tasks)
+        root = db.get(Task, root_id)
+        new_end = root.due_date + timedelta(days=3)
+
+        timings: dict = {}
+        with QueryCounter(engine) as qc, timed(timings, name):
+            adjusted = fn(db, root, new_end)
+        db.rollback()
+        rows.append((f"{name:<10}", f"queries={qc.count:<6}", f"rows moved={len(adjusted):<6}",
+                     f"{timings[name] * 1000:9.1f} ms"))
+        engine.dispose()
+
+    report(f"adjust-dates on {n_tasks} tasks / {n_edges} edges", rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,100 @@
+"""Login bursts: bcrypt on the event loop vs. the password-hash pool.
+
+N_LOGINS concurrent ``POST /api/auth/login`` requests go through the ASGI
+app while a probe requests ``GET /health`` every 10 ms. "inline" verifies
+passwords on the event loop, as a hash call in an ``async def`` handler
+would; "pool" uses ``app.auth``'s bounded thread pool
+(``PASSWORD_HASH_WORKERS``, default one per CPU). Login throughput scales
+with the pool size since bcrypt releases the GIL; the longest gap between
+probe responses shows what the burst does to everyone else. The cost
+factor comes from ``BCRYPT_ROUNDS``.
+
+    python -m benchmarks.bench_password_hash [N_LOGINS]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks._common import report
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app import auth
+from app.database import Base, get_async_db, make_async_engine
+from app.main import app
+from app.models import User
+
+
+def seed(url: str):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(email="ada@example.com", username="ada", hashed_password=auth.get_password_hash("pw")))
+        db.commit()
+    engine.dispose()
+
+
+async def run(url: str, mode: str, n_logins: int):
+    async_engine = make_async_engine(url)
+    Sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_db_override():
+        async with Sessions() as session:
+            yield session
+
+    async def inline(fn, *args):
+        return fn(*args)
+
+    pooled = auth._in_hash_pool
+    if mode == "inline":
+        auth._in_hash_pool = inline
+    app.dependency_overrides[get_async_db] = get_db_override
+    answered, done = [], asyncio.Event()
+
+    async def probe(client):
+        while not done.is_set():
+            await client.get("/health")
+            answered.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def login(client):
+        resp = await client.post("/api/auth/login", data={"username": "ada", "password": "pw"})
+        resp.raise_for_status()
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            prober = asyncio.create_task(probe(client))
+            start = time.perf_counter()
+            await asyncio.gather(*(login(client) for _ in range(n_logins)))
+            seconds = time.perf_counter() - start
+            done.set()
+            await prober
+    finally:
+        auth._in_hash_pool = pooled
+        app.dependency_overrides.pop(get_async_db, None)
+        await async_engine.dispose()
+
+    gap = max(b - a for a, b in zip(answered, answered[1:]))
+    return (f"{mode:<7}", f"{n_logins / seconds:6.1f} logins/s", f"burst {seconds * 1000:7.0f} ms",
+            f"/health answered {len(answered):4}x", f"longest gap {gap * 1000:6.1f} ms")
+
+
+def main(n_logins: int = 16):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'hub.db')}"
+        seed(url)
+        for mode in ("inline", "pool"):
+            rows.append(asyncio.run(run(url, mode, n_logins)))
+    workers = auth._hash_pool._max_workers
+    report(f"{n_logins} concurrent logins, bcrypt cost {auth.settings.bcrypt_rounds}, {workers} hash thread(s)", rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 16)
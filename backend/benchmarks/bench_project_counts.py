@@ -0,0 +1,62 @@
+"""Project listing: per-project COUNT queries vs. one grouped aggregate.
+
+Seeds K projects with a handful of tasks each and times the dashboard
+project list both ways, reporting statement count for each K.
+
+    python -m benchmarks.bench_project_counts
+"""
+
+from benchmarks._common import QueryCounter, make_session, report, timed
+
+from app.models import Project, Task, TaskStatus, User
+from app.routers.projects import get_task_counts
+
+
+def seed(db, n_projects: int, tasks_per_project: int = 10) -> User:
+    owner = User(username=f"owner{n_projects}", email=f"o{n_projects}@bench.test", hashed_password="x")
+    db.add(owner)
+    db.flush()
+    projects = [Project(name=f"P{i}", owner_id=owner.id) for i in range(n_projects)]
+    db.add_all(projects)
+    db.flush()
+    db.add_all(
+        Task(title=f"T{j}", project_id=p.id,
+             status=TaskStatus.DONE if j % 3 == 0 else TaskStatus.TODO)
+        for p in projects for j in range(tasks_per_project)
+    )
+    db.commit()
+    return owner
+
+
+def per_project_counts(db, project_ids):
+    out = {}
+    for pid in project_ids:
+        total = db.query(Task).filter(Task.project_id == pid, Task.parent_id == None).count()
+        done = db.query(Task).filter(
+            Task.project_id == pid, Task.parent_id == None, Task.status == TaskStatus.DONE
+        ).count()
+        out[pid] = (total, done)
+    return out
+
+
+def main():
+    rows = []
+    for n_projects in (10, 50, 200):
+        engine, db = make_session()
+        owner = seed(db, n_projects)
+        project_ids = [p.id for p in db.query(Project.id).filter(Project.owner_id == owner.id)]
+
+        for name, fn in (("per-project", per_project_counts), ("grouped", get_task_counts)):
+            timings: dict = {}
+            with QueryCounter(engine) as qc, timed(timings, name):
+                result = fn(db, project_ids)
+            assert len(result) == n_projects
+            rows.append((f"projects={n_projects:<4}", f"{name:<12}",
+                         f"queries={qc.count:<4}", f"{timings[name] * 1000:7.2f} ms"))
+        engine.dispose()
+
+    report("Project task counts", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cold worker boot: import ``app.main``, then first requests.
+
+Each run is a fresh interpreter, as a new uvicorn worker would be. It
+times importing the app, the first ``/health`` probe, the first request
+to an API router (``GET /api/tasks/``, unauthenticated, so no database
+round trip) and building the OpenAPI schema, which loads every router.
+While the first API request runs, a ticker on the event loop records the
+longest gap between its ticks: how long other requests would have
+waited while the router group was imported.
+"lazy" is the app as shipped; "eager" includes every router straight
+after import, as the app did before the router registry. The schema is
+not touched in either: migrations run once per deploy (``python -m
+app.migrations upgrade``), not per worker.
+
+    python -m benchmarks.bench_startup [RUNS]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks._common import report
+
+STEPS = ("import app.main", "first /health", "first /api request", "openapi schema", "loop stall")
+
+CHILD = r"""
+import asyncio, json, sys, time
+import httpx  # the client, not the app
+start = time.perf_counter()
+from app.main import app
+if sys.argv[1] == "eager":
+    app.routers.load_all()
+marks = [time.perf_counter()]
+
+async def ticker(gaps):
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+async def boot():
+    gaps = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/health")
+        marks.append(time.perf_counter())
+        tick = asyncio.create_task(ticker(gaps))
+        await asyncio.sleep(0)
+        await client.get("/api/tasks/")
+        marks.append(time.perf_counter())
+        tick.cancel()
+    app.openapi()
+    marks.append(time.perf_counter())
+    return max(gaps, default=0.0)
+
+stall = asyncio.run(boot())
+print(json.dumps([(m - p) * 1000 for p, m in zip([start] + marks, marks)] + [stall * 1000]))
+"""
+
+
+def boot(mode: str) -> list[float]:
+    env = dict(os.environ, DATABASE_URL="sqlite:///:memory:")
+    out = subprocess.run([sys.executable, "-c", CHILD, mode], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main(runs: int = 7):
+    rows = []
+    for mode in ("lazy", "eager"):
+        samples = [boot(mode) for _ in range(runs)]
+        medians = [statistics.median(step) for step in zip(*samples)]
+        rows.append((f"{mode:<6}", *(f"{name} {ms:7.1f} ms" for name, ms in zip(STEPS, medians)),
+                     f"total {sum(medians[:-1]):7.1f} ms"))
+    report(f"cold worker boot, median of {runs} runs", rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,118 @@
+"""Task claims under contention: read-then-write vs. the claim queue.
+
+N_AGENTS threads, each with its own session, claim tasks until the queue
+is empty. "read-then-write" is the previous claim path (SELECT the first
+available task, then UPDATE it through the ORM); "claim-queue" and
+"claim-many" use ``app.task_queue.claim_tasks`` with 1 and 10 tasks per
+call. Double claims are tasks handed to more than one agent.
+
+Uses a file-backed SQLite database by default; pass a Postgres URL to
+exercise ``FOR UPDATE SKIP LOCKED`` instead (its tables are dropped and
+recreated).
+
+    python -m benchmarks.bench_task_claim [N_TASKS] [N_AGENTS] [DATABASE_URL]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+from benchmarks._common import report, timed
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Project, Task, TaskStatus, User
+from app.task_queue import claim_tasks
+
+
+def seed(Session, n_tasks: int):
+    with Session() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        project = Project(name="Bench", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        db.add_all(Task(title=f"task {i}", project_id=project.id, status=TaskStatus.TODO)
+                   for i in range(n_tasks))
+        db.commit()
+
+
+def read_then_write(db, agent_id: int) -> list[int]:
+    task = db.query(Task).filter(
+        Task.agent_id.is_(None),
+        Task.parent_id.is_(None),
+        Task.status.in_([TaskStatus.BACKLOG, TaskStatus.TODO]),
+    ).order_by(Task.priority.asc(), Task.created_at.asc()).first()
+    if not task:
+        return []
+    task.agent_id = agent_id
+    task.status = TaskStatus.IN_PROGRESS
+    return [task.id]
+
+
+def run(url: str, mode: str, n_tasks: int, n_agents: int):
+    kwargs = {"connect_args": {"timeout": 60}} if url.startswith("sqlite") else {"pool_size": n_agents}
+    engine = create_engine(url, **kwargs)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    seed(Session, n_tasks)
+
+    claims: list[int] = []
+    errors = Counter()
+    lock = threading.Lock()
+
+    def agent(agent_id: int):
+        with Session() as db:
+            while True:
+                try:
+                    if mode == "read-then-write":
+                        got = read_then_write(db, agent_id)
+                    else:
+                        got = claim_tasks(db, agent_id, count=10 if mode == "claim-many" else 1)
+                    db.commit()
+                except Exception as exc:
+                    db.rollback()
+                    with lock:
+                        errors[type(exc).__name__] += 1
+                    continue
+                if not got:
+                    return
+                with lock:
+                    claims.extend(got)
+
+    timings: dict = {}
+    threads = [threading.Thread(target=agent, args=(i + 1,)) for i in range(n_agents)]
+    with timed(timings, mode):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    engine.dispose()
+
+    doubles = sum(n - 1 for n in Counter(claims).values() if n > 1)
+    seconds = timings[mode]
+    return (f"{mode:<16}", f"claims={len(claims):<6}", f"double-claims={doubles:<5}",
+            f"retries={sum(errors.values()):<5}", f"{seconds * 1000:9.1f} ms",
+            f"{len(set(claims)) / seconds:9.0f} tasks/s")
+
+
+def main(n_tasks: int = 2_000, n_agents: int = 16, url: str = ""):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("read-then-write", "claim-queue", "claim-many"):
+            db_url = url or f"sqlite:///{os.path.join(tmp, mode)}.db"
+            rows.append(run(db_url, mode, n_tasks, n_agents))
+    report(f"claim {n_tasks} tasks with {n_agents} concurrent agents", rows)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if len(args) > 0 else 2_000,
+         int(args[1]) if len(args) > 1 else 16,
+         args[2] if len(args) > 2 else "")
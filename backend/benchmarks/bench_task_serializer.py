@@ -0,0 +1,108 @@
+"""Task list serialization: joinedload walk vs. set-based serializer.
+
+Seeds a project with N top-level tasks (each with assignees, subtasks
+and dependencies) and serializes the whole list both ways, reporting
+statement count and wall time per 1k tasks.
+
+    python -m benchmarks.bench_task_serializer [N]
+"""
+
+import sys
+
+from benchmarks._common import QueryCounter, make_session, report, timed
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Project, Task, TaskStatus, User
+from app.schemas import AgentBrief, TaskBrief, TaskResponse, UserBrief
+from app.serializers import TASK_COLUMNS, serialize_tasks
+
+
+def seed(db, n_tasks: int) -> int:
+    users = [
+        User(username=f"u{i}", email=f"u{i}@bench.test", hashed_password="x")
+        for i in range(10)
+    ]
+    project = Project(name="Bench", owner=users[0])
+    db.add_all(users + [project])
+    db.flush()
+
+    tasks = []
+    for i in range(n_tasks):
+        t = Task(title=f"Task {i}", project_id=project.id, position=i)
+        t.assignees = [users[i % 10], users[(i + 3) % 10]]
+        if len(tasks) >= 2:
+            t.dependencies = [tasks[-1], tasks[-2]]
+        tasks.append(t)
+    db.add_all(tasks)
+    db.flush()
+    db.add_all(
+        Task(title=f"Sub {t.id}.{j}", project_id=project.id, parent_id=t.id,
+             status=TaskStatus.DONE if j == 0 else TaskStatus.TODO)
+        for t in tasks for j in range(3)
+    )
+    db.commit()
+    return project.id
+
+
+def legacy_serialize(db, project_id: int) -> list[TaskResponse]:
+    """The pre-batching path: four joinedloads and a per-row walk."""
+    tasks = db.query(Task).options(
+        joinedload(Task.assignees),
+        joinedload(Task.subtasks),
+        joinedload(Task.dependencies),
+        joinedload(Task.agent),
+    ).filter(Task.project_id == project_id, Task.parent_id == None).order_by(Task.position).all()
+
+    out = []
+    for task in tasks:
+        out.append(TaskResponse(
+            id=task.id, title=task.title, description=task.description,
+            status=task.status, priority=task.priority, color=task.color,
+            start_date=task.start_date, due_date=task.due_date,
+            completed_at=task.completed_at, estimated_hours=task.estimated_hours,
+            parent_id=task.parent_id, position=task.position,
+            project_id=task.project_id, created_at=task.created_at,
+            updated_at=task.updated_at,
+            assignees=[UserBrief(id=u.id, username=u.username, full_name=u.full_name,
+                                 avatar_color=u.avatar_color) for u in task.assignees],
+            subtasks=[TaskBrief(id=s.id, title=s.title, status=s.status,
+                                priority=s.priority) for s in task.subtasks],
+            dependencies=[TaskBrief(id=d.id, title=d.title, status=d.status,
+                                    priority=d.priority) for d in task.dependencies],
+            subtask_count=len(task.subtasks),
+            subtask_completed=len([s for s in task.subtasks if s.status == TaskStatus.DONE]),
+            agent_id=task.agent_id,
+            agent=AgentBrief(id=task.agent.id, name=task.agent.name,
+                             agent_type=task.agent.agent_type, status=task.agent.status,
+                             is_alive=False) if task.agent else None,
+        ))
+    return out
+
+
+def batched_serialize(db, project_id: int) -> list[TaskResponse]:
+    rows = db.query(*TASK_COLUMNS).filter(
+        Task.project_id == project_id, Task.parent_id == None
+    ).order_by(Task.position).all()
+    return serialize_tasks(db, rows)
+
+
+def main(n_tasks: int = 2000):
+    engine, db = make_session()
+    project_id = seed(db, n_tasks)
+
+    rows = []
+    for name, fn in (("joinedload", legacy_serialize), ("batched", batched_serialize)):
+        db.expunge_all()
+        timings: dict = {}
+        with QueryCounter(engine) as qc, timed(timings, name):
+            result = fn(db, project_id)
+        assert len(result) == n_tasks
+        per_1k = timings[name] * 1000 / (n_tasks / 1000)
+        rows.append((f"{name:<11}", f"queries={qc.count:<4}", f"{per_1k:8.1f} ms / 1k tasks"))
+
+    report(f"Task list serialization ({n_tasks} tasks, 3 subtasks, 2 assignees, 2 deps each)", rows)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -6,16 +6,27 @@ Uses SQLite in-memory database for fast, isolated tests.
 
 import os
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["REMINDER_DISPATCHER_ENABLED"] = "false"
+os.environ["ACTION_WRITE_BEHIND"] = "false"
+os.environ["LIVENESS_SWEEPER_ENABLED"] = "false"
+os.environ["TASK_LEASE_SWEEPER_ENABLED"] = "false"
+os.environ["BCRYPT_ROUNDS"] = "4"  # the minimum; keeps hashing fast
 
 import pytest
 from typing import Generator
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, get_async_db, get_db, get_session_factory
+import app.models  # noqa: F401 — register tables on Base.metadata
 from app.main import app
+from app import view_cache
+from app.agent_cache import agent_cache
+from app.principal_cache import principal_cache
+from app.liveness import liveness
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -34,6 +45,10 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=conne
 def db() -> Generator[Session, None, None]:
     """Fresh database per test."""
     Base.metadata.create_all(bind=engine)
+    view_cache.clear_all()  # ids are reused across tests
+    agent_cache.clear()
+    principal_cache.clear()
+    liveness.clear()
     transaction = connection.begin()
     session = TestingSessionLocal()
     nested = connection.begin_nested()
@@ -61,7 +76,15 @@ def client(db: Session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    async def override_get_async_db():
+        # The AsyncSession API over the test session, so sync and async
+        # handlers share one connection and transaction
+        yield AsyncSession(sync_session_class=lambda **kw: db)
+
     app.dependency_overrides[get_db] = override_get_db
+    # Sessions of their own, on the test connection (closing them leaves db alone)
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app, base_url="http://localhost") as c:
         yield c
     app.dependency_overrides.clear()
@@ -0,0 +1,110 @@
+"""Tests for agent action logging: single, batch and hook endpoints."""
+
+from __future__ import annotations
+
+import pytest
+
+from app import ingest
+from app.models import Agent, AgentAction, AgentType
+from app.routers.agents import _hash_key
+
+
+def _mk_agent(db, name: str, key: str, session_id: str | None = None) -> Agent:
+    a = Agent(name=name, agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key(key), session_id=session_id)
+    db.add(a)
+    db.commit()
+    db.refresh(a)
+    return a
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    messages = []
+
+    async def broadcast(message):
+        messages.append(message)
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    return messages
+
+
+def test_single_action_is_stored_and_returned(db, client, sent):
+    agent = _mk_agent(db, "builder", "key-1")
+    resp = client.post(f"/api/agents/{agent.id}/actions", headers={"X-Agent-Key": "key-1"},
+                       json={"action_type": "decision", "summary": "Use keyset paging", "metadata": {"a": 1}})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["summary"] == "Use keyset paging" and body["metadata"] == {"a": 1}
+    assert [m["type"] for m in sent] == ["agent_action"]
+    assert sent[0]["action"]["id"] == body["id"]
+
+
+def test_queued_response_is_opt_in_and_documented(client):
+    operation = client.get("/openapi.json").json()["paths"]["/api/agents/{agent_id}/actions"]["post"]
+    assert {"200", "202"} <= set(operation["responses"])
+    wait = next(p for p in operation["parameters"] if p["name"] == "wait")
+    assert wait["schema"]["default"] is True
+
+
+def test_action_batch_reports_each_item(db, client, sent):
+    agent = _mk_agent(db, "builder", "key-1")
+    resp = client.post(f"/api/agents/{agent.id}/actions:batch", headers={"X-Agent-Key": "key-1"}, json=[
+        {"action_type": "tool_call", "summary": "Edit a.py"},
+        {"action_type": "tool_call"},
+        {"action_type": "tool_call", "summary": "Edit b.py", "metadata": {"lines": 3}},
+    ])
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["stored"] == 2
+    ok = [r["ok"] for r in body["results"]]
+    assert ok == [True, False, True]
+    assert "summary" in body["results"][1]["error"]
+
+    stored = db.query(AgentAction).order_by(AgentAction.id).all()
+    assert [a.id for a in stored] == [body["results"][0]["action_id"], body["results"][2]["action_id"]]
+    assert [a.summary for a in stored] == ["Edit a.py", "Edit b.py"]
+    # One coalesced frame for the whole batch
+    assert len(sent) == 1 and sent[0]["type"] == "agent_actions"
+    assert [a["summary"] for a in sent[0]["actions"]] == ["Edit a.py", "Edit b.py"]
+
+
+def test_action_batch_checks_key_and_size(db, client, sent, monkeypatch):
+    agent = _mk_agent(db, "builder", "key-1")
+    other = _mk_agent(db, "reviewer", "key-2")
+    item = {"action_type": "tool_call", "summary": "x"}
+
+    resp = client.post(f"/api/agents/{agent.id}/actions:batch", headers={"X-Agent-Key": "key-2"}, json=[item])
+    assert resp.status_code == 403
+
+    monkeypatch.setattr(ingest, "MAX_BATCH_ITEMS", 2)
+    resp = client.post(f"/api/agents/{other.id}/actions:batch", headers={"X-Agent-Key": "key-2"}, json=[item] * 3)
+    assert resp.status_code == 413
+    assert db.query(AgentAction).count() == 0 and sent == []
+
+
+def test_hook_batch_spans_sessions(db, client, sent):
+    first = _mk_agent(db, "first", "key-1", session_id="s-1")
+    second = _mk_agent(db, "second", "key-2", session_id="s-2")
+    resp = client.post("/api/hooks/tool-action:batch", json=[
+        {"session_id": "s-1", "tool_name": "Edit", "tool_input": {"file_path": "a.py"}},
+        {"session_id": "s-1", "tool_name": "Read", "tool_input": {"file_path": "a.py"}},
+        {"session_id": "s-9", "tool_name": "Bash", "tool_input": "ls"},
+        {"session_id": "s-2", "tool_name": "Bash", "tool_input": "pytest"},
+        {"tool_name": "Bash"},
+    ])
+    assert resp.status_code == 200
+    body = resp.json()
+    results = body["results"]
+    assert body["stored"] == 2
+    assert [r["ok"] for r in results] == [True, True, False, True, False]
+    assert results[1]["skipped"]
+    assert results[2]["error"] == "Unknown session_id"
+    assert "session_id" in results[4]["error"]
+
+    stored = db.query(AgentAction).order_by(AgentAction.id).all()
+    assert [(a.agent_id, a.summary) for a in stored] == [
+        (first.id, 'Edit: {"file_path": "a.py"}'),
+        (second.id, "Bash: pytest"),
+    ]
+    assert len(sent) == 1
+    assert [a["agent_name"] for a in sent[0]["actions"]] == ["first", "second"]
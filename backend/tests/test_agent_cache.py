@@ -0,0 +1,111 @@
+"""Tests for the authenticated-agent cache (app/agent_cache.py)."""
+
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event
+
+from app import ingest
+from app.agent_cache import AgentCredential, AgentCredentialCache, agent_cache
+from app.auth import get_current_user
+from app.main import app
+from app.models import Agent, AgentStatus, AgentType
+from app.routers.agents import _hash_key
+from tests.conftest import connection
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    async def broadcast(message):
+        pass
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+
+
+@pytest.fixture
+def as_user():
+    app.dependency_overrides[get_current_user] = lambda: object()
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def agent_lookups():
+    """SELECTs against the agents table."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.startswith("SELECT") and "FROM agents" in statement:
+            statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(connection, "before_cursor_execute", on_execute)
+
+
+def _mk_agent(db, key: str, session_id: str | None = None) -> Agent:
+    a = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key(key), session_id=session_id)
+    db.add(a)
+    db.commit()
+    db.refresh(a)
+    return a
+
+
+def _log(client, agent_id: int, key: str):
+    return client.post(f"/api/agents/{agent_id}/actions", headers={"X-Agent-Key": key},
+                       json={"action_type": "tool_call", "summary": "Edit a.py"})
+
+
+def test_repeat_calls_skip_the_agent_lookup(db, client, agent_lookups):
+    agent_id = _mk_agent(db, "key-1").id
+    agent_lookups.clear()
+    for _ in range(3):
+        assert _log(client, agent_id, "key-1").status_code == 200
+    assert len(agent_lookups) == 1
+    assert agent_cache.stats()["hits"] == 2
+
+
+def test_hook_sessions_are_cached(db, client, agent_lookups):
+    _mk_agent(db, "key-1", session_id="s-1")
+    agent_lookups.clear()
+    event_body = {"session_id": "s-1", "tool_name": "Bash", "tool_input": "ls"}
+    for _ in range(3):
+        assert client.post("/api/hooks/tool-action", json=event_body).json()["ok"]
+    assert len(agent_lookups) == 1
+
+
+def test_deregister_invalidates(db, client, as_user):
+    agent = _mk_agent(db, "key-1", session_id="s-1")
+    assert _log(client, agent.id, "key-1").status_code == 200
+    # The key lookup also cached the agent's session
+    assert client.post("/api/hooks/tool-action", json={"session_id": "s-1", "tool_name": "Bash"}).status_code == 200
+
+    assert client.delete(f"/api/agents/{agent.id}").status_code == 200
+    assert _log(client, agent.id, "key-1").status_code == 401
+    assert client.post("/api/hooks/tool-action", json={"session_id": "s-1", "tool_name": "Bash"}).status_code == 404
+
+    stats = client.get("/api/agents/credential-cache").json()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["hit_rate"] == 0.25
+
+
+def test_heartbeat_writes_status_through(db, client):
+    agent = _mk_agent(db, "key-1")
+    _log(client, agent.id, "key-1")
+    client.post(f"/api/agents/{agent.id}/heartbeat", headers={"X-Agent-Key": "key-1"}, json={"status": "working"})
+    assert agent_cache.get_by_key(_hash_key("key-1")).status == AgentStatus.WORKING
+
+
+def test_entries_expire_and_lru_evicts(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("app.agent_cache.time.monotonic", lambda: now[0])
+    cache = AgentCredentialCache(ttl=10, max_entries=2)
+    for i in (1, 2):
+        cache.put(AgentCredential(i, f"a{i}", AgentType.CUSTOM, AgentStatus.IDLE), key_hash=f"h{i}")
+    assert cache.get_by_key("h1").id == 1  # h2 is now least recently used
+    cache.put(AgentCredential(3, "a3", AgentType.CUSTOM, AgentStatus.IDLE), key_hash="h3")
+    assert cache.get_by_key("h2") is None
+    assert cache.get_by_key("h1").id == 1
+
+    now[0] = 11.0
+    assert cache.get_by_key("h1") is None
+    assert cache.stats()["entries"] == 1
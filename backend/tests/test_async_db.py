@@ -0,0 +1,93 @@
+"""Agent endpoints on the asyncio driver (app/database.py:get_async_db)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest
+from app.agent_cache import agent_cache
+from app.database import Base, async_database_url, get_async_db
+from app.liveness import liveness
+from app.main import app
+from app.models import Agent, AgentAction, AgentStatus, AgentType, Project, Task, TaskStatus, User
+from app.routers.agents import _hash_key
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db/hub") == "postgresql+asyncpg://u:p@db/hub"
+    assert async_database_url("postgresql+psycopg2://db/hub") == "postgresql+asyncpg://db/hub"
+    assert async_database_url("sqlite:///./hub.db") == "sqlite+aiosqlite:///./hub.db"
+    assert async_database_url("sqlite+aiosqlite:///./hub.db") == "sqlite+aiosqlite:///./hub.db"
+
+
+def test_agent_endpoints_over_aiosqlite(tmp_path, monkeypatch):
+    pytest.importorskip("aiosqlite")
+    url = f"sqlite:///{tmp_path / 'hub.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        agent = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE,
+                      api_key=_hash_key("key-1"), session_id="sess-1")
+        user = User(username="tim", email="tim@hestia.test", hashed_password="x")
+        task = Task(title="ship", project=Project(name="Launch", owner=user), status=TaskStatus.TODO)
+        db.add_all([agent, user, task])
+        db.commit()
+        agent_id, task_id = agent.id, task.id
+
+    async_engine = create_async_engine(async_database_url(url))
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    async def broadcast(message):
+        pass
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    agent_cache.clear()
+    liveness.clear()
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    headers = {"X-Agent-Key": "key-1"}
+    try:
+        with TestClient(app, base_url="http://localhost") as client:
+            assert client.post(f"/api/agents/{agent_id}/heartbeat", headers=headers,
+                               json={"status": "working"}).status_code == 200
+            action = client.post(f"/api/agents/{agent_id}/actions", headers=headers,
+                                 json={"action_type": "decision", "summary": "plan"})
+            assert action.status_code == 200 and action.json()["id"]
+            batch = client.post(f"/api/agents/{agent_id}/actions:batch", headers=headers,
+                                json=[{"action_type": "tool_call", "summary": f"s{i}"} for i in range(3)])
+            assert batch.json()["stored"] == 3
+            hook = client.post("/api/hooks/tool-action",
+                               json={"session_id": "sess-1", "tool_name": "Bash", "tool_input": {"command": "ls"}})
+            assert hook.json()["action_id"]
+            claim = client.post("/api/agents/queue/claim", headers=headers, json={})
+            assert claim.status_code == 200 and claim.json()["id"] == task_id
+            message = client.post(f"/api/agents/{agent_id}/messages", headers=headers,
+                                  json={"recipient_id": agent_id, "subject": "note to self"})
+            assert message.status_code == 200 and message.json()["recipient_name"] == "builder"
+            assert client.post("/api/agents/queue/complete", headers=headers,
+                               params={"task_id": task_id}).status_code == 200
+            assert client.post(f"/api/agents/{agent_id}/heartbeat", headers={"X-Agent-Key": "nope"},
+                               json={}).status_code == 401
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        agent_cache.clear()
+        liveness.clear()
+        asyncio.run(async_engine.dispose())
+
+    with Session() as db:
+        stored = db.get(Agent, agent_id)
+        assert stored.status == AgentStatus.IDLE and stored.last_heartbeat is not None
+        assert db.get(Task, task_id).status == TaskStatus.DONE
+        # status change + decision + 3 batched + hook + claim + complete
+        assert db.query(AgentAction).count() == 8
+    engine.dispose()
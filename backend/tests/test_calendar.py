@@ -0,0 +1,128 @@
+"""Tests for the calendar endpoints (/api/calendar)."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.auth import get_current_user
+from app.main import app
+from app.models import Project, Task, TaskStatus, User
+
+
+def _mk_user(db, username: str = "tim") -> User:
+    u = User(
+        username=username,
+        email=f"{username}@hestia.test",
+        hashed_password="x",
+        full_name=username.title(),
+        avatar_color="#111111",
+        is_active=True,
+    )
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+@pytest.fixture
+def as_tim(db, client):
+    user = _mk_user(db, "tim")
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def project(db, as_tim) -> Project:
+    p = Project(name="Launch", owner_id=as_tim.id, color="#123456")
+    db.add(p)
+    db.commit()
+    db.refresh(p)
+    return p
+
+
+def _mk_task(db, project, title, start=None, due=None, **kwargs) -> Task:
+    t = Task(title=title, project_id=project.id, start_date=start, due_date=due, **kwargs)
+    db.add(t)
+    db.commit()
+    db.refresh(t)
+    return t
+
+
+def _titles(client, start, end, **params) -> list[str]:
+    resp = client.get("/api/calendar/tasks", params={"start_date": start, "end_date": end, **params})
+    assert resp.status_code == 200
+    return sorted(e["title"] for e in resp.json())
+
+
+def test_calendar_returns_tasks_overlapping_the_range(db, client, as_tim, project):
+    day = lambda d: datetime(2026, 3, d, 12)
+    _mk_task(db, project, "inside", day(10), day(12))
+    _mk_task(db, project, "starts-before", day(1), day(10))
+    _mk_task(db, project, "ends-after", day(14), day(28))
+    _mk_task(db, project, "spans", day(1), day(28))
+    _mk_task(db, project, "start-only", start=day(11))
+    _mk_task(db, project, "due-only", due=day(13))
+    _mk_task(db, project, "before", day(1), day(3))
+    _mk_task(db, project, "after", day(20), day(25))
+    _mk_task(db, project, "start-only-after", start=day(20))
+    _mk_task(db, project, "due-only-before", due=day(3))
+    _mk_task(db, project, "undated")
+
+    assert _titles(client, "2026-03-09", "2026-03-15") == [
+        "due-only", "ends-after", "inside", "spans", "start-only", "starts-before",
+    ]
+
+
+def test_calendar_tasks_with_one_date_are_open_ended(db, client, as_tim, project):
+    day = lambda d: datetime(2026, 3, d, 12)
+    _mk_task(db, project, "started-before", start=day(2))
+    _mk_task(db, project, "due-after", due=day(28))
+    _mk_task(db, project, "starts-after", start=day(20))
+    _mk_task(db, project, "was-due-before", due=day(3))
+
+    assert _titles(client, "2026-03-09", "2026-03-15") == ["due-after", "started-before"]
+
+
+def test_calendar_range_end_is_inclusive(db, client, as_tim, project):
+    _mk_task(db, project, "last-minute", due=datetime(2026, 3, 15, 23, 59))
+    assert _titles(client, "2026-03-15", "2026-03-15") == ["last-minute"]
+
+
+def test_calendar_payload_and_scoping(db, client, as_tim, project):
+    other = _mk_user(db, "mallory")
+    foreign = Project(name="Foreign", owner_id=other.id)
+    second = Project(name="Second", owner_id=as_tim.id, color="#abcdef")
+    db.add_all([foreign, second])
+    db.commit()
+    task = _mk_task(db, project, "mine", due=datetime(2026, 3, 10))
+    task.assignees = [as_tim]
+    db.commit()
+    _mk_task(db, second, "second", due=datetime(2026, 3, 10), color="#000000")
+    _mk_task(db, foreign, "theirs", due=datetime(2026, 3, 10))
+    _mk_task(db, project, "sub", due=datetime(2026, 3, 10), parent_id=task.id)
+
+    resp = client.get("/api/calendar/tasks", params={"start_date": "2026-03-01", "end_date": "2026-03-31"})
+    events = {e["title"]: e for e in resp.json()}
+    assert set(events) == {"mine", "second"}
+    assert events["mine"]["color"] == "#123456"
+    assert events["mine"]["project_name"] == "Launch"
+    assert events["mine"]["start"] == events["mine"]["end"]
+    assert [a["username"] for a in events["mine"]["assignees"]] == ["tim"]
+    assert events["second"]["color"] == "#000000"
+
+    assert _titles(client, "2026-03-01", "2026-03-31", project_id=second.id) == ["second"]
+    assert _titles(client, "2026-03-01", "2026-03-31", project_id=foreign.id) == []
+
+
+def test_upcoming_skips_done_tasks(db, client, as_tim, project):
+    soon = datetime.utcnow() + timedelta(days=2)
+    _mk_task(db, project, "open", due=soon)
+    _mk_task(db, project, "finished", due=soon, status=TaskStatus.DONE)
+    _mk_task(db, project, "later", due=soon + timedelta(days=30))
+
+    resp = client.get("/api/calendar/upcoming")
+    assert resp.status_code == 200
+    assert [(e["title"], e["project_name"]) for e in resp.json()] == [("open", "Launch")]
@@ -0,0 +1,105 @@
+"""Tests for pool configuration and pool metrics (app/database.py, app/pool_metrics.py)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+
+from app.auth import get_current_user
+from app.config import Settings
+from app.database import engine_options, make_async_engine, make_engine
+from app.main import app
+from app.pool_metrics import PoolMetrics
+
+
+def _settings(**overrides) -> Settings:
+    return Settings(**{"db_pool_size": 3, "db_max_overflow": 2, "db_pool_timeout": 5.0,
+                       "db_pool_recycle": 600, "db_statement_timeout_ms": 2500, **overrides})
+
+
+def test_engine_options_from_settings():
+    config = _settings()
+    options = engine_options("postgresql://u:p@db/hub", config)
+    assert options == {
+        "pool_size": 3, "max_overflow": 2, "pool_timeout": 5.0, "pool_recycle": 600, "pool_pre_ping": True,
+        "connect_args": {"options": "-c statement_timeout=2500"}, "poolclass": QueuePool,
+    }
+    async_options = engine_options("postgresql+asyncpg://u:p@db/hub", config, is_async=True)
+    assert async_options["connect_args"] == {"server_settings": {"statement_timeout": "2500"}}
+    assert engine_options("sqlite:///./hub.db", config)["connect_args"] == {"timeout": 2.5}
+    assert "connect_args" not in engine_options("postgresql://db/hub", _settings(db_statement_timeout_ms=0))
+    assert engine_options("sqlite:///:memory:", config) == {}
+
+
+def test_file_sqlite_uses_wal(tmp_path):
+    url = f"sqlite:///{tmp_path / 'hub.db'}"
+    engine = make_engine(url, _settings())
+    with engine.connect() as conn:
+        assert conn.scalar(text("PRAGMA journal_mode")) == "wal"
+        assert conn.scalar(text("PRAGMA synchronous")) == 1  # NORMAL
+    engine.dispose()
+
+    async def async_pragmas():
+        async_engine = make_async_engine(url, _settings())
+        async with async_engine.connect() as conn:
+            mode = await conn.scalar(text("PRAGMA journal_mode"))
+        await async_engine.dispose()
+        return mode
+
+    assert asyncio.run(async_pragmas()) == "wal"
+
+    engine = make_engine(url, _settings(sqlite_wal=False))
+    with engine.connect() as conn:
+        assert conn.scalar(text("PRAGMA synchronous")) == 2  # FULL, the default
+    engine.dispose()
+
+
+def test_pool_metrics_count_waits_overflow_and_timeouts(tmp_path):
+    metrics = PoolMetrics()
+    engine = make_engine(f"sqlite:///{tmp_path / 'hub.db'}",
+                         _settings(db_pool_size=1, db_max_overflow=1, db_pool_timeout=0.1), metrics)
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = metrics.snapshot()
+    assert stats["checkouts"] == 2 and stats["overflow_checkouts"] == 1 and stats["timeouts"] == 1
+    assert stats["pool_size"] == 1 and stats["in_use"] == 2 and stats["overflow"] == 1
+    first.close()
+    second.close()
+    assert metrics.snapshot()["in_use"] == 0
+    engine.dispose()
+
+
+def test_overflow_checkouts_only_count_checkouts_past_pool_size(tmp_path):
+    metrics = PoolMetrics()
+    engine = make_engine(f"sqlite:///{tmp_path / 'hub.db'}", _settings(db_pool_size=2, db_max_overflow=1), metrics)
+    held = [engine.connect() for _ in range(3)]  # the third is an overflow connection
+    held.pop(0).close()
+    held.pop(0).close()
+    # Two in use, one of them the overflow connection: within pool_size
+    held.append(engine.connect())
+    assert metrics.snapshot()["overflow_checkouts"] == 1
+    for conn in held:
+        conn.close()
+    engine.dispose()
+
+
+def test_async_engine_has_its_own_pool_size():
+    config = _settings(db_async_pool_size=4, db_async_max_overflow=1)
+    options = engine_options("postgresql+asyncpg://u:p@db/hub", config, is_async=True)
+    assert (options["pool_size"], options["max_overflow"]) == (4, 1)
+    assert engine_options("postgresql://u:p@db/hub", config)["pool_size"] == 3
+
+
+def test_pool_stats_endpoint(client):
+    app.dependency_overrides[get_current_user] = lambda: object()
+    try:
+        stats = client.get("/health/db-pool").json()
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert set(stats) == {"sync", "async"}
+    assert {"checkouts", "checkout_wait_ms_max", "overflow_checkouts", "timeouts"} <= set(stats["sync"])
@@ -0,0 +1,160 @@
+"""Tests for write-behind agent action ingestion (app/ingest.py)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app import ingest
+from app.event_bus import PG_MAX_PAYLOAD, EventBus
+from app.ingest import ActionPipeline
+from app.models import Agent, AgentAction, AgentType
+from app.websocket import ConnectionManager
+from tests.conftest import TestingSessionLocal, connection
+
+
+@pytest.fixture
+def agent(db) -> Agent:
+    a = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE, api_key="k")
+    db.add(a)
+    db.commit()
+    return a
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    messages = []
+
+    async def broadcast(message):
+        messages.append(message)
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    return messages
+
+
+def _row(agent, n: int) -> dict:
+    return {"agent_id": agent.id, "action_type": "tool_call", "summary": f"Edit {n}",
+            "metadata_json": '{"n": %d}' % n}
+
+
+async def _ingest_running(rows, agent) -> list:
+    pipeline = ActionPipeline(session_factory=TestingSessionLocal)
+    pipeline.start()
+    futures = [await pipeline.submit(row, agent.name, agent.agent_type) for row in rows]
+    await pipeline.stop()
+    return [f.exception() or f.result() for f in futures]
+
+
+def _ingest(rows, agent) -> list:
+    return asyncio.run(_ingest_running(rows, agent))
+
+
+def test_actions_are_stored_in_batches_and_broadcast_after_flush(db, agent, sent):
+    inserts = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.startswith("INSERT INTO agent_actions"):
+            inserts.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    try:
+        ids = _ingest([_row(agent, n) for n in range(50)], agent)
+    finally:
+        event.remove(connection, "before_cursor_execute", on_execute)
+
+    assert len(inserts) == 1
+    stored = db.query(AgentAction).order_by(AgentAction.id).all()
+    assert [a.id for a in stored] == ids
+    assert [a.summary for a in stored] == [f"Edit {n}" for n in range(50)]
+    # Coalesced frames, each as large as a NOTIFY allows
+    assert {m["type"] for m in sent} == {"agent_actions"}
+    assert [a["id"] for m in sent for a in m["actions"]] == ids
+    assert 1 < len(sent) < 5
+    assert sent[0]["actions"][0]["agent_name"] == "builder"
+    assert sent[0]["actions"][0]["metadata"] == {"n": 0}
+
+
+def test_batches_are_capped(db, agent, sent, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_BATCH_SIZE", 4)
+    ids = _ingest([_row(agent, n) for n in range(10)], agent)
+    assert len(set(ids)) == 10
+    assert db.query(AgentAction).count() == 10
+
+
+def test_bad_rows_do_not_sink_the_batch(db, agent, sent):
+    rows = [_row(agent, 0), {**_row(agent, 1), "summary": None}, _row(agent, 2)]
+    results = _ingest(rows, agent)
+
+    assert isinstance(results[1], RuntimeError)
+    assert all(isinstance(r, int) for r in (results[0], results[2]))
+    assert [a.summary for a in db.query(AgentAction).order_by(AgentAction.id)] == ["Edit 0", "Edit 2"]
+    assert [len(m["actions"]) for m in sent] == [2]
+
+
+def test_large_coalesced_frames_are_split_under_the_notify_limit(db, agent, monkeypatch):
+    frames = []
+
+    class RecordingBus(EventBus):
+        async def publish(self, frame: str):
+            frames.append(frame)
+
+    manager = ConnectionManager()
+    monkeypatch.setattr(ingest, "manager", manager)
+    rows = [{**_row(agent, n), "detail": "x" * 1000} for n in range(20)]
+
+    async def scenario():
+        await manager.start(RecordingBus())
+        return await _ingest_running(rows, agent)
+
+    ids = asyncio.run(scenario())
+    assert len(frames) > 1
+    assert all(len(f.encode()) <= PG_MAX_PAYLOAD for f in frames)
+    events = [json.loads(f.partition("\n")[2]) for f in frames]
+    assert {e["type"] for e in events} == {"agent_actions"}
+    assert [a["id"] for e in events for a in e["actions"]] == ids
+
+
+def test_failed_broadcast_does_not_stop_the_writer(db, agent, monkeypatch):
+    calls = []
+
+    async def broadcast(message):
+        calls.append(message)
+        if len(calls) == 1:
+            raise ConnectionError("bus down")
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+
+    async def scenario():
+        pipeline = ActionPipeline(session_factory=TestingSessionLocal)
+        pipeline.start()
+        first = await pipeline.submit(_row(agent, 0), agent.name, agent.agent_type)
+        await first
+        await asyncio.sleep(0.01)  # let the failing broadcast run
+        second = await pipeline.submit(_row(agent, 1), agent.name, agent.agent_type)
+        await pipeline.stop()
+        return first.result(), second.result()
+
+    ids = asyncio.run(scenario())
+    assert [a.id for a in db.query(AgentAction).order_by(AgentAction.id)] == list(ids)
+    assert [m["action"]["id"] for m in calls] == list(ids)
+
+
+def test_detached_failures_are_logged(db, agent, sent, caplog):
+    async def scenario():
+        pipeline = ActionPipeline(session_factory=TestingSessionLocal)
+        pipeline.start()
+        ingest.detach(await pipeline.submit({**_row(agent, 0), "summary": None}, agent.name, agent.agent_type))
+        await pipeline.stop()
+        await asyncio.sleep(0)  # done callbacks run on the next loop iteration
+
+    asyncio.run(scenario())
+    assert "Queued agent action was not stored" in caplog.text
+
+
+def test_submit_requires_a_running_pipeline(agent):
+    pipeline = ActionPipeline(session_factory=TestingSessionLocal)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.submit(_row(agent, 0), agent.name, agent.agent_type))
@@ -0,0 +1,235 @@
+"""Tests for heartbeat coalescing and the liveness sweeper (app/liveness.py)."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from app import ingest
+from app.auth import get_current_user
+from app.liveness import LivenessSweeper, LivenessTable, liveness
+from app.main import app
+from app.models import Agent, AgentAction, AgentStatus, AgentType, Project, Task, TaskStatus, User
+from app.routers.agents import _hash_key
+from tests.conftest import TestingSessionLocal, connection
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    messages = []
+
+    async def broadcast(message):
+        messages.append(message)
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    return messages
+
+
+@pytest.fixture
+def agent_writes():
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE agents"):
+            statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(connection, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture
+def agent_id(db) -> int:
+    a = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key("key-1"))
+    db.add(a)
+    db.commit()
+    return a.id
+
+
+def _beat(client, agent_id: int, **body):
+    resp = client.post(f"/api/agents/{agent_id}/heartbeat", headers={"X-Agent-Key": "key-1"}, json=body)
+    assert resp.status_code == 200
+    return resp
+
+
+def test_steady_heartbeats_are_not_written_or_broadcast(db, client, sent, agent_writes, agent_id):
+    for _ in range(5):
+        _beat(client, agent_id, status="working")
+
+    assert len(agent_writes) == 1
+    assert [m["type"] for m in sent] == ["heartbeat", "agent_action"]
+    assert db.query(AgentAction).count() == 1
+
+    _beat(client, agent_id, status="idle")
+    assert len(agent_writes) == 2
+    assert [m["type"] for m in sent[2:]] == ["heartbeat", "agent_action"]
+    assert sent[2]["agent"]["status"] == "idle"
+
+
+def test_stored_heartbeat_is_refreshed_after_persist_interval(db, client, sent, agent_writes, agent_id, monkeypatch):
+    _beat(client, agent_id)
+    _beat(client, agent_id)
+    assert len(agent_writes) == 1
+
+    monkeypatch.setattr(liveness, "persist_interval", 0)
+    _beat(client, agent_id)
+    assert len(agent_writes) == 2
+    assert [m["type"] for m in sent] == ["heartbeat"]
+
+
+def test_agent_list_reads_liveness(db, client, agent_id):
+    app.dependency_overrides[get_current_user] = lambda: object()
+    try:
+        assert client.get("/api/agents/").json()[0]["is_alive"] is False
+        _beat(client, agent_id)
+        agents = client.get("/api/agents/").json()
+        status = client.get("/api/agents/orchestrator/status").json()
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert agents[0]["is_alive"] is True and agents[0]["last_heartbeat"] is not None
+    assert status["active_agents"] == 1
+
+
+def test_liveness_edges(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.liveness.time.monotonic", lambda: now[0])
+    table = LivenessTable(timeout=90, persist_interval=60)
+
+    assert table.beat(1) is True
+    assert table.beat(1) is False
+    assert table.is_alive(1)
+    now[0] += 91
+    assert not table.is_alive(1)
+    assert table.beat(1) is True
+
+    # A recent stored heartbeat counts for agents this process has not seen
+    recent = datetime.now(timezone.utc) - timedelta(seconds=10)
+    assert table.is_alive(2, recent)
+    assert table.beat(2, recent) is False
+    assert not table.is_alive(3, recent - timedelta(minutes=5))
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list:
+    now = [1000.0]
+    monkeypatch.setattr("app.liveness.time.monotonic", lambda: now[0])
+    return now
+
+
+def _claimed_task(db, agent_id: int, status=TaskStatus.IN_PROGRESS) -> Task:
+    user = User(username="tim", email="tim@hestia.test", hashed_password="x")
+    db.add(user)
+    db.commit()
+    project = Project(name="Launch", owner_id=user.id)
+    db.add(project)
+    db.commit()
+    task = Task(title="Ship it", project_id=project.id, agent_id=agent_id, status=status)
+    db.add(task)
+    db.commit()
+    return task
+
+
+def _sweep(sweeper) -> int:
+    async def scenario():
+        await sweeper.seed()
+        return await sweeper.sweep()
+
+    return asyncio.run(scenario())
+
+
+def test_sweeper_marks_silent_agent_down_and_requeues_its_task(db, sent, clock, agent_id):
+    agent = db.get(Agent, agent_id)
+    agent.status = AgentStatus.WORKING
+    task = _claimed_task(db, agent_id)
+    table = LivenessTable(timeout=90)
+    table.beat(agent_id)
+    sweeper = LivenessSweeper(table, session_factory=TestingSessionLocal)
+
+    assert _sweep(sweeper) == 0
+    clock[0] += 91
+    assert _sweep(sweeper) == 1
+
+    db.expire_all()
+    assert db.get(Agent, agent_id).status == AgentStatus.OFFLINE
+    task = db.get(Task, task.id)
+    assert task.agent_id is None and task.status == TaskStatus.TODO
+    action = db.query(AgentAction).one()
+    assert action.action_type == "status_change" and "offline" in action.summary
+
+    assert [m["type"] for m in sent] == ["agent_down"]
+    assert sent[0]["agent"]["status"] == "offline"
+    assert sent[0]["released_task_ids"] == [task.id]
+    assert sent[0]["action"]["id"] == action.id
+
+    # Already OFFLINE: nothing more to do
+    clock[0] += 91
+    assert _sweep(sweeper) == 0
+
+
+def test_sweeper_reschedules_agents_that_kept_beating(db, sent, clock, agent_id):
+    table = LivenessTable(timeout=90)
+    table.beat(agent_id)
+    sweeper = LivenessSweeper(table, session_factory=TestingSessionLocal)
+
+    async def scenario():
+        await sweeper.seed()
+        clock[0] += 60
+        table.beat(agent_id)
+        clock[0] += 60
+        first = await sweeper.sweep()
+        clock[0] += 31
+        return first, await sweeper.sweep()
+
+    assert asyncio.run(scenario()) == (0, 1)
+    assert len(sent) == 1
+
+
+def test_recent_stored_heartbeat_keeps_agent_up(db, sent, clock, agent_id):
+    # Beats handled by another worker only show up in last_heartbeat
+    db.get(Agent, agent_id).last_heartbeat = datetime.now(timezone.utc) - timedelta(seconds=30)
+    db.commit()
+    table = LivenessTable(timeout=90)
+    table.beat(agent_id)
+    clock[0] += 91
+    sweeper = LivenessSweeper(table, session_factory=TestingSessionLocal)
+    assert _sweep(sweeper) == 0
+    assert sweeper._heap[0][0] == pytest.approx(clock[0] + 60, abs=1)
+    assert sent == []
+
+
+def test_heartbeat_after_sweep_brings_agent_back(db, client, sent, agent_id):
+    db.get(Agent, agent_id).status = AgentStatus.OFFLINE
+    db.commit()
+    _beat(client, agent_id)
+    db.expire_all()
+    assert db.get(Agent, agent_id).status == AgentStatus.IDLE
+    assert sent[0]["agent"]["status"] == "idle"
+
+
+def test_beat_on_a_fresh_worker_checks_the_stored_heartbeat(db, client, sent, agent_writes, agent_id):
+    db.get(Agent, agent_id).last_heartbeat = datetime.now(timezone.utc) - timedelta(seconds=10)
+    db.commit()
+    liveness.clear()  # restarted, or the beats so far went to another worker
+    agent_writes.clear()
+
+    _beat(client, agent_id)
+    assert agent_writes == []
+    assert sent == []
+
+
+def test_repeated_current_task_is_not_rewritten(db, client, sent, agent_writes, agent_id):
+    task = _claimed_task(db, agent_id)
+    for _ in range(3):
+        _beat(client, agent_id, current_task_id=task.id)
+    assert len(agent_writes) == 1
+    db.expire_all()
+    assert db.get(Agent, agent_id).current_task_id == task.id
+
+    other = Task(title="Next", project_id=task.project_id, agent_id=agent_id, status=TaskStatus.IN_PROGRESS)
+    db.add(other)
+    db.commit()
+    _beat(client, agent_id, current_task_id=other.id)
+    assert len(agent_writes) == 2
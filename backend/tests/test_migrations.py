@@ -0,0 +1,93 @@
+"""Tests for the migration runner (app/migrations.py) and lazy router loading (app/routers/__init__.py)."""
+
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.main import ProjectHubAPI, app
+from app.migrations import MIGRATIONS, main, status, upgrade
+from app.routers import ROUTERS, RouterRegistry
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def test_upgrade_creates_schema_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hub.db'}")
+    latest = [version for version, _, _ in MIGRATIONS]
+    assert upgrade(engine) == latest
+    assert upgrade(engine) == []  # already current
+    assert all(applied for _, _, applied in status(engine))
+
+    schema = inspect(engine)
+    assert {"tasks", "agents", "task_capabilities", "schema_migrations"} <= set(schema.get_table_names())
+    with engine.connect() as conn:  # get_indexes skips expression indexes on SQLite
+        indexes = set(conn.scalars(text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+    assert "ix_tasks_claim_order" in indexes and "ix_tasks_claimable" not in indexes
+    engine.dispose()
+
+
+def test_upgrade_brings_legacy_tasks_table_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'hub.db'}")
+    with engine.begin() as conn:
+        # tasks as created before correlation ids and leases
+        conn.execute(text("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title VARCHAR(255))"))
+    upgrade(engine, target=2)
+    columns = {c["name"] for c in inspect(engine).get_columns("tasks")}
+    assert {"correlation_id", "lease_expires_at"} <= columns
+    assert [applied for _, _, applied in status(engine)][:3] == [True, True, False]
+    engine.dispose()
+
+
+def test_cli(tmp_path, monkeypatch, capsys):
+    import app.database
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'hub.db'}")
+    monkeypatch.setattr(app.database, "engine", engine)
+    assert main(["upgrade"]) == 0
+    assert capsys.readouterr().out.startswith(f"Applied {len(MIGRATIONS)} migration(s)")
+    main(["status"])
+    assert capsys.readouterr().out.count("x ") == len(MIGRATIONS)
+    engine.dispose()
+
+
+def test_importing_app_loads_no_routers_or_database():
+    code = ("import sys, app.main; "
+            "print(sorted(m for m in sys.modules if m.startswith(('app.routers.', 'app.database', 'sqlalchemy'))))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True,
+                         env={"DATABASE_URL": "postgresql://nobody@127.0.0.1:1/none", "PATH": ""}, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_openapi_lists_every_router(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    for prefix in ROUTERS:
+        assert any(path == prefix or path.startswith(prefix + "/") for path in paths), prefix
+    assert not app.routers.pending
+
+
+def test_routers_are_imported_off_the_loop_and_included_once(monkeypatch):
+    fresh = ProjectHubAPI()
+    threads = []
+    real_import = RouterRegistry._import
+
+    def spy(modules):
+        threads.append(threading.current_thread())
+        return real_import(modules)
+
+    monkeypatch.setattr(RouterRegistry, "_import", staticmethod(spy))
+
+    async def first_requests():
+        await asyncio.gather(*(fresh.routers.load_for("/api/tasks/") for _ in range(3)))
+
+    asyncio.run(first_requests())
+    assert threads and threading.main_thread() not in threads
+    assert "/api/tasks" not in fresh.routers.pending
+    from app.routers import tasks
+    included = [route for route in fresh.routes if route.path.startswith("/api/tasks")]
+    assert len(included) == len(tasks.router.routes)  # once, not once per request
@@ -0,0 +1,47 @@
+"""Tests for pooled password hashing and rehash-on-login (app/auth.py)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from passlib.context import CryptContext
+
+from app import auth
+from app.models import User
+
+
+def test_async_hashing_runs_in_the_pool():
+    def hash_and_report(password):
+        return threading.current_thread().name, auth.pwd_context.hash(password)
+
+    async def run():
+        thread, hashed = await auth._in_hash_pool(hash_and_report, "s3cret")
+        return thread, hashed, await auth.verify_password_async("s3cret", hashed)
+
+    thread, hashed, valid = asyncio.run(run())
+    assert thread.startswith("password-hash") and valid
+    assert hashed.startswith("$2b$04$")  # BCRYPT_ROUNDS from conftest
+
+
+def test_register_login_and_reset(client):
+    user = {"email": "ada@example.com", "username": "ada", "password": "old-pass"}
+    assert client.post("/api/auth/register", json=user).status_code == 200
+    assert client.post("/api/auth/login", data={"username": "ada", "password": "nope"}).status_code == 401
+    assert client.post("/api/auth/login", data={"username": "ada", "password": "old-pass"}).status_code == 200
+
+    token = client.post("/api/auth/forgot-password", json={"email_or_username": "ada"}).json()["reset_token"]
+    assert client.post("/api/auth/reset-password", json={"token": token, "new_password": "new-pass"}).status_code == 200
+    assert client.post("/api/auth/login", data={"username": "ada", "password": "new-pass"}).status_code == 200
+
+
+def test_login_rehashes_outdated_hash(db, client):
+    legacy = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("pw")
+    user = User(email="bo@example.com", username="bo", hashed_password=legacy)
+    db.add(user)
+    db.commit()
+
+    assert client.post("/api/auth/login", data={"username": "bo", "password": "pw"}).status_code == 200
+    db.refresh(user)
+    assert user.hashed_password.startswith("$2b$04$") and auth.verify_password("pw", user.hashed_password)
+    assert not auth.pwd_context.needs_update(user.hashed_password)
@@ -0,0 +1,106 @@
+"""Tests for the JWT principal cache (app/principal_cache.py)."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.auth import create_access_token, get_password_hash
+from app.database import get_session_factory
+from app.main import app
+from app.models import User
+from app.principal_cache import Principal, PrincipalCache
+from tests.conftest import TestingSessionLocal, connection
+
+
+@pytest.fixture
+def user_lookups():
+    """SELECTs against the users table."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(connection, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture
+def user(db) -> User:
+    u = User(email="ada@example.com", username="ada", hashed_password=get_password_hash("old-pass"))
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+def _auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+def _principal(user_id: int = 1, **fields) -> Principal:
+    values = dict(id=user_id, email=f"u{user_id}@example.com", username=f"u{user_id}",
+                  full_name=None, avatar_color=None, is_active=True, created_at=None)
+    return Principal(**{**values, **fields})
+
+
+def test_repeat_requests_skip_the_user_lookup(client, user, user_lookups):
+    headers = _auth(user)
+    for _ in range(3):
+        me = client.get("/api/auth/me", headers=headers)
+        assert me.status_code == 200 and me.json()["username"] == "ada"
+    assert len(user_lookups) == 1
+
+
+def test_cache_hits_open_no_session(client, user):
+    opened = []
+
+    def factory():
+        opened.append(1)
+        return TestingSessionLocal()
+
+    app.dependency_overrides[get_session_factory] = lambda: factory
+    headers = _auth(user)
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+    assert len(opened) == 1
+
+
+def test_profile_update_invalidates(client, user):
+    headers = _auth(user)
+    client.get("/api/auth/me", headers=headers)
+    assert client.put("/api/users/me", headers=headers, json={"full_name": "Ada L."}).status_code == 200
+    assert client.get("/api/auth/me", headers=headers).json()["full_name"] == "Ada L."
+
+
+def test_password_reset_and_deactivation_invalidate(db, client, user):
+    headers = _auth(user)
+    client.get("/api/auth/me", headers=headers)
+    token = client.post("/api/auth/forgot-password", json={"email_or_username": "ada"}).json()["reset_token"]
+    user.is_active = False  # deactivated alongside the reset
+    db.commit()
+    assert client.post("/api/auth/reset-password", json={"token": token, "new_password": "new"}).status_code == 200
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+
+
+def test_ttl_is_capped_by_token_expiry_and_lru_evicts():
+    cache = PrincipalCache(ttl=60, max_entries=2)
+    cache.put(_principal(1), token_exp=int(time.time()) - 1)  # already expired
+    assert cache.get(1, int(time.time()) - 1) is None
+
+    exp = int(time.time()) + 3600
+    for user_id in (1, 2):
+        cache.put(_principal(user_id), exp)
+    cache.get(1, exp)
+    cache.put(_principal(3), exp)  # evicts 2, the least recently used
+    assert cache.get(2, exp) is None
+    assert cache.get(1, exp).username == "u1" and cache.get(3, exp) is not None
+    assert cache.get(1, exp + 1) is None  # a different token for the same user
+
+    cache.invalidate_user(1)
+    assert cache.get(1, exp) is None
+    assert cache.stats()["entries"] == 1
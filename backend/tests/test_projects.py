@@ -0,0 +1,65 @@
+"""Tests for the project endpoints (/api/projects)."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.auth import get_current_user
+from app.main import app
+from app.models import Project, Task, TaskStatus, User
+
+
+def _mk_user(db, username: str = "tim") -> User:
+    u = User(
+        username=username,
+        email=f"{username}@hestia.test",
+        hashed_password="x",
+        full_name=username.title(),
+        avatar_color="#111111",
+        is_active=True,
+    )
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+@pytest.fixture
+def as_tim(db, client):
+    user = _mk_user(db, "tim")
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def _seed(db, owner, statuses) -> Project:
+    p = Project(name=f"P{len(statuses)}", owner_id=owner.id)
+    db.add(p)
+    db.flush()
+    for s in statuses:
+        t = Task(title=s.value, project_id=p.id, status=s)
+        db.add(t)
+        db.flush()
+        # Subtasks never count toward the project totals
+        db.add(Task(title="sub", project_id=p.id, parent_id=t.id, status=TaskStatus.DONE))
+    db.commit()
+    return p
+
+
+def test_list_reports_top_level_counts_per_project(db, client, as_tim):
+    busy = _seed(db, as_tim, [TaskStatus.DONE, TaskStatus.DONE, TaskStatus.TODO])
+    empty = _seed(db, as_tim, [])
+
+    resp = client.get("/api/projects/")
+    assert resp.status_code == 200
+    counts = {p["id"]: (p["task_count"], p["completed_count"]) for p in resp.json()}
+    assert counts == {busy.id: (3, 2), empty.id: (0, 0)}
+
+
+def test_get_single_project_counts(db, client, as_tim):
+    p = _seed(db, as_tim, [TaskStatus.REVIEW, TaskStatus.DONE])
+
+    resp = client.get(f"/api/projects/{p.id}")
+    assert resp.status_code == 200
+    assert resp.json()["task_count"] == 2
+    assert resp.json()["completed_count"] == 1
@@ -0,0 +1,130 @@
+"""Tests for the background reminder dispatcher (app/reminders.py)."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import reminders
+from app.models import Project, Reminder, Task, User
+from app.reminders import ReminderScheduler
+from app.websocket import ConnectionManager
+from tests.conftest import TestingSessionLocal
+from tests.test_websocket import _FakeSocket
+
+NOW = datetime(2026, 3, 10, 12, 0)
+
+
+def _ts(dt: datetime) -> float:
+    return reminders._utc(dt).timestamp()
+
+
+@pytest.fixture
+def task(db) -> Task:
+    user = User(username="tim", email="tim@hestia.test", hashed_password="x")
+    project = Project(name="Launch", owner=user)
+    task = Task(title="Ship it", project=project)
+    db.add_all([user, project, task])
+    db.commit()
+    return task
+
+
+def _mk_reminder(db, task, remind_at, **kwargs) -> Reminder:
+    r = Reminder(task_id=task.id, user_id=task.project.owner_id, remind_at=remind_at,
+                 message=kwargs.pop("message", "ping"), **kwargs)
+    db.add(r)
+    db.commit()
+    return r
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    messages = []
+
+    async def broadcast(message, topics=(), user_id=None):
+        assert user_id == message["reminder"]["user_id"]
+        messages.append(message)
+
+    monkeypatch.setattr(reminders.manager, "broadcast", broadcast)
+    return messages
+
+
+def test_dispatch_claims_due_reminders_once(db, task, sent):
+    due = _mk_reminder(db, task, NOW - timedelta(minutes=1), message="due")
+    _mk_reminder(db, task, NOW - timedelta(hours=1), is_sent=True)
+    later = _mk_reminder(db, task, NOW + timedelta(minutes=5))
+    scheduler = ReminderScheduler(session_factory=TestingSessionLocal)
+
+    assert asyncio.run(scheduler.dispatch_due(_ts(NOW))) == 1
+    assert asyncio.run(scheduler.dispatch_due(_ts(NOW))) == 0
+
+    assert [m["reminder"]["id"] for m in sent] == [due.id]
+    assert sent[0]["type"] == "reminder"
+    assert sent[0]["reminder"]["task_title"] == "Ship it"
+    assert sent[0]["reminder"]["message"] == "due"
+    db.expire_all()
+    assert due.is_sent and not later.is_sent
+
+
+def test_dispatch_drains_more_than_one_batch(db, task, sent, monkeypatch):
+    monkeypatch.setattr(reminders, "CLAIM_BATCH_SIZE", 2)
+    for i in range(5):
+        _mk_reminder(db, task, NOW - timedelta(minutes=i))
+    scheduler = ReminderScheduler(session_factory=TestingSessionLocal)
+
+    assert asyncio.run(scheduler.dispatch_due(_ts(NOW))) == 5
+    assert db.query(Reminder).filter(Reminder.is_sent == False).count() == 0
+
+
+def test_refill_rehydrates_pending_window(db, task, sent):
+    overdue = _mk_reminder(db, task, NOW - timedelta(days=1))
+    soon = _mk_reminder(db, task, NOW + timedelta(minutes=5))
+    _mk_reminder(db, task, NOW + timedelta(minutes=1), is_sent=True)
+    _mk_reminder(db, task, NOW + timedelta(days=1))
+    scheduler = ReminderScheduler(session_factory=TestingSessionLocal)
+
+    asyncio.run(scheduler.refill(_ts(NOW)))
+    assert sorted(scheduler._heap) == [(_ts(overdue.remind_at), overdue.id), (_ts(soon.remind_at), soon.id)]
+    assert scheduler._horizon == _ts(NOW + reminders.HEAP_HORIZON)
+
+    # New reminders join the heap only inside the window
+    scheduler._push(99, _ts(NOW + timedelta(minutes=1)))
+    scheduler._push(100, _ts(NOW + timedelta(hours=2)))
+    assert 99 in {rid for _, rid in scheduler._heap}
+    assert 100 not in {rid for _, rid in scheduler._heap}
+
+
+def test_deleted_reminders_are_not_sent(db, task, sent):
+    gone = _mk_reminder(db, task, NOW - timedelta(minutes=1))
+    scheduler = ReminderScheduler(session_factory=TestingSessionLocal)
+    asyncio.run(scheduler.refill(_ts(NOW)))
+    db.delete(gone)
+    db.commit()
+
+    assert asyncio.run(scheduler.dispatch_due(_ts(NOW))) == 0
+    assert sent == [] and scheduler._heap == []
+
+
+def test_reminder_reaches_only_its_owner(db, task, monkeypatch):
+    other = User(username="ann", email="ann@hestia.test", hashed_password="x")
+    db.add(other)
+    db.commit()
+    _mk_reminder(db, task, NOW - timedelta(minutes=1))
+    owner_id = task.project.owner_id
+    manager = ConnectionManager()
+    monkeypatch.setattr(reminders, "manager", manager)
+
+    async def scenario():
+        owner, stranger, snooper = _FakeSocket(), _FakeSocket(), _FakeSocket()
+        await manager.connect(owner, user_id=owner_id)
+        await manager.connect(stranger, user_id=other.id)  # no topics: everything else
+        await manager.connect(snooper, [f"user:{owner_id}"], user_id=other.id)
+        await ReminderScheduler(session_factory=TestingSessionLocal).dispatch_due(_ts(NOW))
+        await asyncio.sleep(0.01)
+        return owner, stranger, snooper
+
+    owner, stranger, snooper = asyncio.run(scenario())
+    assert [f["type"] for f in owner.frames] == ["reminder"]
+    assert stranger.frames == [] and snooper.frames == []
@@ -0,0 +1,322 @@
+"""Tests for the agent work queue (app/task_queue.py, /api/agents/queue)."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import ingest
+from app.database import Base
+from app.liveness import liveness
+from app.auth import get_current_user
+from app.main import app
+from app.models import Agent, AgentAction, AgentType, Project, Task, TaskCapability, TaskPriority, TaskStatus, User
+from app.routers import coordination
+from app.routers.agents import _hash_key
+from app.schemas import TaskClaimRequest
+from app.task_queue import CLAIMABLE, URGENCY_RANK_SQL, LeaseSweeper, WorkSignal, claim_tasks, notify_if_claimable
+from tests.conftest import TestingSessionLocal, connection
+
+
+@pytest.fixture(autouse=True)
+def sent(monkeypatch) -> list:
+    messages = []
+
+    async def broadcast(message):
+        messages.append(message)
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    return messages
+
+
+@pytest.fixture
+def project(db) -> Project:
+    user = User(username="tim", email="tim@hestia.test", hashed_password="x")
+    db.add(user)
+    db.commit()
+    p = Project(name="Launch", owner_id=user.id)
+    db.add(p)
+    db.commit()
+    return p
+
+
+@pytest.fixture
+def agent_id(db) -> int:
+    a = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key("key-1"))
+    db.add(a)
+    db.commit()
+    liveness.beat(a.id)
+    return a.id
+
+
+def _mk_tasks(db, project, *specs) -> list[int]:
+    """specs: (title, priority) pairs, created one minute apart."""
+    start = datetime(2026, 1, 1)
+    tasks = [Task(title=title, project_id=project.id, priority=priority, status=TaskStatus.TODO,
+                  created_at=start + timedelta(minutes=i))
+             for i, (title, priority) in enumerate(specs)]
+    db.add_all(tasks)
+    db.commit()
+    return [t.id for t in tasks]
+
+
+def _claim(client, path="/api/agents/queue/claim", body=None, **params):
+    return client.post(path, params=params, headers={"X-Agent-Key": "key-1"}, json=body or {})
+
+
+def test_claims_most_urgent_then_oldest(db, client, project, agent_id, sent):
+    _mk_tasks(db, project, ("old low", TaskPriority.LOW), ("medium", TaskPriority.MEDIUM),
+              ("urgent", TaskPriority.URGENT), ("new low", TaskPriority.LOW))
+
+    titles = [_claim(client).json()["title"] for _ in range(4)]
+    assert titles == ["urgent", "medium", "old low", "new low"]
+    assert _claim(client).status_code == 204
+
+    claimed = db.query(Task).filter(Task.agent_id == agent_id, Task.status == TaskStatus.IN_PROGRESS)
+    assert claimed.count() == 4
+    assert [m["type"] for m in sent[:2]] == ["task_claimed", "agent_action"]
+
+
+def test_claim_many(db, client, project, agent_id, sent):
+    _mk_tasks(db, project, *[(f"t{i}", TaskPriority.HIGH if i % 2 else TaskPriority.MEDIUM) for i in range(6)])
+
+    resp = _claim(client, "/api/agents/queue/claim-many", count=4)
+    assert resp.status_code == 200
+    assert [t["title"] for t in resp.json()] == ["t1", "t3", "t5", "t0"]
+    assert db.get(Agent, agent_id).current_task_id == resp.json()[0]["id"]
+    assert db.query(AgentAction).count() == 4
+    assert sent[-1]["type"] == "agent_actions" and len(sent[-1]["actions"]) == 4
+
+    assert len(_claim(client, "/api/agents/queue/claim-many", count=4).json()) == 2
+    assert _claim(client, "/api/agents/queue/claim-many", count=51).status_code == 422
+
+
+def test_claim_requires_heartbeat(db, client, project, agent_id):
+    _mk_tasks(db, project, ("t", TaskPriority.LOW))
+    liveness.forget(agent_id)
+    assert _claim(client).status_code == 409
+
+
+def test_claim_across_priorities_is_one_indexed_statement(db, project, agent_id):
+    ids = _mk_tasks(db, project, ("low", TaskPriority.LOW), ("medium", TaskPriority.MEDIUM),
+                    ("urgent", TaskPriority.URGENT), ("high", TaskPriority.HIGH))
+    statements = []
+
+    def on_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    try:
+        claimed = claim_tasks(db, agent_id, count=4)
+    finally:
+        event.remove(connection, "before_cursor_execute", on_execute)
+    db.rollback()
+    assert claimed == [ids[2], ids[3], ids[1], ids[0]]
+    assert len(statements) == 1
+
+    db.execute(text("ANALYZE"))  # without statistics SQLite guesses ix_tasks_agent_status
+    plan = " ".join(row[-1] for row in db.execute(text(
+        f"EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE {CLAIMABLE.text} "
+        f"ORDER BY {URGENCY_RANK_SQL}, created_at, id LIMIT 4"
+    )))
+    assert "ix_tasks_claim_order" in plan and "TEMP B-TREE" not in plan
+
+
+def test_claim_is_a_compare_and_set(db, project, agent_id):
+    ids = _mk_tasks(db, project, ("t", TaskPriority.LOW))
+    # Someone else takes the task between our read and write
+    db.execute(update(Task).where(Task.id == ids[0]).values(agent_id=agent_id))
+    assert claim_tasks(db, agent_id + 1) == []
+    db.rollback()
+
+
+def test_concurrent_claimers_never_share_a_task(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        user = User(username="tim", email="tim@hestia.test", hashed_password="x")
+        db.add(user)
+        db.flush()
+        project = Project(name="Launch", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        db.add_all(Task(title=f"t{i}", project_id=project.id, status=TaskStatus.TODO) for i in range(200))
+        db.commit()
+
+    claims: dict[int, list[int]] = {agent: [] for agent in range(1, 9)}
+
+    def worker(agent: int):
+        with Session() as db:
+            while True:
+                got = claim_tasks(db, agent, count=3)
+                db.commit()
+                if not got:
+                    return
+                claims[agent].extend(got)
+
+    threads = [threading.Thread(target=worker, args=(a,)) for a in claims]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    all_claims = [task for got in claims.values() for task in got]
+    assert len(all_claims) == len(set(all_claims)) == 200
+    with Session() as db:
+        owners = dict(db.execute(select(Task.id, Task.agent_id)).all())
+        assert db.execute(select(Task.id).where(CLAIMABLE)).first() is None
+    assert all(owners[task] == agent for agent, got in claims.items() for task in got)
+    engine.dispose()
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def test_claims_are_leased_and_renewable(db, client, project, agent_id):
+    _mk_tasks(db, project, ("t", TaskPriority.LOW))
+    claimed = _claim(client).json()
+    lease = datetime.fromisoformat(claimed["lease_expires_at"])
+    assert timedelta(seconds=290) < _aware(lease) - datetime.now(timezone.utc) <= timedelta(seconds=300)
+
+    resp = client.post("/api/agents/queue/renew", params={"task_id": claimed["id"], "seconds": 900},
+                       headers={"X-Agent-Key": "key-1"})
+    assert resp.status_code == 200
+    db.expire_all()
+    assert _aware(db.get(Task, claimed["id"]).lease_expires_at) > _aware(lease) + timedelta(seconds=500)
+
+    resp = client.post("/api/agents/queue/renew", params={"task_id": claimed["id"] + 1},
+                       headers={"X-Agent-Key": "key-1"})
+    assert resp.status_code == 404
+
+
+def test_persisted_heartbeat_renews_leases(db, client, project, agent_id, monkeypatch):
+    ids = _mk_tasks(db, project, ("t", TaskPriority.LOW))
+    _claim(client)
+    soon = datetime.now(timezone.utc) + timedelta(seconds=5)
+    db.execute(update(Task).where(Task.id == ids[0]).values(lease_expires_at=soon))
+    db.commit()
+
+    monkeypatch.setattr(liveness, "persist_interval", 0)
+    client.post(f"/api/agents/{agent_id}/heartbeat", headers={"X-Agent-Key": "key-1"}, json={})
+    db.expire_all()
+    assert _aware(db.get(Task, ids[0]).lease_expires_at) > soon + timedelta(seconds=200)
+
+
+def test_sweeper_requeues_lapsed_leases(db, client, project, agent_id, sent):
+    ids = _mk_tasks(db, project, ("lapsed", TaskPriority.LOW), ("held", TaskPriority.LOW))
+    _claim(client, "/api/agents/queue/claim-many", count=2)
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.execute(update(Task).where(Task.id == ids[0]).values(lease_expires_at=past))
+    db.commit()
+    sent.clear()
+
+    next_deadline = asyncio.run(LeaseSweeper(session_factory=TestingSessionLocal).sweep())
+
+    db.expire_all()
+    lapsed, held = db.get(Task, ids[0]), db.get(Task, ids[1])
+    assert lapsed.agent_id is None and lapsed.status == TaskStatus.TODO and lapsed.lease_expires_at is None
+    assert held.agent_id == agent_id and held.status == TaskStatus.IN_PROGRESS
+    assert _aware(next_deadline) == _aware(held.lease_expires_at)
+    agent = db.get(Agent, agent_id)
+    assert agent.current_task_id is None
+    assert db.query(AgentAction).filter(AgentAction.summary == "Lease expired: lapsed").count() == 1
+    assert sent == [{"type": "leases_expired",
+                     "tasks": [{"task_id": ids[0], "project_id": project.id, "agent_id": agent_id}]}]
+    # Requeued tasks are claimable again
+    assert _claim(client).json()["id"] == ids[0]
+
+
+def test_work_signal_wakes_matching_waiters():
+    signal = WorkSignal()
+
+    async def scenario():
+        urgent = signal.waiter(1, [TaskPriority.URGENT])
+        anywhere = signal.waiter(None)
+        other = signal.waiter(2)
+        signal.notify(1, TaskPriority.LOW)
+        await asyncio.sleep(0)
+        assert anywhere.future.done() and not urgent.future.done() and not other.future.done()
+
+        # From a request thread
+        await asyncio.to_thread(signal.notify, 1, TaskPriority.URGENT)
+        await asyncio.wait_for(urgent.future, 1)
+        assert not other.future.done()
+
+    asyncio.run(scenario())
+
+
+def test_long_poll_claim_wakes_on_new_task(db, project, agent_id):
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        session = AsyncSession(sync_session_class=lambda **kw: db)
+        poll = asyncio.create_task(coordination._claim(session, "key-1", TaskClaimRequest(), 1, wait=10))
+        await asyncio.sleep(0.1)
+        assert not poll.done()
+        task = Task(title="fresh", project_id=project.id, status=TaskStatus.TODO)
+        db.add(task)
+        db.commit()
+        notify_if_claimable(task)
+        claimed = await asyncio.wait_for(poll, 5)
+        return claimed, task.id, asyncio.get_running_loop().time() - started
+
+    claimed, task_id, seconds = asyncio.run(scenario())
+    assert [t.id for t in claimed] == [task_id]
+    assert seconds < 5
+
+
+def test_long_poll_claim_times_out(db, client, project, agent_id):
+    started = time.perf_counter()
+    assert _claim(client, wait=0.2).status_code == 204
+    assert time.perf_counter() - started >= 0.2
+    assert _claim(client, wait=31).status_code == 422
+
+
+def test_claims_match_agent_capabilities(db, client, project, agent_id):
+    db.get(Agent, agent_id).capabilities = '["coding", "testing"]'
+    ids = _mk_tasks(db, project, ("deploy", TaskPriority.URGENT), ("code", TaskPriority.HIGH),
+                    ("code+test", TaskPriority.HIGH), ("anyone", TaskPriority.LOW))
+    for task_id, needs in zip(ids, (["deploy"], ["coding"], ["coding", "testing"])):
+        db.get(Task, task_id).required_capabilities = needs
+    db.commit()
+
+    app.dependency_overrides[get_current_user] = lambda: object()
+    try:
+        queue = client.get("/api/agents/queue").json()
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert [t["required_capabilities"] for t in queue] == [["deploy"], ["coding"], ["coding", "testing"], []]
+
+    # The request can narrow the agent's capabilities
+    narrowed = _claim(client, "/api/agents/queue/claim-many", body={"required_capabilities": ["Coding"]}, count=10)
+    assert [t["title"] for t in narrowed.json()] == ["code", "anyone"]
+    assert narrowed.json()[0]["required_capabilities"] == ["coding"]
+    assert _claim(client).json()["title"] == "code+test"
+    assert _claim(client).status_code == 204
+    assert db.execute(select(Task.title).where(CLAIMABLE)).scalars().all() == ["deploy"]
+
+
+def test_task_capabilities_are_normalized_and_replaced(db, client, project):
+    app.dependency_overrides[get_current_user] = lambda: db.get(User, project.owner_id)
+    try:
+        task_id = client.post("/api/tasks/", json={
+            "title": "t", "project_id": project.id, "required_capabilities": [" Testing", "coding", "testing"],
+        }).json()["id"]
+        assert db.get(Task, task_id).required_capabilities == ["coding", "testing"]
+
+        client.put(f"/api/tasks/{task_id}", json={"required_capabilities": ["coding", "deploy"]})
+        db.expire_all()
+        assert db.get(Task, task_id).required_capabilities == ["coding", "deploy"]
+
+        client.delete(f"/api/tasks/{task_id}")
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+    assert db.query(TaskCapability).count() == 0
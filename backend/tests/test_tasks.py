@@ -0,0 +1,513 @@
+"""Tests for the project task endpoints (/api/tasks)."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, update
+
+from app import ingest, view_cache
+from app.auth import get_current_user
+from app.main import app
+from app.models import Agent, AgentStatus, AgentType, Project, Task, TaskStatus, User
+from app.routers.agents import _hash_key
+from app.view_cache import GanttCache
+
+
+def _mk_user(db, username: str = "tim") -> User:
+    u = User(
+        username=username,
+        email=f"{username}@hestia.test",
+        hashed_password="x",
+        full_name=username.title(),
+        avatar_color="#111111",
+        is_active=True,
+    )
+    db.add(u)
+    db.commit()
+    db.refresh(u)
+    return u
+
+
+@pytest.fixture
+def as_tim(db, client):
+    user = _mk_user(db, "tim")
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def project(db, as_tim) -> Project:
+    p = Project(name="Roadmap", owner_id=as_tim.id, color="#123456")
+    db.add(p)
+    db.commit()
+    db.refresh(p)
+    return p
+
+
+def _mk_task(db, project, title, **kwargs) -> Task:
+    t = Task(title=title, project_id=project.id, **kwargs)
+    db.add(t)
+    db.commit()
+    db.refresh(t)
+    return t
+
+
+class _QueryCounter:
+    def __init__(self, db):
+        self.engine = db.get_bind().engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+# ── GET /api/tasks — batched serialization ───────────────────────
+
+def test_list_includes_related_collections(db, client, as_tim, project):
+    blocker = _mk_task(db, project, "Blocker", position=0)
+    parent = _mk_task(db, project, "Parent", position=1)
+    parent.assignees = [as_tim]
+    parent.dependencies = [blocker]
+    db.commit()
+    _mk_task(db, project, "Sub A", parent_id=parent.id, status=TaskStatus.DONE)
+    _mk_task(db, project, "Sub B", parent_id=parent.id, status=TaskStatus.TODO)
+
+    resp = client.get("/api/tasks/", params={"project_id": project.id, "include_subtasks": False})
+    assert resp.status_code == 200
+    tasks = {t["title"]: t for t in resp.json()}
+    assert set(tasks) == {"Blocker", "Parent"}
+
+    p = tasks["Parent"]
+    assert [u["username"] for u in p["assignees"]] == ["tim"]
+    assert [d["id"] for d in p["dependencies"]] == [blocker.id]
+    assert [s["title"] for s in p["subtasks"]] == ["Sub A", "Sub B"]
+    assert p["subtask_count"] == 2
+    assert p["subtask_completed"] == 1
+    assert tasks["Blocker"]["subtasks"] == []
+
+
+def test_list_query_count_is_independent_of_task_count(db, client, as_tim, project):
+    def count_for_list():
+        with _QueryCounter(db) as qc:
+            resp = client.get("/api/tasks/", params={"project_id": project.id})
+        assert resp.status_code == 200
+        return qc.count
+
+    for i in range(3):
+        t = _mk_task(db, project, f"T{i}", position=i)
+        t.assignees = [as_tim]
+    db.commit()
+    small = count_for_list()
+
+    for i in range(3, 40):
+        t = _mk_task(db, project, f"T{i}", position=i)
+        t.assignees = [as_tim]
+        _mk_task(db, project, f"T{i} sub", parent_id=t.id)
+    db.commit()
+    large = count_for_list()
+
+    assert large == small
+
+
+# ── GET /api/tasks — keyset pagination and projection ────────────
+
+def test_keyset_pages_cover_every_task_once(db, client, as_tim, project):
+    # Duplicate positions exercise the id tie-breaker
+    created = [_mk_task(db, project, f"T{i}", position=i // 2) for i in range(7)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"project_id": project.id, "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/api/tasks/", params=params)
+        assert resp.status_code == 200
+        seen.extend(t["id"] for t in resp.json())
+        pages += 1
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == [t.id for t in created]
+
+
+def test_keyset_pages_over_null_positions(db, client, as_tim, project):
+    # NULL sorts as 0: between the negative and positive positions
+    created = {pos: _mk_task(db, project, f"P{pos}", position=pos) for pos in (-1, 1)}
+    unplaced = [_mk_task(db, project, f"N{i}") for i in range(4)]
+    zero = _mk_task(db, project, "Z", position=0)
+    # The column default turns position=None into 0 on insert
+    db.execute(update(Task).where(Task.id.in_([t.id for t in unplaced])).values(position=None))
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"project_id": project.id, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/api/tasks/", params=params)
+        assert resp.status_code == 200
+        seen.extend(t["id"] for t in resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == [created[-1].id] + sorted(t.id for t in unplaced + [zero]) + [created[1].id]
+
+
+def test_invalid_cursor_returns_400(client, as_tim, project):
+    resp = client.get("/api/tasks/", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_fields_projection_returns_only_requested_columns(db, client, as_tim, project):
+    t = _mk_task(db, project, "Only", position=0)
+    t.assignees = [as_tim]
+    db.commit()
+
+    resp = client.get("/api/tasks/", params={"fields": "id,title,status", "limit": 10})
+    assert resp.status_code == 200
+    assert resp.json() == [{"id": t.id, "title": "Only", "status": "backlog"}]
+
+
+def test_fields_projection_rejects_nested_fields(client, as_tim, project):
+    resp = client.get("/api/tasks/", params={"fields": "id,assignees"})
+    assert resp.status_code == 400
+    assert "assignees" in resp.json()["detail"]
+
+
+# ── GET /api/tasks/kanban — cached snapshot ──────────────────────
+
+def _column(board, status):
+    return [t["title"] for t in next(c for c in board["columns"] if c["status"] == status)["tasks"]]
+
+
+def test_kanban_etag_round_trip(db, client, as_tim, project):
+    _mk_task(db, project, "A", status=TaskStatus.TODO)
+
+    first = client.get(f"/api/tasks/kanban/{project.id}")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert _column(first.json(), "todo") == ["A"]
+
+    cached = client.get(f"/api/tasks/kanban/{project.id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+
+def test_kanban_patches_cards_changed_through_the_api(db, client, as_tim, project):
+    a = _mk_task(db, project, "A", status=TaskStatus.TODO, position=0)
+    b = _mk_task(db, project, "B", status=TaskStatus.TODO, position=1)
+    c = _mk_task(db, project, "C", status=TaskStatus.BACKLOG)
+    c.dependencies = [a]
+    db.commit()
+    etag = client.get(f"/api/tasks/kanban/{project.id}").headers["ETag"]
+
+    client.put(f"/api/tasks/{a.id}", json={"status": "done", "title": "A2"})
+    client.post("/api/tasks/reorder", json=[{"id": b.id, "position": 5, "status": "review"}])
+    client.post("/api/tasks/", json={"title": "D", "project_id": project.id, "status": "todo"})
+
+    resp = client.get(f"/api/tasks/kanban/{project.id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    board = resp.json()
+    assert _column(board, "done") == ["A2"]
+    assert _column(board, "review") == ["B"]
+    assert _column(board, "todo") == ["D"]
+    # C's dependency brief picked up A's new title
+    c_card = next(t for t in next(col for col in board["columns"] if col["status"] == "backlog")["tasks"])
+    assert [d["title"] for d in c_card["dependencies"]] == ["A2"]
+
+    client.delete(f"/api/tasks/{a.id}")
+    board = client.get(f"/api/tasks/kanban/{project.id}").json()
+    assert _column(board, "done") == []
+    c_card = next(t for t in next(col for col in board["columns"] if col["status"] == "backlog")["tasks"])
+    assert c_card["dependencies"] == []
+
+
+def test_kanban_rebuilds_after_another_workers_write(db, client, as_tim, project):
+    task = _mk_task(db, project, "A", status=TaskStatus.TODO)
+    etag = client.get(f"/api/tasks/kanban/{project.id}").headers["ETag"]
+
+    # What another worker's write + tasks_changed leaves in the database;
+    # this worker's snapshot never heard of it
+    task.title = "A2"
+    project.view_version += 1
+    db.commit()
+
+    resp = client.get(f"/api/tasks/kanban/{project.id}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert _column(resp.json(), "todo") == ["A2"]
+
+
+def test_view_version_is_bumped_with_the_write(db, client, as_tim, project):
+    task = _mk_task(db, project, "A", status=TaskStatus.TODO)
+    version = project.view_version
+
+    task.title = "A2"
+    view_cache.tasks_changed(db, project.id, task.id)
+    db.rollback()
+    db.refresh(project)
+    assert project.view_version == version  # nothing written, nothing bumped
+
+    assert client.put(f"/api/tasks/{task.id}", json={"title": "A3"}).status_code == 200
+    db.refresh(project)
+    assert project.view_version == version + 1
+
+
+def test_profile_edit_only_touches_that_users_projects(db, client, as_tim, project):
+    ann = _mk_user(db, "ann")
+    other = Project(name="Elsewhere", owner_id=ann.id)
+    shared = Project(name="Shared", owner_id=ann.id)
+    db.add_all([other, shared])
+    db.flush()
+    task = _mk_task(db, shared, "Pair up")
+    task.assignees = [as_tim]
+    as_tim.email = "tim@example.com"  # UserResponse rejects the reserved .test domain
+    db.commit()
+    versions = {p.id: p.view_version for p in (project, other, shared)}
+
+    assert client.put("/api/users/me", json={"full_name": "Tim T"}).status_code == 200
+    for p in (project, other, shared):
+        db.refresh(p)
+    assert project.view_version == versions[project.id] + 1
+    assert shared.view_version == versions[shared.id] + 1
+    assert other.view_version == versions[other.id]
+
+
+def test_kanban_orders_null_positions_like_patched_cards(db, client, as_tim, project):
+    low, unplaced, high = (_mk_task(db, project, t, status=TaskStatus.TODO) for t in ("low", "unplaced", "high"))
+    db.execute(update(Task).where(Task.id == low.id).values(position=-1))
+    db.execute(update(Task).where(Task.id == unplaced.id).values(position=None))
+    db.execute(update(Task).where(Task.id == high.id).values(position=1))
+    db.commit()
+
+    built = _column(client.get(f"/api/tasks/kanban/{project.id}").json(), "todo")
+    assert client.put(f"/api/tasks/{unplaced.id}", json={"title": "unplaced"}).status_code == 200
+    patched = _column(client.get(f"/api/tasks/kanban/{project.id}").json(), "todo")
+    assert built == patched == ["low", "unplaced", "high"]
+
+
+def test_kanban_cards_follow_agent_status(db, client, as_tim, project, monkeypatch):
+    async def broadcast(message):
+        pass
+
+    monkeypatch.setattr(ingest.manager, "broadcast", broadcast)
+    agent = Agent(name="builder", agent_type=AgentType.CLAUDE_CODE, api_key=_hash_key("key-1"),
+                  status=AgentStatus.IDLE)
+    db.add(agent)
+    db.commit()
+    _mk_task(db, project, "A", status=TaskStatus.REVIEW, agent_id=agent.id)
+
+    def card_agent():
+        board = client.get(f"/api/tasks/kanban/{project.id}").json()
+        return next(c for c in board["columns"] if c["status"] == "review")["tasks"][0]["agent"]
+
+    assert card_agent()["status"] == "idle"
+    assert client.post(f"/api/agents/{agent.id}/heartbeat", headers={"X-Agent-Key": "key-1"},
+                       json={"status": "waiting"}).status_code == 200
+    assert card_agent()["status"] == "waiting"
+
+    assert client.delete(f"/api/agents/{agent.id}").status_code == 200
+    assert card_agent() is None
+
+
+# ── POST /api/tasks/reorder and /move ────────────────────────────
+
+def test_reorder_uses_constant_query_count(db, client, as_tim, project):
+    tasks = [_mk_task(db, project, f"T{i}", position=i, status=TaskStatus.TODO) for i in range(30)]
+    payload = [{"id": t.id, "position": 29 - i, "status": "todo"} for i, t in enumerate(tasks)]
+    payload[0]["status"] = "done"
+
+    with _QueryCounter(db) as qc:
+        resp = client.post("/api/tasks/reorder", json=payload)
+    assert resp.status_code == 200
+    # ownership SELECT + UPDATE batches + the view_version bump,
+    # independent of payload size
+    assert qc.count <= 6
+
+    db.expire_all()
+    assert [t.position for t in tasks] == list(range(29, -1, -1))
+    assert tasks[0].status == TaskStatus.DONE
+    assert tasks[0].completed_at is not None
+
+
+def test_reorder_rejects_tasks_of_other_users(db, client, as_tim, project):
+    stranger = _mk_user(db, "mallory")
+    theirs = Project(name="Theirs", owner_id=stranger.id)
+    db.add(theirs)
+    db.commit()
+    mine = _mk_task(db, project, "Mine")
+    other = _mk_task(db, theirs, "Other")
+
+    resp = client.post("/api/tasks/reorder", json=[
+        {"id": mine.id, "position": 3},
+        {"id": other.id, "position": 4},
+    ])
+    assert resp.status_code == 403
+    db.expire_all()
+    assert mine.position == 0
+
+
+def test_reorder_rejects_invalid_status(db, client, as_tim, project):
+    t = _mk_task(db, project, "T")
+    resp = client.post("/api/tasks/reorder", json=[{"id": t.id, "position": 1, "status": "bogus"}])
+    assert resp.status_code == 400
+
+
+def test_move_between_gapped_neighbours_writes_one_row(db, client, as_tim, project):
+    a, b, c = (_mk_task(db, project, n, position=p, status=TaskStatus.TODO)
+               for n, p in (("A", 1024), ("B", 2048), ("C", 3072)))
+
+    resp = client.post(f"/api/tasks/{c.id}/move", json={"after_id": a.id})
+    assert resp.status_code == 200
+    db.expire_all()
+    assert (a.position, b.position) == (1024, 2048)
+    assert a.position < c.position < b.position
+
+
+def test_move_respaces_adjacent_positions(db, client, as_tim, project):
+    a, b = (_mk_task(db, project, n, position=p, status=TaskStatus.TODO) for n, p in (("A", 0), ("B", 1)))
+    moved = _mk_task(db, project, "M", status=TaskStatus.BACKLOG)
+
+    resp = client.post(f"/api/tasks/{moved.id}/move", json={"status": "todo", "after_id": a.id})
+    assert resp.status_code == 200
+    db.expire_all()
+    assert moved.status == TaskStatus.TODO
+    assert a.position < moved.position < b.position
+
+
+def test_created_tasks_are_spaced_so_the_first_move_writes_one_row(db, client, as_tim, project):
+    ids = [client.post("/api/tasks/", json={"title": n, "project_id": project.id, "status": "todo"}).json()["id"]
+           for n in ("A", "B", "C")]
+    db.expire_all()
+    assert [db.get(Task, i).position for i in ids] == [1024, 2048, 3072]
+
+    writes = []
+
+    def on_execute(conn, cursor, statement, *args):
+        if statement.startswith("UPDATE tasks"):
+            writes.append(statement)
+
+    engine = db.get_bind().engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        assert client.post(f"/api/tasks/{ids[2]}/move", json={"after_id": ids[0]}).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert len(writes) == 1
+
+
+def test_move_after_a_card_without_position(db, client, as_tim, project):
+    unplaced, placed, moved = (_mk_task(db, project, n, position=1024, status=TaskStatus.TODO)
+                               for n in ("U", "P", "M"))
+    db.execute(update(Task).where(Task.id == unplaced.id).values(position=None))
+    db.execute(update(Task).where(Task.id == moved.id).values(position=4096))
+    db.commit()
+
+    assert client.post(f"/api/tasks/{moved.id}/move", json={"after_id": unplaced.id}).status_code == 200
+    db.expire_all()
+    assert 0 < moved.position < placed.position == 1024  # no respace
+    assert _column(client.get(f"/api/tasks/kanban/{project.id}").json(), "todo") == ["U", "M", "P"]
+
+
+# ── POST /api/tasks/{id}/adjust-dates ────────────────────────────
+
+def test_adjust_dates_pushes_only_dependents_without_slack(db, client, as_tim, project):
+    day = lambda d: datetime(2026, 3, d)
+    root = _mk_task(db, project, "Root", start_date=day(1), due_date=day(5))
+    tight = _mk_task(db, project, "Tight", start_date=day(5), due_date=day(7))
+    slack = _mk_task(db, project, "Slack", start_date=day(20), due_date=day(22))
+    after_tight = _mk_task(db, project, "AfterTight", start_date=day(7), due_date=day(8))
+    tight.dependencies = [root]
+    slack.dependencies = [root]
+    after_tight.dependencies = [tight]
+    db.commit()
+
+    resp = client.post(f"/api/tasks/{root.id}/adjust-dates", params={"new_end_date": "2026-03-10T00:00:00"})
+    assert resp.status_code == 200
+    assert resp.json()["adjusted_ids"] == [root.id, tight.id, after_tight.id]
+
+    db.expire_all()
+    assert (root.start_date, root.due_date) == (day(6), day(10))
+    assert (tight.start_date, tight.due_date) == (day(10), day(12))
+    assert (after_tight.start_date, after_tight.due_date) == (day(12), day(13))
+    assert (slack.start_date, slack.due_date) == (day(20), day(22))
+
+
+def test_adjust_dates_rejects_dependency_cycles(db, client, as_tim, project):
+    a = _mk_task(db, project, "A", due_date=datetime(2026, 3, 1))
+    b = _mk_task(db, project, "B", due_date=datetime(2026, 3, 2))
+    b.dependencies = [a]
+    a.dependencies = [b]
+    db.commit()
+
+    resp = client.post(f"/api/tasks/{a.id}/adjust-dates", params={"new_end_date": "2026-03-09T00:00:00"})
+    assert resp.status_code == 409
+    db.expire_all()
+    assert a.due_date == datetime(2026, 3, 1)
+
+
+# ── GET /api/tasks/gantt — aggregate query + per-project cache ───
+
+def test_gantt_progress_dependencies_and_colors(db, client, as_tim, project):
+    blocker = _mk_task(db, project, "Blocker", position=0, status=TaskStatus.IN_PROGRESS)
+    parent = _mk_task(db, project, "Parent", position=1, color="#abcdef")
+    parent.assignees = [as_tim]
+    parent.dependencies = [blocker]
+    db.commit()
+    for i, status in enumerate((TaskStatus.DONE, TaskStatus.DONE, TaskStatus.TODO, TaskStatus.TODO)):
+        _mk_task(db, project, f"Sub {i}", parent_id=parent.id, status=status)
+
+    url = f"/api/tasks/gantt/{project.id}"
+    with _QueryCounter(db) as qc:
+        resp = client.get(url)
+    assert resp.status_code == 200
+    assert qc.count <= 4  # user, project, aggregate rows, assignees
+
+    rows = {r["id"]: r for r in resp.json()}
+    assert set(rows) == {blocker.id, parent.id}
+    assert rows[blocker.id]["progress"] == 50
+    assert rows[blocker.id]["color"] == "#123456"
+    assert rows[blocker.id]["dependencies"] == []
+    assert rows[parent.id]["progress"] == 50
+    assert rows[parent.id]["color"] == "#abcdef"
+    assert rows[parent.id]["dependencies"] == [blocker.id]
+    assert [a["id"] for a in rows[parent.id]["assignees"]] == [as_tim.id]
+
+
+def test_gantt_cache_is_dropped_on_task_update(db, client, as_tim, project):
+    task = _mk_task(db, project, "Plan", status=TaskStatus.TODO)
+    assert client.get(f"/api/tasks/gantt/{project.id}").json()[0]["progress"] == 10
+
+    url = f"/api/tasks/gantt/{project.id}"
+    with _QueryCounter(db) as qc:
+        client.get(url)
+    assert qc.count <= 2  # served from cache after auth and ownership checks
+
+    assert client.put(f"/api/tasks/{task.id}", json={"status": "review"}).status_code == 200
+    assert client.get(f"/api/tasks/gantt/{project.id}").json()[0]["progress"] == 80
+
+    assert client.put(f"/api/projects/{project.id}", json={"color": "#654321"}).status_code == 200
+    assert client.get(f"/api/tasks/gantt/{project.id}").json()[0]["color"] == "#654321"
+
+
+def test_gantt_build_racing_an_invalidation_is_not_stored():
+    cache = GanttCache()
+
+    def build():
+        cache.invalidate(1)  # a write lands while the payload is being built
+        return ["old"]
+
+    assert cache.get(1, 0, build) == ["old"]
+    assert cache.get(1, 0, lambda: ["new"]) == ["new"]
+    assert cache.get(1, 0, lambda: ["unused"]) == ["new"]
+    assert cache.get(1, 1, lambda: ["newer"]) == ["newer"]  # version moved on elsewhere
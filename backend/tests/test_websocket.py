@@ -0,0 +1,188 @@
+"""Tests for the live-feed fan-out (app/websocket.py)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app import websocket as ws
+from app import event_bus
+from app.event_bus import PG_MAX_PAYLOAD, PostgresEventBus, UnixSocketEventBus
+from app.websocket import ConnectionManager, topics_for
+
+
+class _FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames: list[dict] = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(json.loads(text))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = True
+
+
+def test_topics_are_derived_from_ids_in_the_event():
+    assert topics_for({"type": "task_claimed", "agent_id": 3, "project_id": 7, "task_id": 9}) == {
+        "type:task_claimed", "agent:3", "project:7",
+    }
+    assert topics_for({"type": "heartbeat", "agent": {"id": 4}}) == {"type:heartbeat", "agent:4"}
+    assert topics_for({"type": "agent_action", "action": {"agent_id": 5}}) == {"type:agent_action", "agent:5"}
+
+
+def test_subscribers_only_receive_matching_topics():
+    async def scenario():
+        manager = ConnectionManager()
+        everything, agent3, heartbeats = _FakeSocket(), _FakeSocket(), _FakeSocket()
+        await manager.connect(everything)
+        await manager.connect(agent3, ["agent:3"])
+        await manager.connect(heartbeats)
+        manager.subscribe(heartbeats, ["type:heartbeat"])
+
+        await manager.broadcast({"type": "heartbeat", "agent": {"id": 3}})
+        await manager.broadcast({"type": "task_claimed", "agent_id": 4, "project_id": 1})
+        manager.unsubscribe(agent3, ["agent:3"])  # back to everything
+        await manager.broadcast({"type": "agent_deregistered", "agent_id": 9})
+        await asyncio.sleep(0.01)
+        return everything, agent3, heartbeats
+
+    everything, agent3, heartbeats = asyncio.run(scenario())
+    assert [f["type"] for f in everything.frames] == ["heartbeat", "task_claimed", "agent_deregistered"]
+    assert [f["type"] for f in agent3.frames] == ["heartbeat", "agent_deregistered"]
+    assert [f["type"] for f in heartbeats.frames] == ["heartbeat"]
+
+
+def test_slow_consumer_does_not_block_broadcast(monkeypatch):
+    monkeypatch.setattr(ws, "SEND_QUEUE_SIZE", 4)
+
+    async def scenario():
+        manager = ConnectionManager()
+        slow, fast = _FakeSocket(delay=0.5), _FakeSocket()
+        await manager.connect(slow)
+        await manager.connect(fast)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for i in range(10):
+            await manager.broadcast({"type": "tick", "n": i})
+            await asyncio.sleep(0)  # let senders run, as between requests
+        elapsed = loop.time() - started
+        await asyncio.sleep(0.01)
+        return manager, slow, fast, elapsed
+
+    manager, slow, fast, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.1
+    assert [f["n"] for f in fast.frames] == list(range(10))
+    # The slow socket keeps only the newest frames, oldest ones are dropped
+    assert manager._subscribers[slow].dropped > 0
+
+
+def test_consumer_that_never_drains_is_disconnected(monkeypatch):
+    monkeypatch.setattr(ws, "SEND_QUEUE_SIZE", 2)
+    monkeypatch.setattr(ws, "MAX_DROPPED_FRAMES", 3)
+
+    async def scenario():
+        manager = ConnectionManager()
+        stuck = _FakeSocket(delay=10)
+        await manager.connect(stuck)
+        for i in range(10):
+            await manager.broadcast({"type": "tick", "n": i})
+        await asyncio.sleep(0.01)
+        return manager, stuck
+
+    manager, stuck = asyncio.run(scenario())
+    assert stuck not in manager.active_connections
+    assert stuck.closed
+
+
+def test_unix_socket_bus_reaches_other_workers(tmp_path):
+    async def scenario():
+        workers = [ConnectionManager() for _ in range(3)]
+        sockets = [_FakeSocket() for _ in workers]
+        for manager, sock in zip(workers, sockets):
+            await manager.start(UnixSocketEventBus(str(tmp_path)))
+            await manager.connect(sock)
+
+        await workers[0].broadcast({"type": "heartbeat", "agent": {"id": 1}})
+        await workers[2].broadcast({"type": "task_claimed", "agent_id": 2, "project_id": 3})
+        await asyncio.sleep(0.05)
+        for manager in workers:
+            await manager.stop()
+        return sockets
+
+    sockets = asyncio.run(scenario())
+    for sock in sockets:
+        assert sorted(f["type"] for f in sock.frames) == ["heartbeat", "task_claimed"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unix_socket_bus_forgets_dead_workers(tmp_path):
+    async def scenario():
+        alive, dead = UnixSocketEventBus(str(tmp_path)), UnixSocketEventBus(str(tmp_path))
+        received = []
+        await alive.start(received.append)
+        await dead.start(lambda frame: None)
+        dead._sock.close()  # crashed without cleaning up its socket file
+        dead._sock = None
+        await alive.publish("type:x\n{}")
+        await alive.stop()
+        return received
+
+    assert asyncio.run(scenario()) == ["type:x\n{}"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_coalesced_frames_are_published_for_every_agent_in_them():
+    frame = {"type": "agent_actions", "actions": [{"id": 1, "agent_id": 3}, {"id": 2, "agent_id": 4}]}
+    assert topics_for(frame) == {"type:agent_actions", "agent:3", "agent:4"}
+
+
+def test_postgres_bus_chunks_frames_over_the_notify_limit(monkeypatch):
+    notified = []
+
+    async def scenario():
+        bus = PostgresEventBus(engine=None, channel="events")
+        received = []
+        await event_bus.EventBus.start(bus, received.append)  # no LISTEN connection
+
+        def notify(payloads):
+            notified.append(payloads)
+            for payload in reversed(payloads):  # order does not matter
+                bus._receive(payload)
+
+        monkeypatch.setattr(bus, "_notify", notify)
+        small = "type:x\n" + json.dumps({"type": "x"})
+        large = "type:y\n" + json.dumps({"type": "y", "text": "\u00e9t\u00e9 " * 5000})
+        await bus.publish(small)
+        await bus.publish(large)
+        return small, large, received
+
+    small, large, received = asyncio.run(scenario())
+    assert received == [small, large]
+    assert len(notified[0]) == 1 and len(notified[1]) > 1
+    assert all(len(p.encode()) <= PG_MAX_PAYLOAD for payloads in notified for p in payloads)
+
+
+def test_unix_socket_bus_chunks_frames_over_the_datagram_limit(tmp_path, caplog):
+    async def scenario():
+        sender, peer = UnixSocketEventBus(str(tmp_path)), UnixSocketEventBus(str(tmp_path))
+        received = []
+        await sender.start(lambda frame: None)
+        await peer.start(received.append)
+        large = "type:y\n" + json.dumps({"type": "y", "text": "été " * 20000})
+        await sender.publish(large)
+        await asyncio.sleep(0.05)
+        await sender.stop()
+        await peer.stop()
+        return large, received
+
+    large, received = asyncio.run(scenario())
+    assert len(large.encode()) > event_bus.UNIX_CHUNK_PAYLOAD
+    assert received == [large]
+    assert "event dropped" not in caplog.text
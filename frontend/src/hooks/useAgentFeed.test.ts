@@ -112,6 +112,31 @@ describe('useAgentFeed', () => {
     expect(result.current.actions[1].summary).toBe('First');
   });
 
+  it('prepends a batch of actions newest first', () => {
+    const { result } = renderHook(() => useAgentFeed());
+    act(() => getLatestWs().simulateOpen());
+
+    act(() => getLatestWs().simulateMessage(makeAction(1, 'First')));
+    act(() => getLatestWs().simulateMessage({
+      type: 'agent_actions',
+      actions: [makeAction(2, 'Second').action, makeAction(3, 'Third').action],
+    }));
+    expect(result.current.actions.map(a => a.summary)).toEqual(['Third', 'Second', 'First']);
+  });
+
+  it('counts every action of a buffered batch', () => {
+    const { result } = renderHook(() => useAgentFeed());
+    act(() => getLatestWs().simulateOpen());
+
+    act(() => result.current.togglePause());
+    act(() => getLatestWs().simulateMessage({
+      type: 'agent_actions',
+      actions: [makeAction(1).action, makeAction(2).action],
+    }));
+    expect(result.current.actions).toHaveLength(0);
+    expect(result.current.newCount).toBe(2);
+  });
+
   it('caps actions at maxItems', () => {
     const { result } = renderHook(() => useAgentFeed({ maxItems: 3 }));
     act(() => getLatestWs().simulateOpen());
@@ -78,19 +78,25 @@ export function useAgentFeed(options: UseAgentFeedOptions = {}): UseAgentFeedRet
       if (cleanedUpRef.current) return;
       try {
         const msg = JSON.parse(event.data);
+        // Batches arrive as one `agent_actions` frame, oldest first
+        let incoming: AgentAction[] = [];
         if (msg.type === 'agent_action') {
-          const action: AgentAction = msg.action;
-          const cap = maxItemsRef.current;
-
-          if (pausedRef.current || scrolledDownRef.current) {
-            bufferRef.current.push(action);
-            if (bufferRef.current.length > maxItemsRef.current) {
-              bufferRef.current = bufferRef.current.slice(-maxItemsRef.current);
-            }
-            setNewCount(prev => prev + 1);
-          } else {
-            setActions(prev => [action, ...prev].slice(0, cap));
+          incoming = [msg.action];
+        } else if (msg.type === 'agent_actions' && Array.isArray(msg.actions)) {
+          incoming = msg.actions;
+        }
+        if (incoming.length === 0) return;
+        const cap = maxItemsRef.current;
+
+        if (pausedRef.current || scrolledDownRef.current) {
+          bufferRef.current.push(...incoming);
+          if (bufferRef.current.length > maxItemsRef.current) {
+            bufferRef.current = bufferRef.current.slice(-maxItemsRef.current);
           }
+          setNewCount(prev => prev + incoming.length);
+        } else {
+          const newest = [...incoming].reverse();
+          setActions(prev => [...newest, ...prev].slice(0, cap));
         }
       } catch {
         // ignore parse errors